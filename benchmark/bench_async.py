@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Concurrent /judgment throughput: blocking chain vs AsyncOffline_RAG, with stubbed backends"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qdrant_client import QdrantClient, AsyncQdrantClient
+
+from benchmark.fakes import FakeEmbeddings, FakeLLM, judgment_fixtures, seed_collection, aseed_collection
+from src.rag.offline_rag import Offline_RAG, AsyncOffline_RAG
+from src.rag.registry import RetrieverRegistry
+
+async def run_requests(handler, questions, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(question):
+        async with semaphore:
+            await handler({"question": question, "source_type": "judgment", "chat_history": ""})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in questions))
+    return time.perf_counter() - start
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark sync vs async RAG chain under concurrency")
+    parser.add_argument("--requests", type=int, default=40, help="Requests per mode (the blocking chain serializes them)")
+    parser.add_argument("--concurrency", type=int, default=20, help="Requests in flight at once")
+    parser.add_argument("--embed_latency", type=float, default=0.05, help="Simulated embedding round trip (s)")
+    parser.add_argument("--llm_latency", type=float, default=0.5, help="Simulated Gemini latency (s)")
+    args = parser.parse_args()
+
+    embedding = FakeEmbeddings(latency=args.embed_latency)
+    llm = FakeLLM(latency=args.llm_latency)
+    documents = judgment_fixtures(limit=400)
+
+    seed_embedding = FakeEmbeddings()
+    client = QdrantClient(":memory:")
+    async_client = AsyncQdrantClient(":memory:")
+    seed_collection(client, "judgment_collection", documents, seed_embedding)
+    await aseed_collection(async_client, "judgment_collection", documents, seed_embedding)
+
+    registry = RetrieverRegistry(embedding=embedding, client=client, async_client=async_client)
+    registry.get_vector_db("judgment")
+
+    questions = [f"Thủ tục ly hôn đơn phương số {i}" for i in range(args.requests)]
+
+    sync_chain = Offline_RAG(llm, registry=registry).get_chain()
+
+    async def blocking_handler(inputs):
+        return sync_chain(inputs)
+
+    async_chain = AsyncOffline_RAG(llm, registry=registry).get_chain()
+
+    # Both modes serve the same requests at the same concurrency so the rates are comparable
+    sync_time = await run_requests(blocking_handler, questions, args.concurrency)
+    async_time = await run_requests(async_chain, questions, args.concurrency)
+
+    sync_rps = len(questions) / sync_time
+    async_rps = len(questions) / async_time
+    print(f"Requests: {len(questions)}, concurrency: {args.concurrency}, embed latency: {args.embed_latency}s, LLM latency: {args.llm_latency}s")
+    print(f"Blocking chain: {len(questions)} requests in {sync_time:.2f}s -> {sync_rps:.1f} req/s")
+    print(f"Async chain:    {len(questions)} requests in {async_time:.2f}s -> {async_rps:.1f} req/s")
+    print(f"Speedup: {async_rps / sync_rps:.1f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Judgment crawl throughput: per-URL WebBaseLoader threads vs AsyncWebFetcher, against a local fixture site"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bs4
+from langchain_community.document_loaders import WebBaseLoader
+
+from benchmark.fakes import FixtureServer, judgment_site
+from src.rag.file_loader import get_optimal_workers
+from src.rag.web_fetcher import AsyncWebFetcher, PageCache
+
+def legacy_fetch(url):
+    """The previous WebLoader path: a fresh WebBaseLoader per URL plus a fixed 0.5s pause"""
+    loader = WebBaseLoader(web_paths=[url], bs_kwargs=dict(parse_only=bs4.SoupStrainer(id="vanban_content")))
+    documents = loader.load()
+    time.sleep(0.5)
+    return documents
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark judgment page fetching")
+    parser.add_argument("--urls", type=int, default=0, help="Number of judgment URLs (0=all in data_source)")
+    parser.add_argument("--baseline_urls", type=int, default=100, help="URLs for the thread-pool baseline (it is slow)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated server time per request (s)")
+    parser.add_argument("--server_max_rps", type=float, default=60, help="Origin answers 429 above this rate")
+    parser.add_argument("--concurrency", type=int, default=16, help="Fetcher requests per host in flight")
+    parser.add_argument("--rps", type=float, default=50, help="Fetcher requests per second per host")
+    args = parser.parse_args()
+
+    pages = judgment_site(limit=args.urls or None)
+    with FixtureServer(pages, latency=args.latency, max_rps=args.server_max_rps) as server:
+        urls = [server.url(path) for path in pages]
+
+        baseline = urls[:args.baseline_urls]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=get_optimal_workers()) as executor:
+            list(executor.map(legacy_fetch, baseline))
+        legacy_time = time.perf_counter() - start
+        legacy_rate = len(baseline) / legacy_time
+
+        # Let the origin's rate window drain before the next run
+        time.sleep(1.0)
+        server.throttled = 0
+        cache = PageCache()
+        fetcher = AsyncWebFetcher(per_host_concurrency=args.concurrency, per_host_rps=args.rps, cache=cache)
+        results = fetcher.fetch_all(urls)
+        cold = fetcher.stats()
+        cold_throttled = server.throttled
+        empty = sum(1 for documents in results.values() if not documents or not documents[0].page_content.strip())
+
+        time.sleep(1.0)
+        fetcher.fetch_all(urls)
+        warm = fetcher.stats()
+
+    print(f"Fixture site: {len(urls)} judgment pages, {args.latency * 1000:.0f}ms server time, "
+          f"429 above {args.server_max_rps:.0f} req/s")
+    print(f"Thread pool + WebBaseLoader: {len(baseline)} pages in {legacy_time:.2f}s -> {legacy_rate:.1f} pages/s")
+    print(f"AsyncWebFetcher (cold):      {cold['fetched']} pages in {cold['elapsed']:.2f}s -> "
+          f"{cold['pages_per_second']:.1f} pages/s, {cold_throttled} throttled, {cold['failed']} failed, {empty} empty")
+    print(f"AsyncWebFetcher (revalidate): {warm['not_modified']} not modified in {warm['elapsed']:.2f}s -> "
+          f"{warm['pages_per_second']:.1f} pages/s")
+    print(f"Speedup (cold): {cold['pages_per_second'] / legacy_rate:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Per-stage latency of the RAG pipeline (embed, search, format, prompt, generate, parse), fully offline.
+
+Judgments and law PDFs from data_source/judgment are split with the real
+splitters and indexed into a temporary embedded vector store with
+deterministic fake embeddings; the questions come from eval/eval.json.
+"""
+
+import argparse
+import atexit
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep everything this run writes (index versions, BM25, vectors) out of the real data directory,
+# while still reading judgment and PDF text cached by earlier load_data.py runs
+_data_dir = os.getenv("LECO_DATA_DIR", ".leco")
+for _name, _file in (("PAGE_CACHE", "pages.sqlite3"), ("PDF_TEXT_CACHE", "pdf_text.sqlite3")):
+    if os.path.exists(os.path.join(_data_dir, _file)):
+        os.environ.setdefault(f"{_name}_PATH", os.path.abspath(os.path.join(_data_dir, _file)))
+    else:
+        os.environ.setdefault(_name, "0")
+os.environ["LECO_DATA_DIR"] = tempfile.mkdtemp(prefix="leco-bench-")
+atexit.register(shutil.rmtree, os.environ["LECO_DATA_DIR"], True)
+os.environ["EMBEDDING_STORE"] = "0"
+
+import glob
+import numpy as np
+
+from benchmark.bench_splitter import load_judgments
+from benchmark.fakes import FakeEmbeddings, FakeLLM
+from src.rag.bm25 import HybridRetriever, build_bm25_index
+from src.rag.diversity import MMRRetriever
+from src.rag.embedded_store import EmbeddedClient
+from src.rag.file_loader import PDFLoader
+from src.rag.offline_rag import Offline_RAG
+from src.rag.registry import COLLECTIONS, RetrieverRegistry
+from src.rag.utils import LegalDocumentSplitter, LawDocumentSplitter
+from src.rag.vectorstore import VectorDB
+
+STAGES = ["embed", "search", "format", "prompt", "generate", "parse"]
+
+def load_questions(path="eval/eval.json"):
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    return {"judgment": config.get("judgment_questions", []), "law": config.get("law_questions", [])}
+
+def build_corpus(data_dir, limit):
+    judgments = LegalDocumentSplitter()(load_judgments(data_dir, limit))
+    laws = LawDocumentSplitter()(PDFLoader()(sorted(glob.glob(f"{data_dir}/*.pdf"))))
+    return {"judgment": judgments, "law": laws}
+
+def seed_store(client, embedding, corpus, with_bm25):
+    for source_type, chunks in corpus.items():
+        if not chunks:
+            continue
+        vector_db = VectorDB(
+            documents=chunks,
+            embedding=embedding,
+            client=client,
+            collection_name=COLLECTIONS[source_type]
+        )
+        client.optimize(vector_db.collection_name)
+        if with_bm25:
+            build_bm25_index(vector_db)
+
+def retrieve(vector_db, retriever, question, query_vector):
+    """The retriever's search with the query embedding computed by the caller"""
+    if isinstance(retriever, HybridRetriever):
+        dense = vector_db.search_by_vector(query_vector, k=retriever.fetch_k)
+        return retriever._fuse(dense, retriever._lexical(question))
+    if isinstance(retriever, MMRRetriever):
+        docs, vectors = vector_db.search_with_vectors(query_vector, k=retriever.fetch_k)
+        return retriever._select(query_vector, docs, vectors)
+    return vector_db.search_by_vector(query_vector, **retriever.search_kwargs)
+
+def run_stages(rag, registry, llm, question, source_type, embed_query, timings):
+    vector_db = registry.get_vector_db(source_type)
+    retriever = registry.get_retriever(source_type)
+
+    start = time.perf_counter()
+    query_vector = embed_query(question)
+    embedded = time.perf_counter()
+    docs = retrieve(vector_db, retriever, question, query_vector)
+    searched = time.perf_counter()
+    context = rag.format_docs(docs, source_type=source_type)
+    formatted = time.perf_counter()
+    prompt = rag.prompt.format(context=context, question=question, chat_history="")
+    prompted = time.perf_counter()
+    response = llm.invoke(prompt)
+    generated = time.perf_counter()
+    rag.parse_response(response)
+    parsed = time.perf_counter()
+
+    marks = [start, embedded, searched, formatted, prompted, generated, parsed]
+    for stage, (begin, end) in zip(STAGES, zip(marks, marks[1:])):
+        timings[stage].append(end - begin)
+    timings["total"].append(parsed - start)
+    return len(docs), len(prompt)
+
+def summarize(samples):
+    values = np.asarray(samples) * 1000
+    mean = values.mean()
+    return {
+        "p50": float(np.percentile(values, 50)),
+        "p95": float(np.percentile(values, 95)),
+        "p99": float(np.percentile(values, 99)),
+        "mean": float(mean),
+        "per_second": float(1000 / mean) if mean > 0 else float("inf")
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the RAG pipeline offline")
+    parser.add_argument("--data_dir", default="data_source/judgment", help="Judgment JSON files and law PDFs to index")
+    parser.add_argument("--limit", type=int, default=0, help="Judgments to index (0=all)")
+    parser.add_argument("--questions", default="eval/eval.json", help="Question sets (judgment_questions, law_questions)")
+    parser.add_argument("--rounds", type=int, default=50, help="Passes over the question sets")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed passes first")
+    parser.add_argument("--retrieval_mode", choices=["hybrid", "dense", "mmr"], default="hybrid")
+    parser.add_argument("--max_per_source", type=int, default=0, help="Chunks kept per source in hybrid and mmr retrieval (0=no cap)")
+    parser.add_argument("--embed_latency", type=float, default=0.0, help="Simulated embedding round trip (s)")
+    parser.add_argument("--llm_latency", type=float, default=0.0, help="Simulated Gemini latency (s)")
+    parser.add_argument("--embed_cache", action="store_true", help="Serve repeated query embeddings from the query cache")
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions)
+    setup_start = time.perf_counter()
+    corpus = build_corpus(args.data_dir, args.limit)
+    embedding = FakeEmbeddings()
+    client = EmbeddedClient(os.path.join(os.environ["LECO_DATA_DIR"], "vectors"))
+    seed_store(client, embedding, corpus, args.retrieval_mode == "hybrid")
+    setup_time = time.perf_counter() - setup_start
+
+    llm = FakeLLM(latency=args.llm_latency)
+    registry = RetrieverRegistry(
+        embedding=FakeEmbeddings(latency=args.embed_latency),
+        client=client,
+        retrieval_mode=args.retrieval_mode,
+        max_per_source=args.max_per_source
+    )
+    rag = Offline_RAG(llm, registry=registry)
+    cached_embedding = registry.embedding
+    embed_query = cached_embedding.embed_query if args.embed_cache else cached_embedding.embedding.embed_query
+
+    workload = [(question, source_type) for source_type, items in questions.items() if corpus[source_type]
+                for question in items]
+    for _ in range(args.warmup):
+        for question, source_type in workload:
+            run_stages(rag, registry, llm, question, source_type, embed_query, {stage: [] for stage in STAGES + ["total"]})
+
+    timings = {stage: [] for stage in STAGES + ["total"]}
+    retrieved, prompt_chars = [], []
+    wall_start = time.perf_counter()
+    for _ in range(args.rounds):
+        for question, source_type in workload:
+            docs, chars = run_stages(rag, registry, llm, question, source_type, embed_query, timings)
+            retrieved.append(docs)
+            prompt_chars.append(chars)
+    wall_time = time.perf_counter() - wall_start
+
+    # The real chain end to end, to check that the stage sum tracks it
+    chain = rag.get_chain()
+    chain_times = []
+    for _ in range(args.rounds):
+        for question, source_type in workload:
+            start = time.perf_counter()
+            chain({"question": question, "source_type": source_type, "chat_history": ""})
+            chain_times.append(time.perf_counter() - start)
+
+    results = {stage: summarize(samples) for stage, samples in timings.items()}
+    results["chain"] = summarize(chain_times)
+
+    print(f"Indexed {len(corpus['judgment'])} judgment and {len(corpus['law'])} law chunks "
+          f"into the embedded store in {setup_time:.1f}s ({args.retrieval_mode} retrieval)")
+    print(f"{len(workload)} questions x {args.rounds} rounds = {len(timings['total'])} requests, "
+          f"{len(timings['total']) / wall_time:.1f} requests/s, "
+          f"{np.mean(retrieved):.1f} chunks and {np.mean(prompt_chars):.0f} prompt chars per request")
+    print(f"{'stage':<10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>10}")
+    for stage, stats in results.items():
+        print(f"{stage:<10} {stats['p50']:>9.3f} {stats['p95']:>9.3f} {stats['p99']:>9.3f} {stats['per_second']:>10.0f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"requests": len(timings["total"]), "wall_time": wall_time, "stages": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
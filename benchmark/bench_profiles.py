@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Collection profiles on a Qdrant server: resident memory, search latency and recall@k against exact search"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import numpy as np
+from dotenv import load_dotenv
+from qdrant_client import QdrantClient, models
+
+from src.rag.profiles import (
+    COLLECTION_PROFILES, estimate_memory, get_profile, hnsw_config, quantization_config, search_params, vectors_config
+)
+
+load_dotenv()
+
+def clustered_vectors(num_points, num_queries, dim, clusters=64, seed=0):
+    """Unit vectors around random centroids (embeddings of a topical corpus are clustered, not uniform)"""
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(clusters, dim)).astype(np.float32)
+
+    def sample(n):
+        points = centroids[rng.integers(0, clusters, n)] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+        return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+    return sample(num_points), sample(num_queries)
+
+def server_resident_bytes(url):
+    """Qdrant process RSS from its Prometheus endpoint, or None when not exposed"""
+    try:
+        response = httpx.get(f"{url.rstrip('/')}/metrics", timeout=5)
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return None
+    for line in response.text.splitlines():
+        if line.startswith("memory_resident_bytes"):
+            return float(line.split()[-1])
+    return None
+
+def wait_indexed(client, collection_name, num_points, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        info = client.get_collection(collection_name)
+        if info.status == models.CollectionStatus.GREEN and (info.indexed_vectors_count or 0) >= num_points * 0.99:
+            return True
+        time.sleep(0.5)
+    return False
+
+def percentile_ms(values, q):
+    return float(np.percentile(values, q)) * 1000
+
+def bench_profile(client, url, name, points, queries, k, batch_size, timeout):
+    profile = get_profile(name)
+    collection_name = f"bench_profile_{name}"
+    client.delete_collection(collection_name)
+    baseline_rss = server_resident_bytes(url)
+
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=vectors_config(points.shape[1], profile),
+        hnsw_config=hnsw_config(profile),
+        quantization_config=quantization_config(profile)
+    )
+    start = time.perf_counter()
+    for i in range(0, len(points), batch_size):
+        batch = points[i:i+batch_size]
+        client.upsert(
+            collection_name=collection_name,
+            points=models.Batch(ids=list(range(i, i + len(batch))), vectors=batch.tolist()),
+            wait=False
+        )
+    indexed = wait_indexed(client, collection_name, len(points), timeout)
+    build_time = time.perf_counter() - start
+    loaded_rss = server_resident_bytes(url)
+
+    exact = models.SearchParams(exact=True, quantization=models.QuantizationSearchParams(ignore=True))
+    params = search_params(profile)
+    latencies = []
+    recalls = []
+    for query in queries:
+        query = query.tolist()
+        truth = client.query_points(collection_name, query=query, limit=k, search_params=exact).points
+        query_start = time.perf_counter()
+        found = client.query_points(collection_name, query=query, limit=k, search_params=params).points
+        latencies.append(time.perf_counter() - query_start)
+        truth_ids = {point.id for point in truth}
+        recalls.append(len(truth_ids & {point.id for point in found}) / max(1, len(truth_ids)))
+
+    client.delete_collection(collection_name)
+    memory = estimate_memory(len(points), points.shape[1], profile)
+    measured = None
+    if baseline_rss is not None and loaded_rss is not None:
+        measured = loaded_rss - baseline_rss
+    return {
+        "name": name,
+        "indexed": indexed,
+        "build_time": build_time,
+        "resident_estimate": memory["resident"],
+        "resident_measured": measured,
+        "p50": percentile_ms(latencies, 50),
+        "p95": percentile_ms(latencies, 95),
+        "recall": float(np.mean(recalls))
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark collection profiles on a Qdrant server")
+    parser.add_argument("--url", default=os.getenv("VECTOR_DB_URL"), help="Qdrant server URL (profiles need a real server)")
+    parser.add_argument("--profiles", nargs="+", default=list(COLLECTION_PROFILES), choices=list(COLLECTION_PROFILES))
+    parser.add_argument("--points", type=int, default=50000, help="Vectors per collection")
+    parser.add_argument("--dim", type=int, default=768, help="Vector size (embedding-001 produces 768)")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per profile")
+    parser.add_argument("--k", type=int, default=10, help="Results per query for recall@k")
+    parser.add_argument("--batch_size", type=int, default=512, help="Points per upsert")
+    parser.add_argument("--index_timeout", type=float, default=600, help="Seconds to wait for HNSW indexing")
+    args = parser.parse_args()
+
+    if not args.url:
+        parser.error("a Qdrant server is required (--url or VECTOR_DB_URL); local mode ignores HNSW and quantization settings")
+
+    client = QdrantClient(url=args.url, timeout=120)
+    points, queries = clustered_vectors(args.points, args.queries, args.dim)
+
+    results = [
+        bench_profile(client, args.url, name, points, queries, args.k, args.batch_size, args.index_timeout)
+        for name in args.profiles
+    ]
+
+    print(f"{args.points} vectors of dim {args.dim}, {args.queries} queries, recall@{args.k} vs exact search")
+    print(f"{'profile':<12} {'RAM est.':>10} {'RAM meas.':>10} {'build':>8} {'p50':>8} {'p95':>8} {'recall':>7}")
+    for result in results:
+        measured = result["resident_measured"]
+        measured = f"{measured / 2**20:.0f} MB" if measured is not None else "n/a"
+        note = "" if result["indexed"] else "  (indexing not finished)"
+        print(f"{result['name']:<12} {result['resident_estimate'] / 2**20:>7.0f} MB {measured:>10} "
+              f"{result['build_time']:>7.1f}s {result['p50']:>6.2f}ms {result['p95']:>6.2f}ms "
+              f"{result['recall']:>7.3f}{note}")
+
+if __name__ == "__main__":
+    main()
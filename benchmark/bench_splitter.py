@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Section/article segmentation and splitting: per-pattern regex passes vs the single-pass tokenizer"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document
+
+from benchmark.fakes import judgment_text
+from src.rag.file_loader import PDFLoader, get_page_cache
+from src.rag.sections import parallel_split
+from src.rag.utils import LegalDocumentSplitter, LawDocumentSplitter
+
+LEGACY_SECTION_PATTERNS = [r'THÔNG TIN VỤ ÁN', r'NỘI DUNG VỤ ÁN', r'NHẬN ĐỊNH CỦA TÒA ÁN', r'QUYẾT ĐỊNH']
+LEGACY_ARTICLE_PATTERN = re.compile(r'(Điều\s+\d+\.?\s*[^\n]*)', re.IGNORECASE)
+
+def legacy_sections(text):
+    """The previous LegalDocumentSplitter._split_by_sections: one finditer pass per heading"""
+    positions = []
+    for pattern in LEGACY_SECTION_PATTERNS:
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            positions.append((match.start(), match.group()))
+    positions.sort()
+    if not positions:
+        return [("DOCUMENT", text)]
+    sections = []
+    for i, (start, name) in enumerate(positions):
+        end = positions[i + 1][0] if i < len(positions) - 1 else len(text)
+        sections.append((name, text[start:end].strip()))
+    return sections
+
+def legacy_articles(text):
+    """The previous LawDocumentSplitter article scan, number lookup and context concatenation"""
+    matches = list(LEGACY_ARTICLE_PATTERN.finditer(text))
+    if not matches:
+        return [("DOCUMENT", text, "0", text)]
+    articles = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i < len(matches) - 1 else len(text)
+        articles.append((match.group(1).strip(), text[match.start():end].strip()))
+    results = []
+    for idx, (name, body) in enumerate(articles):
+        number_match = re.search(r'(\d+)', name)
+        number = number_match.group(1) if number_match else str(idx)
+        extended = ""
+        for j in range(max(0, idx - 2), min(len(articles), idx + 3)):
+            extended += articles[j][1] + "\n\n"
+        results.append((name, body, number, extended.strip()))
+    return results
+
+def new_articles(splitter, text):
+    articles = splitter._find_articles(text)
+    return [
+        (article.name(text), article.body(text), article.number or str(idx),
+         splitter._get_extended_context(text, articles, idx))
+        for idx, article in enumerate(articles)
+    ]
+
+def load_judgments(data_dir, limit):
+    cache = get_page_cache()
+    documents = []
+    for json_file in sorted(glob.glob(f"{data_dir}/*.json")):
+        with open(json_file, "r", encoding="utf-8") as f:
+            for item in json.load(f):
+                entry = cache.get(item["url"]) if cache is not None else None
+                text = entry["text"] if entry else judgment_text(item.get("title", ""))
+                documents.append(Document(page_content=text, metadata={"source": item["url"]}))
+    return documents[:limit] if limit else documents
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark legal document segmentation and splitting")
+    parser.add_argument("--data_dir", default="data_source/judgment", help="Bundled judgments and law PDF")
+    parser.add_argument("--limit", type=int, default=0, help="Judgments to use (0=all)")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions of the segmentation runs")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="Processes for parallel splitting")
+    args = parser.parse_args()
+
+    judgments = load_judgments(args.data_dir, args.limit)
+    laws = PDFLoader()(sorted(glob.glob(f"{args.data_dir}/*.pdf")))
+    judgment_splitter = LegalDocumentSplitter()
+    law_splitter = LawDocumentSplitter()
+
+    texts = [doc.page_content for doc in judgments]
+    legacy_time, legacy_result = timed(lambda: [legacy_sections(text) for text in texts], args.repeat)
+    new_time, new_result = timed(lambda: [judgment_splitter._split_by_sections(text) for text in texts], args.repeat)
+    assert legacy_result == new_result, "section segmentation differs"
+
+    law_texts = [doc.page_content for doc in laws]
+    legacy_law_time, legacy_law = timed(lambda: [legacy_articles(text) for text in law_texts], args.repeat)
+    new_law_time, new_law = timed(lambda: [new_articles(law_splitter, text) for text in law_texts], args.repeat)
+    assert legacy_law == new_law, "article segmentation differs"
+
+    sequential_time, sequential_chunks = timed(lambda: judgment_splitter(judgments), 1)
+    parallel_time, parallel_chunks = timed(lambda: parallel_split(judgment_splitter, judgments, args.processes), 1)
+    assert [c.page_content for c in sequential_chunks] == [c.page_content for c in parallel_chunks]
+
+    size = sum(len(text) for text in texts) / 1e6
+    print(f"{len(judgments)} judgments ({size:.1f}M chars), {len(laws)} law pages")
+    print(f"Sections, 4 regex passes:     {legacy_time * 1000:.1f} ms")
+    print(f"Sections, single pass:        {new_time * 1000:.1f} ms ({legacy_time / new_time:.1f}x)")
+    print(f"Articles, legacy scan:        {legacy_law_time * 1000:.1f} ms")
+    print(f"Articles, single pass:        {new_law_time * 1000:.1f} ms ({legacy_law_time / new_law_time:.1f}x)")
+    print(f"Split judgments, 1 process:   {sequential_time:.2f} s -> {len(sequential_chunks)} chunks")
+    print(f"Split judgments, {args.processes} processes: {parallel_time:.2f} s ({sequential_time / parallel_time:.1f}x)")
+
+if __name__ == "__main__":
+    main()
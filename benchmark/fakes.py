@@ -0,0 +1,259 @@
+import asyncio
+import glob
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+from typing import List
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, AIMessageChunk
+from qdrant_client import models
+from src.rag.ids import document_chunk_id
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic hash-based embeddings with an optional simulated round trip"""
+
+    def __init__(self, size: int = 256, latency: float = 0.0) -> None:
+        self.size = size
+        self.latency = latency
+        self.model = f"fake-embedding-{size}"
+        self.calls = 0
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.size)
+        return (vector / np.linalg.norm(vector)).astype(np.float32).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+class FakeLLM:
+    """Chat-model stand-in that answers with a fixed template after a simulated delay"""
+
+    def __init__(self, latency: float = 0.0, answer_words: int = 60, token_delay: float = 0.0) -> None:
+        self.latency = latency
+        self.token_delay = token_delay
+        self.answer = " ".join(["câu trả lời"] * (answer_words // 2))
+        self.calls = 0
+
+    def _text(self, prompt) -> str:
+        return f"Trả lời trực tiếp: {self.answer}"
+
+    def invoke(self, prompt, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return AIMessage(content=self._text(prompt))
+
+    async def ainvoke(self, prompt, **kwargs):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return AIMessage(content=self._text(prompt))
+
+    async def astream(self, prompt, **kwargs):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for token in self._text(prompt).split(" "):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield AIMessageChunk(content=token + " ")
+
+SECTIONS = ["THÔNG TIN VỤ ÁN", "NỘI DUNG VỤ ÁN", "NHẬN ĐỊNH CỦA TÒA ÁN", "QUYẾT ĐỊNH"]
+
+def judgment_fixtures(data_dir="data_source/judgment", limit=None, chunks_per_section=2):
+    """Offline stand-in chunks built from the judgment titles in data_source"""
+    documents = []
+    for json_file in sorted(glob.glob(f"{data_dir}/*.json")):
+        with open(json_file, "r", encoding="utf-8") as f:
+            items = json.load(f)
+        for item in items:
+            title = item.get("title", "")
+            url = item.get("url", "")
+            for section_idx, section in enumerate(SECTIONS):
+                for chunk_idx in range(chunks_per_section):
+                    body = (f"{section}. {title}. Tòa án xem xét yêu cầu ly hôn, quyền nuôi con "
+                            f"và chia tài sản chung của vợ chồng theo Điều {51 + chunk_idx} "
+                            f"Luật Hôn nhân và gia đình. ") * 6
+                    documents.append(Document(
+                        page_content=body,
+                        metadata={
+                            "source": url,
+                            "section": section,
+                            "chunk_index": f"J.{section_idx}.{chunk_idx}",
+                            "file_type": "json"
+                        }
+                    ))
+            if limit and len(documents) >= limit:
+                return documents[:limit]
+    return documents
+
+def seed_points(documents, embedding):
+    vectors = embedding.embed_documents([doc.page_content for doc in documents])
+    return [
+        models.PointStruct(
+            id=document_chunk_id(doc),
+            vector=vector,
+            payload={"page_content": doc.page_content, "metadata": doc.metadata}
+        )
+        for doc, vector in zip(documents, vectors)
+    ]
+
+def seed_collection(client, collection_name, documents, embedding):
+    if not client.collection_exists(collection_name):
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=models.VectorParams(size=embedding.size, distance=models.Distance.COSINE)
+        )
+    client.upsert(collection_name=collection_name, points=seed_points(documents, embedding))
+
+async def aseed_collection(client, collection_name, documents, embedding):
+    if not await client.collection_exists(collection_name):
+        await client.create_collection(
+            collection_name=collection_name,
+            vectors_config=models.VectorParams(size=embedding.size, distance=models.Distance.COSINE)
+        )
+    await client.upsert(collection_name=collection_name, points=seed_points(documents, embedding))
+
+def judgment_text(title: str, paragraphs: int = 12) -> str:
+    """Synthetic full-length judgment body with the four section headings"""
+    sections = []
+    for section_idx, section in enumerate(SECTIONS):
+        body = "\n\n".join(
+            f"{title}. Xét yêu cầu của nguyên đơn về việc ly hôn, nuôi con chung và chia tài sản chung theo "
+            f"Điều {51 + (section_idx + i) % 8} Luật Hôn nhân và gia đình năm 2014; các đương sự đã được "
+            f"Tòa án triệu tập hợp lệ, lời khai thống nhất về thời điểm kết hôn và tình trạng hôn nhân."
+            for i in range(paragraphs)
+        )
+        sections.append(f"{section}\n\n{body}")
+    return f"TÒA ÁN NHÂN DÂN\n{title}\n\n" + "\n\n".join(sections)
+
+def judgment_page(title: str) -> str:
+    sections = "\n".join(
+        f"<p>{section}</p><p>{title}. Tòa án xem xét yêu cầu ly hôn, quyền nuôi con và chia tài sản chung.</p>" * 3
+        for section in SECTIONS
+    )
+    return (f"<html><head><title>{title}</title></head><body><nav>Menu</nav>"
+            f"<div id=\"vanban_content\">{sections}</div><footer>Footer</footer></body></html>")
+
+class FixtureServer:
+    """Local stand-in for the judgment site: serves one fixture page per path.
+
+    Pages carry ETag/Last-Modified and answer conditional requests with 304.
+    latency simulates server time per request; above max_rps requests get a
+    429 with Retry-After, like a throttling origin.
+    """
+
+    LAST_MODIFIED = "Mon, 01 Apr 2024 00:00:00 GMT"
+
+    def __init__(self, pages: dict, latency: float = 0.0, max_rps: float = None) -> None:
+        self.pages = pages
+        self.latency = latency
+        self.max_rps = max_rps
+        self.requests = 0
+        self.not_modified = 0
+        self.throttled = 0
+        self._window = []
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _over_limit(self) -> bool:
+        if not self.max_rps:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._window = [t for t in self._window if now - t < 1.0]
+            if len(self._window) >= self.max_rps:
+                self.throttled += 1
+                return True
+            self._window.append(now)
+            return False
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                if server._over_limit():
+                    self.send_response(429)
+                    self.send_header("Retry-After", "1")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                page = server.pages.get(urlsplit(self.path).path)
+                if page is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = page.encode("utf-8")
+                etag = f"\"{hashlib.md5(body).hexdigest()}\""
+                if self.headers.get("If-None-Match") == etag:
+                    server.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", server.LAST_MODIFIED)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def url(self, path: str) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}{path}"
+
+    def __enter__(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+def judgment_site(data_dir="data_source/judgment", limit=None):
+    """{path: page} fixtures for every judgment URL in data_source"""
+    pages = {}
+    for json_file in sorted(glob.glob(f"{data_dir}/*.json")):
+        with open(json_file, "r", encoding="utf-8") as f:
+            for item in json.load(f):
+                if "url" in item:
+                    pages[urlsplit(item["url"]).path] = judgment_page(item.get("title", ""))
+    paths = list(pages)[:limit] if limit else list(pages)
+    return {path: pages[path] for path in paths}
@@ -1,21 +1,38 @@
 import os
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-from fastapi import FastAPI
+import json
+from typing import Optional
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
 from src.base.llm_model import get_gemini_llm
-from src.rag.main import build_rag_chain, InputQA, OutputQA
-from src.memory.user_memory import UserMemory
+from src.rag.main import build_async_rag_chain, InputQA, OutputQA
+from src.rag.registry import RetrieverRegistry
+from src.rag.answer_cache import build_answer_cache
+from src.memory.user_memory import build_user_memory
+from src.rag.metrics import METRICS, ServerTimingMiddleware, request_timings
 
 llm = get_gemini_llm(model="gemini-2.0-flash")
-dynamic_rag = build_rag_chain(llm)
-user_memory = UserMemory()
+retriever_registry = RetrieverRegistry()
+answer_cache = build_answer_cache(retriever_registry.embedding)
+dynamic_rag = build_async_rag_chain(llm, registry=retriever_registry, answer_cache=answer_cache)
+rag_chain = dynamic_rag.get_chain()
+rag_stream_chain = dynamic_rag.get_stream_chain()
+user_memory = build_user_memory()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await retriever_registry.awarmup()
+    yield
 
 app = FastAPI(
     title="LangChain Server",
     version="1.0",
     description="A simple api server using Langchain's Runnable interfaces",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -27,20 +44,69 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+if METRICS.enabled:
+    app.add_middleware(ServerTimingMiddleware)
+
 @app.get("/check")
 async def check():
     return {"status": "ok"}
 
+@app.get("/stats")
+async def stats():
+    stats = retriever_registry.stats()
+    if answer_cache is not None:
+        stats["answer_cache"] = answer_cache.stats()
+    return stats
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+def get_session_id(inputs: InputQA, x_session_id: Optional[str]):
+    return inputs.session_id or x_session_id
+
 @app.post("/judgment", response_model=OutputQA)
-async def judgment(inputs: InputQA):
-    user_id = "user-001"
-    chat_history = user_memory.get_summary(user_id)
+async def judgment(inputs: InputQA, x_session_id: Optional[str] = Header(default=None)):
+    user_id = get_session_id(inputs, x_session_id)
+    chat_history = await user_memory.aget_summary(user_id)
 
-    answer = dynamic_rag.get_chain()({
+    answer = await rag_chain({
         "question": inputs.question,
         "source_type": inputs.source_type,
+        "filters": inputs.filter_dict(),
         "chat_history": chat_history
     })
 
-    user_memory.update(user_id, inputs.question, answer)
-    return {"answer": answer}
\ No newline at end of file
+    await user_memory.aupdate(user_id, inputs.question, answer)
+    return {"answer": answer}
+
+@app.post("/judgment/stream")
+async def judgment_stream(inputs: InputQA, x_session_id: Optional[str] = Header(default=None)):
+    user_id = get_session_id(inputs, x_session_id)
+    chat_history = await user_memory.aget_summary(user_id)
+
+    async def event_stream():
+        tokens = []
+        async for token in rag_stream_chain({
+            "question": inputs.question,
+            "source_type": inputs.source_type,
+            "filters": inputs.filter_dict(),
+            "chat_history": chat_history
+        }):
+            tokens.append(token)
+            yield f"data: {json.dumps({'token': token}, ensure_ascii=False)}\n\n"
+
+        answer = "".join(tokens)
+        await user_memory.aupdate(user_id, inputs.question, answer)
+        done = {"answer": answer}
+        timings = request_timings()
+        if timings:
+            # Server-Timing went out with the headers before the chain ran, so report the stages here
+            done["timings_ms"] = {stage: round(seconds * 1000, 1) for stage, seconds in timings.items()}
+        yield f"event: done\ndata: {json.dumps(done, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,18 @@
+import math
+
+CHARS_PER_TOKEN = 3.0
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for Vietnamese text without calling the model tokenizer"""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def truncate_to_tokens(text: str, max_tokens: int, marker: str = " …") -> str:
+    """Cut text so estimate_tokens() of the result is at most max_tokens, ending with marker when cut"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = int(max(0, max_tokens) * CHARS_PER_TOKEN) - len(marker)
+    if max_chars <= 0:
+        return ""
+    return text[:max_chars].rstrip() + marker
@@ -1,13 +1,249 @@
+from collections import OrderedDict
+import asyncio
+import os
+import time
+import sqlite3
+import threading
+
+from src.base.tokens import estimate_tokens, truncate_to_tokens
+
+class InMemoryBackend:
+    """Session histories held in this process, ordered by last access"""
+
+    def __init__(self) -> None:
+        self.sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, session_id):
+        with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return [], None
+            return list(session["messages"]), session["last_access"]
+
+    def modify(self, session_id, apply, last_access):
+        """Replace the session's messages with apply(messages, previous last_access) atomically"""
+        with self._lock:
+            session = self.sessions.get(session_id)
+            messages = apply(list(session["messages"]), session["last_access"]) if session else apply([], None)
+            self.sessions[session_id] = {"messages": list(messages), "last_access": last_access}
+            self.sessions.move_to_end(session_id)
+
+    def touch(self, session_id, last_access):
+        with self._lock:
+            if session_id in self.sessions:
+                self.sessions[session_id]["last_access"] = last_access
+                self.sessions.move_to_end(session_id)
+
+    def delete(self, session_id):
+        with self._lock:
+            self.sessions.pop(session_id, None)
+
+    def evict(self, max_sessions, expire_before):
+        with self._lock:
+            while self.sessions:
+                session_id, session = next(iter(self.sessions.items()))
+                if len(self.sessions) > max_sessions or (expire_before is not None and session["last_access"] < expire_before):
+                    del self.sessions[session_id]
+                else:
+                    break
+
+    def count(self):
+        return len(self.sessions)
+
+class SQLiteBackend:
+    """Session histories in a SQLite file, shareable across uvicorn workers"""
+
+    def __init__(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, "
+            "role TEXT NOT NULL, content TEXT NOT NULL, tokens INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_access ON sessions (last_access)")
+
+    def load(self, session_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_access FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return [], None
+            messages = self._conn.execute(
+                "SELECT role, content, tokens FROM messages WHERE session_id = ? ORDER BY id",
+                (session_id,)
+            ).fetchall()
+            return [tuple(message) for message in messages], row[0]
+
+    def modify(self, session_id, apply, last_access):
+        """Replace the session's messages with apply(messages, previous last_access) in one
+        write transaction, so concurrent requests from other workers cannot lose an exchange"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT last_access FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                previous = self._conn.execute(
+                    "SELECT role, content, tokens FROM messages WHERE session_id = ? ORDER BY id",
+                    (session_id,)
+                ).fetchall() if row is not None else []
+                messages = apply([tuple(message) for message in previous], row[0] if row else None)
+                self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                self._conn.executemany(
+                    "INSERT INTO messages (session_id, role, content, tokens) VALUES (?, ?, ?, ?)",
+                    [(session_id, role, content, tokens) for role, content, tokens in messages]
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, last_access) VALUES (?, ?)",
+                    (session_id, last_access)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def touch(self, session_id, last_access):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE sessions SET last_access = ? WHERE session_id = ?", (last_access, session_id)
+            )
+
+    def delete(self, session_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def evict(self, max_sessions, expire_before):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if expire_before is not None:
+                    self._conn.execute("DELETE FROM sessions WHERE last_access < ?", (expire_before,))
+                self._conn.execute(
+                    "DELETE FROM sessions WHERE session_id IN ("
+                    "SELECT session_id FROM sessions ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (max_sessions,)
+                )
+                self._conn.execute(
+                    "DELETE FROM messages WHERE session_id NOT IN (SELECT session_id FROM sessions)"
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
 class UserMemory:
-    def __init__(self):
-        self.memory = {}
+    def __init__(self,
+                 backend=None,
+                 max_sessions: int = 10000,
+                 ttl: float = 24 * 3600,
+                 token_budget: int = 1500,
+                 sweep_interval: float = 60.0):
+        self.backend = backend or InMemoryBackend()
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.token_budget = token_budget
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+
+    def _is_expired(self, last_access, now):
+        return last_access is not None and self.ttl is not None and now - last_access > self.ttl
 
     def get_summary(self, user_id):
-        return "\n".join(self.memory.get(user_id, []))
+        if not user_id:
+            return ""
+        now = time.time()
+        messages, last_access = self.backend.load(user_id)
+        if self._is_expired(last_access, now):
+            self.backend.delete(user_id)
+            return ""
+        if last_access is not None:
+            self.backend.touch(user_id, now)
+        return "\n".join(content for _, content, _ in messages)
 
     def update(self, user_id, user_msg, bot_msg):
-        if user_id not in self.memory:
-            self.memory[user_id] = []
-        self.memory[user_id].append(f"User: {user_msg}")
-        self.memory[user_id].append(f"Bot: {bot_msg}")
-        self.memory[user_id] = self.memory[user_id][-10:]
+        if not user_id:
+            return
+        now = time.time()
+        new_exchange = self._fit_exchange(user_msg, bot_msg)
+
+        def append(messages, last_access):
+            if self._is_expired(last_access, now):
+                messages = []
+            exchanges = self._exchanges(messages)
+            exchanges.append(new_exchange)
+            # Drop whole exchanges from the oldest end; the one just added always stays
+            total_tokens = sum(tokens for exchange in exchanges for _, _, tokens in exchange)
+            while len(exchanges) > 1 and total_tokens > self.token_budget:
+                total_tokens -= sum(tokens for _, _, tokens in exchanges.pop(0))
+            return [message for exchange in exchanges for message in exchange]
+
+        self.backend.modify(user_id, append, now)
+        self._sweep(now)
+
+    # The SQLite backend may wait on other workers' write locks, so async handlers
+    # call these rather than blocking the event loop
+    async def aget_summary(self, user_id):
+        return await asyncio.to_thread(self.get_summary, user_id)
+
+    async def aupdate(self, user_id, user_msg, bot_msg):
+        await asyncio.to_thread(self.update, user_id, user_msg, bot_msg)
+
+    @staticmethod
+    def _exchanges(messages):
+        """Group stored messages into question/answer exchanges; each user message starts a new one"""
+        exchanges = []
+        for message in messages:
+            if message[0] == "user" or not exchanges:
+                exchanges.append([])
+            exchanges[-1].append(message)
+        return exchanges
+
+    def _fit_exchange(self, user_msg, bot_msg):
+        """The new exchange as messages, truncated to the token budget if it exceeds it on its own"""
+        user_content, bot_content = f"User: {user_msg}", f"Bot: {bot_msg}"
+        if estimate_tokens(user_content) + estimate_tokens(bot_content) > self.token_budget:
+            user_content = truncate_to_tokens(user_content, self.token_budget // 2)
+            bot_content = truncate_to_tokens(bot_content, self.token_budget - estimate_tokens(user_content))
+        return [(role, content, estimate_tokens(content)) for role, content in (("user", user_content), ("bot", bot_content))]
+
+    def _sweep(self, now):
+        if now - self._last_sweep < self.sweep_interval and self.backend.count() <= self.max_sessions:
+            return
+        self._last_sweep = now
+        expire_before = now - self.ttl if self.ttl is not None else None
+        self.backend.evict(self.max_sessions, expire_before)
+
+def build_user_memory() -> UserMemory:
+    """UserMemory configured from the environment (MEMORY_BACKEND=memory|sqlite)"""
+    backend_name = os.getenv("MEMORY_BACKEND", "memory").lower()
+    if backend_name == "sqlite":
+        from src.rag.index_state import data_path
+        backend = SQLiteBackend(os.getenv("MEMORY_DB_PATH") or data_path("memory.sqlite3"))
+    else:
+        backend = InMemoryBackend()
+    ttl = float(os.getenv("MEMORY_SESSION_TTL", 24 * 3600))
+    return UserMemory(
+        backend=backend,
+        max_sessions=int(os.getenv("MEMORY_MAX_SESSIONS", 10000)),
+        ttl=ttl if ttl > 0 else None,
+        token_budget=int(os.getenv("MEMORY_TOKEN_BUDGET", 1500))
+    )
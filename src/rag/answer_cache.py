@@ -0,0 +1,168 @@
+from typing import Optional
+import os
+import time
+import threading
+import numpy as np
+
+from src.rag.index_state import get_index_version
+from src.rag.registry import COLLECTIONS
+
+class _SourceEntries:
+    def __init__(self, version: int) -> None:
+        self.version = version
+        self.questions = []
+        self.answers = []
+        self.vectors = []
+        self.created = []
+        self.last_used = []
+        self.matrix = None
+
+    def __len__(self):
+        return len(self.answers)
+
+    def remove(self, idx: int):
+        for values in (self.questions, self.answers, self.vectors, self.created, self.last_used):
+            del values[idx]
+        self.matrix = None
+
+    def get_matrix(self):
+        if self.matrix is None:
+            self.matrix = np.vstack(self.vectors) if self.vectors else np.empty((0, 0), dtype=np.float32)
+        return self.matrix
+
+class SemanticAnswerCache:
+    """Returns a stored answer when a new question is a close paraphrase of a cached one.
+
+    Entries are kept per source_type and matched by cosine similarity of the
+    question embeddings. Each source_type is dropped as soon as the index
+    version of its collection changes, i.e. after load_data.py reindexes it.
+    """
+
+    def __init__(self,
+                 embedding,
+                 threshold: float = 0.95,
+                 max_entries: int = 1000,
+                 ttl: Optional[float] = 24 * 3600,
+                 collections: dict = None,
+                 version_check_interval: float = 1.0) -> None:
+        self.embedding = embedding
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.collections = collections or dict(COLLECTIONS)
+        self.version_check_interval = version_check_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = {}
+        self._last_version_check = {}
+        self._lock = threading.Lock()
+
+    def _collection_names(self, source_type: str):
+        names = self.collections.get(source_type, list(self.collections.values()))
+        return [names] if isinstance(names, str) else list(names)
+
+    def _current_version(self, source_type: str) -> int:
+        return max((get_index_version(name) for name in self._collection_names(source_type)), default=0)
+
+    def _get_entries(self, source_type: str) -> _SourceEntries:
+        now = time.time()
+        entries = self._entries.get(source_type)
+        if entries is not None and now - self._last_version_check.get(source_type, 0) < self.version_check_interval:
+            return entries
+
+        self._last_version_check[source_type] = now
+        version = self._current_version(source_type)
+        if entries is None or entries.version != version:
+            if entries is not None and len(entries):
+                self.invalidations += 1
+                print(f"Index for '{source_type}' changed, dropping {len(entries)} cached answers")
+            entries = _SourceEntries(version)
+            self._entries[source_type] = entries
+        return entries
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed(self, question: str) -> np.ndarray:
+        return self._normalize(self.embedding.embed_query(question))
+
+    async def aembed(self, question: str) -> np.ndarray:
+        return self._normalize(await self.embedding.aembed_query(question))
+
+    def lookup(self, vector: np.ndarray, source_type: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entries = self._get_entries(source_type)
+            if self.ttl is not None:
+                expired = [i for i, created in enumerate(entries.created) if now - created > self.ttl]
+                for idx in reversed(expired):
+                    entries.remove(idx)
+                    self.evictions += 1
+
+            if not len(entries):
+                self.misses += 1
+                return None
+
+            scores = entries.get_matrix() @ vector
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            entries.last_used[best] = now
+            self.hits += 1
+            return entries.answers[best]
+
+    def store(self, vector: np.ndarray, source_type: str, question: str, answer: str):
+        if not answer:
+            return
+        now = time.time()
+        with self._lock:
+            entries = self._get_entries(source_type)
+            while len(entries) >= self.max_entries:
+                entries.remove(int(np.argmin(entries.last_used)))
+                self.evictions += 1
+            entries.questions.append(question)
+            entries.answers.append(answer)
+            entries.vectors.append(vector)
+            entries.created.append(now)
+            entries.last_used.append(now)
+            entries.matrix = None
+
+    def clear(self, source_type: str = None):
+        with self._lock:
+            if source_type is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(source_type, None)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "threshold": self.threshold,
+            "size": {source_type: len(entries) for source_type, entries in self._entries.items()},
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+def build_answer_cache(embedding) -> Optional[SemanticAnswerCache]:
+    """Answer cache configured from the environment, or None when ANSWER_CACHE_THRESHOLD is 0"""
+    threshold = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.95))
+    if threshold <= 0:
+        return None
+    ttl = float(os.getenv("ANSWER_CACHE_TTL", 24 * 3600))
+    return SemanticAnswerCache(
+        embedding,
+        threshold=threshold,
+        max_entries=int(os.getenv("ANSWER_CACHE_SIZE", 1000)),
+        ttl=ttl if ttl > 0 else None
+    )
@@ -0,0 +1,244 @@
+from typing import Any, List, Optional
+from collections import Counter, defaultdict
+import asyncio
+import gzip
+import json
+import os
+import re
+import time
+import threading
+import unicodedata
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src.rag.diversity import cap_per_source
+from src.rag.filters import matches
+from src.rag.index_state import data_path
+from src.rag.metrics import span
+
+WORD_PATTERN = re.compile(r"\w+")
+CASE_ID_PATTERN = re.compile(r"\d+/\d{4}/[\w\-–]+")
+ARTICLE_PATTERN = re.compile(r"\b(điều|khoản|chương|mục)\s+(\d+)")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens plus whole case numbers and 'điều_51'-style article references"""
+    text = unicodedata.normalize("NFC", text).lower()
+    tokens = WORD_PATTERN.findall(text)
+    tokens.extend(CASE_ID_PATTERN.findall(text))
+    tokens.extend(f"{kind}_{number}" for kind, number in ARTICLE_PATTERN.findall(text))
+    return tokens
+
+def bm25_path(collection_name: str) -> str:
+    return data_path("bm25", f"{collection_name}.json.gz")
+
+class BM25Index:
+    """Okapi BM25 inverted index over the chunks of one collection.
+
+    postings (term -> [(doc_idx, tf)]) is what gets saved; searches use a
+    compiled CSR layout of the same postings with each entry's BM25 term
+    weight precomputed, so a query term costs one slice and one vector add.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self.payloads = []
+        self.doc_lengths = []
+        self.postings = {}
+        self.avg_length = 0.0
+        self._compiled = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, points, **kwargs) -> "BM25Index":
+        """points: iterable of (point_id, page_content, metadata)"""
+        index = cls(**kwargs)
+        postings = defaultdict(list)
+        for point_id, page_content, metadata in points:
+            doc_idx = len(index.ids)
+            counts = Counter(tokenize(page_content))
+            for term, tf in counts.items():
+                postings[term].append((doc_idx, tf))
+            index.ids.append(point_id)
+            index.payloads.append({"page_content": page_content, "metadata": metadata})
+            index.doc_lengths.append(sum(counts.values()))
+        index.postings = dict(postings)
+        index.avg_length = sum(index.doc_lengths) / len(index.doc_lengths) if index.doc_lengths else 0.0
+        return index
+
+    def _compile(self):
+        """(term -> slot, indptr, doc indices, idf * BM25 term weight) built from postings"""
+        n_docs = len(self.ids)
+        terms = {}
+        indptr = np.zeros(len(self.postings) + 1, dtype=np.int64)
+        for slot, (term, postings) in enumerate(self.postings.items()):
+            terms[term] = slot
+            indptr[slot + 1] = indptr[slot] + len(postings)
+        entries = np.fromiter(
+            (value for postings in self.postings.values() for posting in postings for value in posting),
+            dtype=np.int64, count=2 * int(indptr[-1])
+        ).reshape(-1, 2)
+        doc_indices = entries[:, 0].astype(np.int32)
+        tf = entries[:, 1].astype(np.float64)
+        doc_lengths = np.asarray(self.doc_lengths, dtype=np.float64)
+        norm = self.k1 * (1 - self.b + self.b * doc_lengths[doc_indices] / (self.avg_length or 1.0))
+        df = np.diff(indptr).astype(np.float64)
+        idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        weights = np.repeat(idf, np.diff(indptr)) * tf * (self.k1 + 1) / (tf + norm)
+        return terms, indptr, doc_indices, weights.astype(np.float32)
+
+    def search(self, query: str, k: int = 5, filters: dict = None):
+        """Return [(doc_idx, score)] for the k best-matching chunks, only among chunks matching filters"""
+        if not self.ids or k <= 0:
+            return []
+        if self._compiled is None:
+            self._compiled = self._compile()
+        terms, indptr, doc_indices, weights = self._compiled
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            slot = terms.get(term)
+            if slot is None:
+                continue
+            start, end = indptr[slot], indptr[slot + 1]
+            # A term lists each chunk once, so plain fancy-index addition is exact
+            scores[doc_indices[start:end]] += weights[start:end]
+        candidates = np.flatnonzero(scores)
+        if filters:
+            candidates = np.fromiter(
+                (doc_idx for doc_idx in candidates if matches(self.payloads[doc_idx]["metadata"] or {}, filters)),
+                dtype=np.int64
+            )
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(doc_idx), float(scores[doc_idx])) for doc_idx in candidates]
+
+    def get_document(self, doc_idx: int, score: float = None) -> Document:
+        payload = self.payloads[doc_idx]
+        metadata = dict(payload["metadata"] or {})
+        metadata["_id"] = self.ids[doc_idx]
+        if score is not None:
+            metadata["bm25_score"] = score
+        return Document(page_content=payload["page_content"], metadata=metadata)
+
+    def save(self, path: str):
+        data = {
+            "k1": self.k1,
+            "b": self.b,
+            "ids": self.ids,
+            "payloads": self.payloads,
+            "doc_lengths": self.doc_lengths,
+            "postings": self.postings
+        }
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        index.ids = data["ids"]
+        index.payloads = data["payloads"]
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = {term: [tuple(p) for p in postings] for term, postings in data["postings"].items()}
+        index.avg_length = sum(index.doc_lengths) / len(index.doc_lengths) if index.doc_lengths else 0.0
+        index._compiled = index._compile()
+        return index
+
+class BM25Store:
+    """Loads a persisted BM25 index and reloads it when load_data.py rewrites the file"""
+
+    def __init__(self, path: str, check_interval: float = 5.0) -> None:
+        self.path = path
+        self.check_interval = check_interval
+        self._index = None
+        self._mtime = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def get(self) -> Optional[BM25Index]:
+        now = time.time()
+        if self._index is not None and now - self._last_check < self.check_interval:
+            return self._index
+        with self._lock:
+            self._last_check = now
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                return self._index
+            if mtime != self._mtime:
+                self._index = BM25Index.load(self.path)
+                self._mtime = mtime
+                print(f"Loaded BM25 index with {len(self._index)} chunks from {self.path}")
+        return self._index
+
+def reciprocal_rank_fusion(rankings, k: int, rrf_k: int = 60) -> List[Document]:
+    """Fuse several ranked document lists; documents are matched on their Qdrant point id"""
+    scores = defaultdict(float)
+    documents = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = doc.metadata.get("_id") or doc.page_content
+            scores[key] += 1.0 / (rrf_k + rank + 1)
+            documents.setdefault(key, doc)
+    fused = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+    results = []
+    for key, score in fused:
+        doc = documents[key]
+        doc.metadata["rrf_score"] = score
+        results.append(doc)
+    return results
+
+class HybridRetriever(BaseRetriever):
+    """Dense Qdrant search fused with the local BM25 index by reciprocal-rank fusion"""
+    vector_db: Any
+    bm25_store: Any
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = 60
+    max_per_source: int = 0
+
+    def _fuse(self, dense: List[Document], lexical: List[Document]) -> List[Document]:
+        if self.max_per_source <= 0:
+            return reciprocal_rank_fusion([dense, lexical], self.k, self.rrf_k)
+        fused = reciprocal_rank_fusion([dense, lexical], self.fetch_k, self.rrf_k)
+        return cap_per_source(fused, self.k, self.max_per_source)
+
+    def _lexical(self, query: str, filters: dict = None) -> List[Document]:
+        index = self.bm25_store.get()
+        if index is None:
+            return []
+        with span("bm25"):
+            return [index.get_document(doc_idx, score) for doc_idx, score in index.search(query, self.fetch_k, filters)]
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None, filters: dict = None) -> List[Document]:
+        dense = self.vector_db.search(query, k=self.fetch_k, filters=filters)
+        return self._fuse(dense, self._lexical(query, filters))
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None, filters: dict = None) -> List[Document]:
+        # BM25 scoring is CPU work: keep it off the event loop and overlap it with the dense round trip
+        dense, lexical = await asyncio.gather(
+            self.vector_db.asearch(query, k=self.fetch_k, filters=filters),
+            asyncio.to_thread(self._lexical, query, filters)
+        )
+        return self._fuse(dense, lexical)
+
+def build_bm25_index(vector_db, path: str = None) -> BM25Index:
+    """Build the BM25 index from every chunk stored in a VectorDB collection and persist it"""
+    path = path or bm25_path(vector_db.collection_name)
+    start_time = time.time()
+    index = BM25Index.build(vector_db.scroll_points())
+    index.save(path)
+    print(f"Built BM25 index over {len(index)} chunks of '{vector_db.collection_name}' "
+          f"in {time.time() - start_time:.2f} seconds -> {path}")
+    return index
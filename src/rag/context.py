@@ -0,0 +1,150 @@
+from typing import List, Optional
+from langchain_core.documents import Document
+
+from src.base.tokens import estimate_tokens
+
+def parse_chunk_index(chunk_index: str):
+    """Split 'J.<section>.<chunk>' / 'L.<article>.<chunk>' into (group, position)"""
+    if not chunk_index:
+        return None
+    parts = str(chunk_index).split('.')
+    try:
+        if len(parts) >= 3 and parts[0] in ['L', 'J']:
+            return (parts[0], parts[1]), int(parts[2])
+        if len(parts) == 2:
+            return parts[0], int(parts[1])
+    except ValueError:
+        pass
+    return None
+
+def find_overlap(left: str, right: str, max_overlap: int, min_overlap: int = 20) -> int:
+    """Length of the longest suffix of left that is also a prefix of right"""
+    limit = min(len(left), len(right), max_overlap)
+    for size in range(limit, min_overlap - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+class ContextBlock:
+    def __init__(self, doc: Document) -> None:
+        self.docs = [doc]
+        self.text = doc.page_content
+
+    @property
+    def metadata(self):
+        return self.docs[0].metadata
+
+    @property
+    def chunk_index(self):
+        first = self.docs[0].metadata.get("chunk_index", "")
+        last = self.docs[-1].metadata.get("chunk_index", "")
+        return first if first == last else f"{first}-{last}"
+
+class ContextPacker:
+    """Selects retrieved chunks up to a token budget and merges adjacent chunks.
+
+    Chunks are taken in retrieval order until max_tokens is reached, skipping
+    repeats of the same point. Chunks with consecutive chunk_index values are
+    stitched into one block with the splitter's overlapping region removed when
+    they were split from the same section or article (same parent_id), or, for
+    chunks indexed without a parent_id, when their texts actually overlap; law
+    chunk indexes repeat across pages, so position alone proves nothing. The
+    overlap saving is counted when deciding what still fits.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, chunk_overlap: int = 200) -> None:
+        self.max_tokens = max_tokens
+        self.chunk_overlap = chunk_overlap
+
+    @staticmethod
+    def _identity(doc):
+        metadata = doc.metadata
+        identity = metadata.get("doc_id") or metadata.get("_id")
+        if identity is not None:
+            return str(identity)
+        return metadata.get("source", ""), metadata.get("chunk_index", ""), doc.page_content
+
+    @staticmethod
+    def _key(doc):
+        parsed = parse_chunk_index(doc.metadata.get("chunk_index", ""))
+        if parsed is None:
+            return None
+        group, position = parsed
+        return doc.metadata.get("parent_id") or doc.metadata.get("source", ""), group, position
+
+    def _overlap(self, left: Document, right: Document) -> int:
+        return find_overlap(left.page_content, right.page_content, self.chunk_overlap + 50)
+
+    def _join(self, left: Document, right: Document) -> Optional[int]:
+        """Characters at the start of right already ending left when right continues left, else None"""
+        overlap = self._overlap(left, right)
+        parent = left.metadata.get("parent_id")
+        if overlap or (parent is not None and parent == right.metadata.get("parent_id")):
+            return overlap
+        return None
+
+    def select(self, docs: List[Document], max_tokens: Optional[int] = None) -> List[Document]:
+        max_tokens = self.max_tokens if max_tokens is None else max_tokens
+        selected = []
+        seen = set()
+        by_key = {}
+        used_tokens = 0
+
+        for doc in docs:
+            identity = self._identity(doc)
+            if identity in seen:
+                continue
+
+            key = self._key(doc)
+            saved_chars = 0
+            if key is not None:
+                parent, group, position = key
+                joins = [self._join(previous, doc) for previous in by_key.get((parent, group, position - 1), [])]
+                joins += [self._join(doc, following) for following in by_key.get((parent, group, position + 1), [])]
+                saved_chars = sum(sorted((join for join in joins if join), reverse=True)[:2])
+
+            cost = estimate_tokens(doc.page_content) - estimate_tokens(doc.page_content[:saved_chars])
+            if max_tokens is not None and used_tokens + cost > max_tokens:
+                continue
+
+            used_tokens += cost
+            selected.append(doc)
+            seen.add(identity)
+            if key is not None:
+                by_key.setdefault(key, []).append(doc)
+
+        return selected
+
+    def merge(self, docs: List[Document]) -> List[ContextBlock]:
+        blocks = []
+        keyed = []
+        for doc in docs:
+            key = self._key(doc)
+            if key is None:
+                blocks.append(ContextBlock(doc))
+            else:
+                keyed.append((key, doc))
+
+        keyed.sort(key=lambda item: (item[0][0], str(item[0][1]), item[0][2]))
+        # Blocks by the key of their last chunk; several when chunk indexes repeat
+        tails = {}
+        for key, doc in keyed:
+            parent, group, position = key
+            for block in tails.get((parent, group, position - 1), []):
+                overlap = self._join(block.docs[-1], doc)
+                if overlap is None:
+                    continue
+                tails[(parent, group, position - 1)].remove(block)
+                separator = "" if overlap else "\n"
+                block.text = f"{block.text}{separator}{doc.page_content[overlap:]}"
+                block.docs.append(doc)
+                break
+            else:
+                block = ContextBlock(doc)
+                blocks.append(block)
+            tails.setdefault(key, []).append(block)
+
+        return blocks
+
+    def pack(self, docs: List[Document], max_tokens: Optional[int] = None) -> List[ContextBlock]:
+        return self.merge(self.select(docs, max_tokens=max_tokens))
@@ -0,0 +1,110 @@
+from typing import Any, List, Optional, Sequence
+from collections import Counter
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src.rag.metrics import span
+
+def source_key(doc: Document) -> tuple:
+    """Unit the per-source cap counts: one judgment, or one article of a law (a statute is a single PDF source)"""
+    return doc.metadata.get("source", ""), doc.metadata.get("article")
+
+def mmr_select(query_vector,
+               candidate_vectors,
+               k: int,
+               lambda_mult: float = 0.5,
+               sources: Optional[Sequence] = None,
+               max_per_source: int = 0) -> List[tuple]:
+    """Maximal marginal relevance over the candidates; returns (index, mmr_score) in selection order.
+
+    Each step picks the candidate maximizing
+    lambda_mult * sim(query, c) - (1 - lambda_mult) * max sim(c, selected),
+    with cosine similarities. When max_per_source > 0, candidates whose entry
+    in sources (any hashable) already has that many selected chunks are skipped.
+    """
+    vectors = np.asarray(candidate_vectors, dtype=np.float32)
+    if vectors.ndim != 2 or not len(vectors) or k <= 0:
+        return []
+    query = np.asarray(query_vector, dtype=np.float32)
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = vectors @ query
+    redundancy = np.full(len(vectors), -np.inf, dtype=np.float32)
+    available = np.ones(len(vectors), dtype=bool)
+    if max_per_source > 0 and sources is not None:
+        keys = {}
+        source_ids = np.fromiter((keys.setdefault(source, len(keys)) for source in sources), dtype=np.int64, count=len(sources))
+        per_source = np.zeros(len(keys), dtype=np.int32)
+    else:
+        source_ids = None
+
+    selected = []
+    while len(selected) < k and available.any():
+        if selected:
+            scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        else:
+            scores = relevance.copy()
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append((best, float(scores[best])))
+        available[best] = False
+        # Only the new pick can raise a candidate's max similarity to the selected set
+        np.maximum(redundancy, vectors @ vectors[best], out=redundancy)
+        if source_ids is not None:
+            per_source[source_ids[best]] += 1
+            if per_source[source_ids[best]] >= max_per_source:
+                available &= source_ids != source_ids[best]
+    return selected
+
+def cap_per_source(docs: List[Document], k: int, max_per_source: int = 0) -> List[Document]:
+    """First k documents in ranking order, keeping at most max_per_source per source_key (0 keeps all)"""
+    if max_per_source <= 0:
+        return docs[:k]
+    counts = Counter()
+    results = []
+    for doc in docs:
+        key = source_key(doc)
+        if counts[key] >= max_per_source:
+            continue
+        counts[key] += 1
+        results.append(doc)
+        if len(results) == k:
+            break
+    return results
+
+class MMRRetriever(BaseRetriever):
+    """Dense search over fetch_k candidates re-ranked for diversity by MMR with a per-source cap.
+
+    Candidates come back from Qdrant with their stored vectors, so the
+    re-ranking needs no extra embedding calls.
+    """
+    vector_db: Any
+    k: int = 5
+    fetch_k: int = 20
+    lambda_mult: float = 0.5
+    max_per_source: int = 0
+
+    def _select(self, query_vector, docs: List[Document], vectors) -> List[Document]:
+        with span("mmr"):
+            sources = [source_key(doc) for doc in docs]
+            selected = mmr_select(query_vector, vectors, self.k, self.lambda_mult, sources, self.max_per_source)
+        results = []
+        for idx, score in selected:
+            doc = docs[idx]
+            doc.metadata["mmr_score"] = score
+            results.append(doc)
+        return results
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None, filters: dict = None) -> List[Document]:
+        with span("embed"):
+            query_vector = self.vector_db.embedding.embed_query(query)
+        docs, vectors = self.vector_db.search_with_vectors(query_vector, k=self.fetch_k, filters=filters)
+        return self._select(query_vector, docs, vectors)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None, filters: dict = None) -> List[Document]:
+        with span("embed"):
+            query_vector = await self.vector_db.embedding.aembed_query(query)
+        docs, vectors = await self.vector_db.asearch_with_vectors(query_vector, k=self.fetch_k, filters=filters)
+        return self._select(query_vector, docs, vectors)
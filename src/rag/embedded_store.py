@@ -0,0 +1,704 @@
+from typing import Dict, List, Optional
+from types import SimpleNamespace
+import asyncio
+import datetime
+import functools
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import numpy as np
+from qdrant_client import models
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process coordination
+    fcntl = None
+
+EMBEDDED_SCHEME = "embedded://"
+# Below this many points IVF lists would hold a handful of rows each; search exactly instead
+IVF_MIN_ROWS = 256
+PAYLOAD_KEY_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$")
+
+def is_embedded(location: Optional[str]) -> bool:
+    return bool(location) and location.startswith(EMBEDDED_SCHEME)
+
+def _point_id(value: str):
+    return int(value) if value.isdigit() else value
+
+def _json_path(key: str) -> str:
+    """JSON path literal for a payload key; keys are validated because the path is written into the SQL"""
+    if not PAYLOAD_KEY_PATTERN.match(key):
+        raise ValueError(f"Unsupported payload key '{key}' in embedded store")
+    return "$." + key
+
+def _column(key: str) -> str:
+    # Same text as the expression indexes built by create_payload_index, so SQLite can use them
+    return f"json_extract(payload, '{_json_path(key)}')"
+
+def _bound(value):
+    """Range bound comparable with ISO date strings stored in payloads"""
+    if isinstance(value, datetime.datetime):
+        if value.time() == datetime.time(0) and value.tzinfo in (None, datetime.timezone.utc):
+            return value.date().isoformat()
+        return value.isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return value
+
+def _condition_sql(condition, params: list) -> str:
+    if isinstance(condition, models.Filter):
+        return _filter_sql(condition, params)
+    if isinstance(condition, models.HasIdCondition):
+        params.extend(str(point_id) for point_id in condition.has_id)
+        return f"id IN ({', '.join('?' * len(condition.has_id))})"
+    if not isinstance(condition, models.FieldCondition):
+        raise NotImplementedError(f"Embedded store does not support {type(condition).__name__} filters")
+
+    column = _column(condition.key)
+    if condition.match is not None:
+        match = condition.match
+        if isinstance(match, models.MatchValue):
+            params.append(match.value)
+            return f"{column} = ?"
+        if isinstance(match, models.MatchAny):
+            params.extend(match.any)
+            return f"{column} IN ({', '.join('?' * len(match.any))})"
+        if isinstance(match, models.MatchExcept):
+            params.extend(match.except_)
+            return f"{column} NOT IN ({', '.join('?' * len(match.except_))})"
+        raise NotImplementedError(f"Embedded store does not support {type(match).__name__}")
+    if condition.range is not None:
+        clauses = []
+        for attr, op in (("gt", ">"), ("gte", ">="), ("lt", "<"), ("lte", "<=")):
+            value = getattr(condition.range, attr, None)
+            if value is not None:
+                params.append(_bound(value))
+                clauses.append(f"{column} {op} ?")
+        if not clauses:
+            return "1"
+        return " AND ".join(clauses)
+    raise NotImplementedError(f"Embedded store only supports match and range conditions on '{condition.key}'")
+
+class _FileLock:
+    """flock on a file in the collection directory; a no-op where fcntl is unavailable"""
+
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "a+b")
+
+    def _flock(self, operation) -> bool:
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self._file, operation)
+            return True
+        except BlockingIOError:
+            return False
+
+    def share(self):
+        self._flock(fcntl.LOCK_SH if fcntl else 0)
+
+    def try_exclusive(self) -> bool:
+        """Exclusive without waiting; the lock is left shared when another process holds it"""
+        if self._flock(fcntl.LOCK_EX | fcntl.LOCK_NB if fcntl else 0):
+            return True
+        # flock drops the shared lock when an upgrade fails, so take it back
+        self.share()
+        return False
+
+    def release(self):
+        self._flock(fcntl.LOCK_UN if fcntl else 0)
+        self._file.close()
+
+def _lock_file(path: str, shared: bool) -> _FileLock:
+    lock = _FileLock(path)
+    if shared:
+        lock.share()
+    return lock
+
+class _WriteLock:
+    """Exclusive lock serializing writers across processes, released on leaving the with block"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = None
+
+    def acquire(self):
+        self._lock = _FileLock(self.path)
+        self._lock._flock(fcntl.LOCK_EX if fcntl else 0)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+        return False
+
+def _filter_sql(query_filter: models.Filter, params: list) -> str:
+    clauses = []
+    for condition in query_filter.must or []:
+        clauses.append(f"({_condition_sql(condition, params)})")
+    if query_filter.should:
+        should = [f"({_condition_sql(condition, params)})" for condition in query_filter.should]
+        clauses.append(f"({' OR '.join(should)})")
+    for condition in query_filter.must_not or []:
+        clauses.append(f"NOT ({_condition_sql(condition, params)})")
+    return " AND ".join(clauses) or "1"
+
+class EmbeddedCollection:
+    """One collection on disk: a memory-mapped float32 matrix plus point ids and payloads in SQLite.
+
+    Row i of vectors.f32 belongs to the point stored with idx = i; deleted
+    rows are tombstoned and dropped by compact(). Cosine vectors are stored
+    normalized so scores are plain dot products.
+
+    Search is exact (one matrix-vector product) below ivf_min_points, and
+    always below IVF_MIN_ROWS, too few rows to train lists on. Above
+    it an inverted-file index is trained with k-means over the rows and a
+    query only scores the nprobe closest lists, plus the rows appended since
+    the index was built. Filtered searches resolve the filter in SQLite and
+    score just the matching rows exactly.
+
+    Several processes may open the same directory, e.g. the server while
+    load_data.py indexes. Every open collection holds a shared lock on its
+    "lock" file, and writes are serialized through an exclusive lock on
+    "write.lock". A process reloads ids, rows and the matrix when SQLite
+    reports a commit from another connection. Vectors are written before the
+    rows that point at them are committed. compact() renumbers rows, so it
+    only runs when no other process has the collection open, and
+    EmbeddedClient.delete_collection refuses to remove it in that case.
+    """
+
+    def __init__(self, path: str, index: str = "auto", nprobe: int = 16, ivf_min_points: int = 20000) -> None:
+        self.path = path
+        self.index = index
+        self.nprobe = nprobe
+        self.ivf_min_points = ivf_min_points
+        self._lock = threading.RLock()
+        with open(os.path.join(path, "config.json"), "r", encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.size = self.config["size"]
+        self.distance = models.Distance(self.config["distance"])
+
+        self._conn = sqlite3.connect(os.path.join(path, "points.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS points (idx INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, payload TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+        self._open_lock = _lock_file(os.path.join(path, "lock"), shared=True)
+        self.vectors = None
+        self._load_state()
+
+    def _load_state(self):
+        """(Re)read ids and rows from SQLite and map the matrix and IVF index that match them"""
+        rows = self._conn.execute("SELECT idx, id FROM points").fetchall()
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self.num_rows = max((idx for idx, _ in rows), default=-1) + 1
+        self.alive = np.zeros(max(self.num_rows, 1), dtype=bool)
+        self.idx_by_id = {}
+        for idx, point_id in rows:
+            self.alive[idx] = True
+            self.idx_by_id[point_id] = idx
+        self.vectors = self._open_vectors(max(self.num_rows, 1024))
+        with open(os.path.join(self.path, "config.json"), "r", encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.ivf = self._load_ivf()
+
+    def refresh(self):
+        """Pick up points committed by another process since the last call"""
+        with self._lock:
+            if self._conn.execute("PRAGMA data_version").fetchone()[0] != self._data_version:
+                self._load_state()
+
+    def _write_lock(self) -> _WriteLock:
+        """Take the cross-process write lock and catch up with whatever the previous writer committed"""
+        lock = _WriteLock(os.path.join(self.path, "write.lock"))
+        lock.acquire()
+        self.refresh()
+        return lock
+
+    @classmethod
+    def create(cls, path: str, size: int, distance: models.Distance, **kwargs) -> "EmbeddedCollection":
+        if distance not in (models.Distance.COSINE, models.Distance.DOT):
+            raise ValueError(f"Embedded store supports COSINE and DOT distance, not {distance}")
+        os.makedirs(path, exist_ok=True)
+        config = {"size": size, "distance": distance.value, "payload_indexes": {}}
+        with open(os.path.join(path, "config.json"), "w", encoding="utf-8") as f:
+            json.dump(config, f)
+        return cls(path, **kwargs)
+
+    def _vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.f32")
+
+    def _open_vectors(self, capacity: int) -> np.memmap:
+        path = self._vectors_path()
+        nbytes = capacity * self.size * 4
+        if not os.path.exists(path) or os.path.getsize(path) < nbytes:
+            with open(path, "ab") as f:
+                f.truncate(nbytes)
+        capacity = os.path.getsize(path) // (self.size * 4)
+        return np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, self.size))
+
+    def _reserve(self, rows: int):
+        if rows > len(self.vectors):
+            self.vectors.flush()
+            self.vectors = self._open_vectors(max(rows, 2 * len(self.vectors)))
+        if rows > len(self.alive):
+            alive = np.zeros(max(rows, 2 * len(self.alive)), dtype=bool)
+            alive[:len(self.alive)] = self.alive
+            self.alive = alive
+
+    def _prepare(self, vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.size)
+        if self.distance == models.Distance.COSINE:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        return vectors
+
+    def __len__(self):
+        return len(self.idx_by_id)
+
+    def upsert(self, ids: List, vectors, payloads: List[dict]):
+        vectors = self._prepare(vectors)
+        # An id repeated within the batch keeps its last copy, as in Qdrant; giving each
+        # copy a row would leave the earlier ones alive in the matrix but gone from SQLite
+        last = {str(point_id): i for i, point_id in enumerate(ids)}
+        if len(last) < len(ids):
+            keep = sorted(last.values())
+            ids, vectors, payloads = [ids[i] for i in keep], vectors[keep], [payloads[i] for i in keep]
+        with self._lock, self._write_lock():
+            rows = []
+            new_rows = 0
+            for point_id in ids:
+                idx = self.idx_by_id.get(str(point_id))
+                if idx is None:
+                    idx = self.num_rows + new_rows
+                    new_rows += 1
+                rows.append(idx)
+            self._reserve(self.num_rows + new_rows)
+            # Content-addressed ids mean an existing id gets the same vector, so IVF assignments stay valid
+            self.vectors[rows] = vectors
+            # Readers in other processes only look at rows committed to SQLite, so the vectors go first
+            self.vectors.flush()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO points (idx, id, payload) VALUES (?, ?, ?)",
+                [(idx, str(point_id), json.dumps(payload or {}, ensure_ascii=False))
+                 for idx, point_id, payload in zip(rows, ids, payloads)]
+            )
+            self._conn.commit()
+            for idx, point_id in zip(rows, ids):
+                self.idx_by_id[str(point_id)] = idx
+                self.alive[idx] = True
+            self.num_rows += new_rows
+
+    def delete(self, ids: List):
+        with self._lock:
+            with self._write_lock():
+                rows = [self.idx_by_id.pop(str(point_id)) for point_id in ids if str(point_id) in self.idx_by_id]
+                if not rows:
+                    return
+                self._conn.executemany("DELETE FROM points WHERE idx = ?", [(idx,) for idx in rows])
+                self._conn.commit()
+                self.alive[rows] = False
+            if self.num_rows and len(self) < 0.75 * self.num_rows:
+                self.compact()
+
+    def compact(self) -> bool:
+        """Drop tombstoned rows: rewrite the matrix densely and renumber idx in SQLite.
+
+        Skipped (returns False) while another process has the collection open,
+        since its row numbers would no longer match the matrix.
+        """
+        with self._lock:
+            if not self._open_lock.try_exclusive():
+                print(f"Not compacting {self.path}: the collection is open in another process")
+                return False
+            try:
+                self._compact()
+            finally:
+                self._open_lock.share()
+            return True
+
+    def _compact(self):
+        with self._write_lock():
+            keep = np.flatnonzero(self.alive[:self.num_rows])
+            tmp_path = self._vectors_path() + ".tmp"
+            compacted = np.memmap(tmp_path, dtype=np.float32, mode="w+", shape=(max(len(keep), 1024), self.size))
+            compacted[:len(keep)] = self.vectors[keep]
+            compacted.flush()
+            del compacted
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS remap (old INTEGER PRIMARY KEY, new INTEGER)")
+            self._conn.execute("DELETE FROM remap")
+            self._conn.executemany("INSERT INTO remap VALUES (?, ?)", [(int(old), new) for new, old in enumerate(keep)])
+            # Negate first so intermediate values never collide with the primary keys being renumbered
+            self._conn.execute("UPDATE points SET idx = -1 - (SELECT new FROM remap WHERE old = points.idx)")
+            self._conn.execute("UPDATE points SET idx = -1 - idx")
+            self._conn.commit()
+            self.vectors = None
+            os.replace(tmp_path, self._vectors_path())
+            self.vectors = self._open_vectors(max(len(keep), 1024))
+            remap = {int(old): new for new, old in enumerate(keep)}
+            self.idx_by_id = {point_id: remap[idx] for point_id, idx in self.idx_by_id.items()}
+            self.num_rows = len(keep)
+            self.alive = np.zeros(max(self.num_rows, 1), dtype=bool)
+            self.alive[:self.num_rows] = True
+            self._drop_ivf()
+
+    def _ivf_path(self) -> str:
+        return os.path.join(self.path, "ivf.npz")
+
+    def _load_ivf(self) -> Optional[dict]:
+        if not os.path.exists(self._ivf_path()):
+            return None
+        with np.load(self._ivf_path()) as data:
+            ivf = {key: data[key] for key in data.files}
+        if int(ivf["built_rows"]) > self.num_rows:
+            return None
+        return ivf
+
+    def _drop_ivf(self):
+        self.ivf = None
+        if os.path.exists(self._ivf_path()):
+            os.remove(self._ivf_path())
+
+    def build_ivf(self, nlist: int = None, iterations: int = 10, seed: int = 0):
+        """Train k-means centroids on a sample of the rows and store each row's list"""
+        with self._lock:
+            num_rows = self.num_rows
+            if not num_rows:
+                self._drop_ivf()
+                return
+            nlist = min(nlist or int(min(4096, max(16, np.sqrt(num_rows)))), num_rows)
+            rng = np.random.default_rng(seed)
+            sample = rng.choice(num_rows, size=min(num_rows, 64 * nlist), replace=False)
+            train = np.asarray(self.vectors[np.sort(sample)])
+            centroids = train[rng.choice(len(train), size=nlist, replace=False)].copy()
+            for _ in range(iterations):
+                assignment = np.argmax(train @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignment, train)
+                counts = np.bincount(assignment, minlength=nlist)[:, None]
+                centroids = np.where(counts > 0, sums / np.maximum(counts, 1), centroids)
+                if self.distance == models.Distance.COSINE:
+                    centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+            assignment = np.empty(num_rows, dtype=np.int32)
+            for start in range(0, num_rows, 65536):
+                block = np.asarray(self.vectors[start:start + 65536][:num_rows - start])
+                assignment[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+            order = np.argsort(assignment, kind="stable").astype(np.int64)
+            offsets = np.searchsorted(assignment[order], np.arange(nlist + 1)).astype(np.int64)
+            self.ivf = {"centroids": centroids, "order": order, "offsets": offsets, "built_rows": np.int64(num_rows)}
+            # Other processes may load the index at any time, so it is replaced atomically
+            tmp_path = self._ivf_path() + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **self.ivf)
+            os.replace(tmp_path, self._ivf_path())
+
+    def _use_ivf(self) -> bool:
+        if self.index == "exact" or len(self) < IVF_MIN_ROWS or (self.index == "auto" and len(self) < self.ivf_min_points):
+            return False
+        if self.ivf is None or self.num_rows - int(self.ivf["built_rows"]) > 0.2 * int(self.ivf["built_rows"]):
+            self.build_ivf()
+        return True
+
+    def _ivf_candidates(self, query: np.ndarray) -> np.ndarray:
+        ivf = self.ivf
+        nprobe = min(self.nprobe, len(ivf["centroids"]))
+        lists = np.argpartition(-(ivf["centroids"] @ query), nprobe - 1)[:nprobe]
+        offsets = ivf["offsets"]
+        parts = [ivf["order"][offsets[i]:offsets[i + 1]] for i in lists]
+        parts.append(np.arange(int(ivf["built_rows"]), self.num_rows))
+        return np.concatenate(parts)
+
+    def matching_rows(self, query_filter: models.Filter) -> np.ndarray:
+        params = []
+        where = _filter_sql(query_filter, params)
+        with self._lock:
+            rows = self._conn.execute(f"SELECT idx FROM points WHERE {where}", params).fetchall()
+        return np.fromiter((idx for (idx,) in rows), dtype=np.int64, count=len(rows))
+
+    def search(self, query, limit: int, query_filter: models.Filter = None, exact: bool = False):
+        """[(idx, score)] of the best rows"""
+        query = self._prepare(query)[0]
+        with self._lock:
+            if query_filter is not None:
+                rows = np.sort(self.matching_rows(query_filter))
+                scores = self.vectors[rows] @ query if len(rows) else np.empty(0, dtype=np.float32)
+            elif not exact and self._use_ivf():
+                rows = self._ivf_candidates(query)
+                rows = rows[self.alive[rows]]
+                scores = self.vectors[rows] @ query
+            else:
+                rows = np.flatnonzero(self.alive[:self.num_rows])
+                scores = np.asarray(self.vectors[:self.num_rows] @ query)[rows]
+        if len(rows) == 0:
+            return []
+        limit = min(limit, len(rows))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def records(self, rows: List[int], with_payload=True, with_vectors=False) -> List[dict]:
+        if not rows:
+            return []
+        with self._lock:
+            found = {}
+            for start in range(0, len(rows), 500):
+                batch = rows[start:start + 500]
+                found.update(
+                    (idx, (point_id, payload)) for idx, point_id, payload in self._conn.execute(
+                        f"SELECT idx, id, payload FROM points WHERE idx IN ({', '.join('?' * len(batch))})", batch
+                    )
+                )
+            vectors = np.asarray(self.vectors[rows]) if with_vectors else None
+        records = []
+        for i, idx in enumerate(rows):
+            if idx not in found:
+                continue
+            point_id, payload = found[idx]
+            records.append({
+                "id": _point_id(point_id),
+                "payload": json.loads(payload) if with_payload else None,
+                "vector": vectors[i].tolist() if with_vectors else None
+            })
+        return records
+
+    def scroll(self, limit: int, offset: int = None, query_filter: models.Filter = None):
+        params = [offset or 0]
+        where = "idx >= ?"
+        if query_filter is not None:
+            where += f" AND {_filter_sql(query_filter, params)}"
+        params.append(limit + 1)
+        with self._lock:
+            rows = [idx for (idx,) in self._conn.execute(
+                f"SELECT idx FROM points WHERE {where} ORDER BY idx LIMIT ?", params
+            )]
+        next_offset = rows[limit] if len(rows) > limit else None
+        return rows[:limit], next_offset
+
+    def create_payload_index(self, field_name: str, field_schema):
+        schema = getattr(field_schema, "value", field_schema)
+        with self._lock:
+            name = "payload_" + "".join(c if c.isalnum() else "_" for c in field_name)
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {name} ON points ({_column(field_name)})"
+            )
+            self._conn.commit()
+            self.config["payload_indexes"][field_name] = schema
+            self._save_config()
+
+    def _save_config(self):
+        tmp_path = os.path.join(self.path, "config.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.config, f)
+        os.replace(tmp_path, os.path.join(self.path, "config.json"))
+
+    def info(self):
+        num_points = len(self)
+        return SimpleNamespace(
+            status=models.CollectionStatus.GREEN,
+            points_count=num_points,
+            indexed_vectors_count=num_points,
+            config=SimpleNamespace(params=SimpleNamespace(
+                vectors=models.VectorParams(size=self.size, distance=self.distance)
+            )),
+            payload_schema={
+                field: models.PayloadIndexInfo(data_type=schema, points=num_points)
+                for field, schema in self.config["payload_indexes"].items()
+            }
+        )
+
+    def close(self):
+        with self._lock:
+            self.vectors.flush()
+            self._conn.close()
+            self._open_lock.release()
+
+class EmbeddedClient:
+    """In-process replacement for the part of QdrantClient that VectorDB, IngestionEngine and the registry use.
+
+    Collections live under one directory (see EmbeddedCollection). HNSW,
+    quantization and on-disk settings from collection profiles are accepted
+    and ignored; search is exact, or IVF-approximate for large collections
+    (index="auto"|"exact"|"ivf"). SearchParams(exact=True) forces exact search.
+    """
+
+    def __init__(self, path: str, index: str = "auto", nprobe: int = 16, ivf_min_points: int = 20000) -> None:
+        self.path = path
+        self.collection_kwargs = {"index": index, "nprobe": nprobe, "ivf_min_points": ivf_min_points}
+        self._collections: Dict[str, EmbeddedCollection] = {}
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _collection_path(self, collection_name: str) -> str:
+        return os.path.join(self.path, collection_name)
+
+    def _get(self, collection_name: str) -> EmbeddedCollection:
+        collection = self._collections.get(collection_name)
+        if collection is not None:
+            collection.refresh()
+            return collection
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                if not self.collection_exists(collection_name):
+                    raise ValueError(f"Collection '{collection_name}' not found in {self.path}")
+                collection = EmbeddedCollection(self._collection_path(collection_name), **self.collection_kwargs)
+                self._collections[collection_name] = collection
+        return collection
+
+    def get_collections(self):
+        names = sorted(
+            name for name in os.listdir(self.path)
+            if os.path.exists(os.path.join(self._collection_path(name), "config.json"))
+        )
+        return models.CollectionsResponse(collections=[models.CollectionDescription(name=name) for name in names])
+
+    def collection_exists(self, collection_name: str) -> bool:
+        return os.path.exists(os.path.join(self._collection_path(collection_name), "config.json"))
+
+    def create_collection(self, collection_name: str, vectors_config: models.VectorParams, **kwargs) -> bool:
+        with self._lock:
+            if self.collection_exists(collection_name):
+                raise ValueError(f"Collection '{collection_name}' already exists")
+            self._collections[collection_name] = EmbeddedCollection.create(
+                self._collection_path(collection_name),
+                size=vectors_config.size,
+                distance=vectors_config.distance,
+                **self.collection_kwargs
+            )
+        return True
+
+    def update_collection(self, collection_name: str, **kwargs) -> bool:
+        self._get(collection_name)
+        return True
+
+    def delete_collection(self, collection_name: str, **kwargs) -> bool:
+        with self._lock:
+            collection = self._collections.pop(collection_name, None)
+            if collection is not None:
+                collection.close()
+            if not self.collection_exists(collection_name):
+                return False
+            lock = _lock_file(os.path.join(self._collection_path(collection_name), "lock"), shared=False)
+            try:
+                if not lock.try_exclusive():
+                    raise RuntimeError(f"Collection '{collection_name}' is open in another process; stop it before deleting")
+                shutil.rmtree(self._collection_path(collection_name))
+            finally:
+                lock.release()
+        return True
+
+    def get_collection(self, collection_name: str):
+        return self._get(collection_name).info()
+
+    def create_payload_index(self, collection_name: str, field_name: str, field_schema=None, **kwargs):
+        self._get(collection_name).create_payload_index(field_name, field_schema)
+
+    def count(self, collection_name: str, count_filter: models.Filter = None, exact: bool = True, **kwargs):
+        collection = self._get(collection_name)
+        if count_filter is None:
+            return models.CountResult(count=len(collection))
+        return models.CountResult(count=len(collection.matching_rows(count_filter)))
+
+    def upsert(self, collection_name: str, points, wait: bool = True, **kwargs):
+        if isinstance(points, models.Batch):
+            ids, vectors = points.ids, points.vectors
+            payloads = points.payloads or [None] * len(ids)
+        else:
+            ids = [point.id for point in points]
+            vectors = [point.vector for point in points]
+            payloads = [point.payload for point in points]
+        if ids:
+            self._get(collection_name).upsert(ids, vectors, payloads)
+        return models.UpdateResult(operation_id=0, status=models.UpdateStatus.COMPLETED)
+
+    def delete(self, collection_name: str, points_selector, wait: bool = True, **kwargs):
+        collection = self._get(collection_name)
+        if isinstance(points_selector, models.PointIdsList):
+            ids = points_selector.points
+        elif isinstance(points_selector, models.FilterSelector):
+            rows = collection.matching_rows(points_selector.filter).tolist()
+            ids = [record["id"] for record in collection.records(rows, with_payload=False)]
+        else:
+            ids = list(points_selector)
+        collection.delete(ids)
+        return models.UpdateResult(operation_id=0, status=models.UpdateStatus.COMPLETED)
+
+    def retrieve(self, collection_name: str, ids, with_payload=True, with_vectors=False, **kwargs):
+        collection = self._get(collection_name)
+        rows = [collection.idx_by_id[str(point_id)] for point_id in ids if str(point_id) in collection.idx_by_id]
+        return [models.Record(**record) for record in collection.records(rows, bool(with_payload), bool(with_vectors))]
+
+    def scroll(self, collection_name: str, scroll_filter: models.Filter = None, limit: int = 10, offset=None,
+               with_payload=True, with_vectors=False, **kwargs):
+        collection = self._get(collection_name)
+        rows, next_offset = collection.scroll(limit, offset, scroll_filter)
+        records = collection.records(rows, bool(with_payload), bool(with_vectors))
+        return [models.Record(**record) for record in records], next_offset
+
+    def query_points(self, collection_name: str, query=None, query_filter: models.Filter = None,
+                     search_params: models.SearchParams = None, limit: int = 10,
+                     with_payload=True, with_vectors=False, **kwargs):
+        collection = self._get(collection_name)
+        exact = bool(search_params is not None and search_params.exact)
+        hits = collection.search(query, limit, query_filter, exact=exact)
+        records = collection.records([idx for idx, _ in hits], bool(with_payload), bool(with_vectors))
+        points = [
+            models.ScoredPoint(version=0, score=score, **record)
+            for record, (_, score) in zip(records, hits)
+        ]
+        return SimpleNamespace(points=points)
+
+    def optimize(self, collection_name: str):
+        """Build the IVF index now when the collection will use one, so the first query does not pay for it"""
+        self._get(collection_name)._use_ivf()
+
+    def close(self):
+        with self._lock:
+            for collection in self._collections.values():
+                collection.close()
+            self._collections.clear()
+
+class AsyncEmbeddedClient:
+    """AsyncQdrantClient counterpart: runs the shared EmbeddedClient's calls in worker threads"""
+
+    def __init__(self, client: EmbeddedClient) -> None:
+        self.client = client
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        @functools.wraps(method)
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+
+        return call
+
+@functools.lru_cache(maxsize=None)
+def embedded_client(path: str) -> EmbeddedClient:
+    """One EmbeddedClient per directory, shared by every VectorDB and registry in the process"""
+    return EmbeddedClient(
+        path,
+        index=os.getenv("EMBEDDED_INDEX", "auto"),
+        nprobe=int(os.getenv("EMBEDDED_NPROBE", 16)),
+        ivf_min_points=int(os.getenv("EMBEDDED_IVF_MIN_POINTS", 20000))
+    )
+
+def connect(location: Optional[str]):
+    """QdrantClient for a server URL, or the embedded store for embedded://<directory>"""
+    if is_embedded(location):
+        return embedded_client(os.path.abspath(location[len(EMBEDDED_SCHEME):]))
+    from qdrant_client import QdrantClient
+    return QdrantClient(url=location)
+
+def aconnect(location: Optional[str]):
+    if is_embedded(location):
+        return AsyncEmbeddedClient(connect(location))
+    from qdrant_client import AsyncQdrantClient
+    return AsyncQdrantClient(url=location)
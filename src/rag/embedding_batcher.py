@@ -0,0 +1,113 @@
+from typing import List
+from collections import Counter
+import asyncio
+import os
+from langchain_core.embeddings import Embeddings
+
+from src.rag.embedding_cache import QUERY_TASK_TYPE, accepts_task_type
+
+class BatchingEmbeddings(Embeddings):
+    """Coalesces concurrent aembed_query calls into a single embed_documents request.
+
+    The first waiting query opens a batch; it is flushed after max_wait_ms or as
+    soon as max_batch_size queries are queued, and each caller gets its own
+    vector back. Every query path (embed_query, aembed_query and the batches)
+    requests QUERY_TASK_TYPE from models that take a task type, so a question
+    gets the same vector whichever path embeds it.
+    """
+
+    def __init__(self,
+                 embedding: Embeddings,
+                 max_batch_size: int = 32,
+                 max_wait_ms: float = 5.0) -> None:
+        self.embedding = embedding
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.batch_sizes = Counter()
+        self.batches = 0
+        self.queries = 0
+        self._pending = []
+        self._flush_handle = None
+        self._tasks = set()
+        self._supports_task_type = accepts_task_type(embedding.aembed_documents)
+
+    def __getattr__(self, name):
+        if name == "embedding":
+            raise AttributeError(name)
+        return getattr(self.embedding, name)
+
+    def embed_query(self, text: str, task_type: str = QUERY_TASK_TYPE) -> List[float]:
+        if accepts_task_type(self.embedding.embed_query):
+            return self.embedding.embed_query(text, task_type=task_type)
+        return self.embedding.embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embedding.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embedding.aembed_documents(texts)
+
+    async def aembed_query(self, text: str, task_type: str = QUERY_TASK_TYPE) -> List[float]:
+        if task_type != QUERY_TASK_TYPE:
+            return await self.embedding.aembed_query(text, task_type=task_type)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+        if self._pending:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.max_wait_ms / 1000, self._flush)
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch):
+        texts = [text for text, _ in batch]
+        self.batches += 1
+        self.queries += len(batch)
+        self.batch_sizes[len(batch)] += 1
+        try:
+            if self._supports_task_type:
+                vectors = await self.embedding.aembed_documents(texts, task_type=QUERY_TASK_TYPE)
+            else:
+                vectors = await self.embedding.aembed_documents(texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def stats(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batches": self.batches,
+            "queries": self.queries,
+            "mean_batch_size": self.queries / self.batches if self.batches else 0.0,
+            "batch_size_histogram": dict(sorted(self.batch_sizes.items()))
+        }
+
+def batching_embeddings(embedding: Embeddings):
+    """Wrap an embedding with the query batcher configured from the environment, if enabled"""
+    max_batch_size = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))
+    if max_batch_size <= 1:
+        return embedding
+    return BatchingEmbeddings(
+        embedding,
+        max_batch_size=max_batch_size,
+        max_wait_ms=float(os.getenv("EMBEDDING_BATCH_WAIT_MS", 5.0))
+    )
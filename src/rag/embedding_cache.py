@@ -0,0 +1,179 @@
+from typing import List, Optional
+from collections import OrderedDict
+from array import array
+import inspect
+import os
+import time
+import sqlite3
+import threading
+import unicodedata
+from langchain_core.embeddings import Embeddings
+
+def normalize_query(text: str) -> str:
+    """NFC-normalize Vietnamese diacritics and fold runs of whitespace"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+# Task type every query embedding is requested with, on the sync, async and batched paths alike
+QUERY_TASK_TYPE = "retrieval_query"
+
+def get_model_name(embedding) -> str:
+    return getattr(embedding, "model", None) or embedding.__class__.__name__
+
+def accepts_task_type(method) -> bool:
+    return "task_type" in inspect.signature(method).parameters
+
+def embed_query(embedding, text: str) -> List[float]:
+    """embedding.embed_query with QUERY_TASK_TYPE when the model takes a task type"""
+    if accepts_task_type(embedding.embed_query):
+        return embedding.embed_query(text, task_type=QUERY_TASK_TYPE)
+    return embedding.embed_query(text)
+
+async def aembed_query(embedding, text: str) -> List[float]:
+    if accepts_task_type(embedding.aembed_query):
+        return await embedding.aembed_query(text, task_type=QUERY_TASK_TYPE)
+    return await embedding.aembed_query(text)
+
+class CachedEmbeddings(Embeddings):
+    """Bounded LRU+TTL cache in front of embed_query, optionally persisted to SQLite.
+
+    Entries are keyed by model, query task type and normalized text.
+    """
+
+    def __init__(self,
+                 embedding: Embeddings,
+                 max_size: int = 10000,
+                 ttl: Optional[float] = 7 * 24 * 3600,
+                 persist_path: Optional[str] = None) -> None:
+        self.embedding = embedding
+        self.model_name = get_model_name(embedding)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.persist_path = persist_path
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if persist_path:
+            self._open_store(persist_path)
+
+    def __getattr__(self, name):
+        if name == "embedding":
+            raise AttributeError(name)
+        return getattr(self.embedding, name)
+
+    def _open_store(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        now = time.time()
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM query_embeddings WHERE created_at < ?", (now - self.ttl,))
+        self._conn.execute(
+            "DELETE FROM query_embeddings WHERE key NOT IN ("
+            "SELECT key FROM query_embeddings ORDER BY created_at DESC LIMIT ?)",
+            (self.max_size,)
+        )
+        self._conn.commit()
+
+        rows = self._conn.execute(
+            "SELECT key, vector, created_at FROM query_embeddings ORDER BY created_at DESC LIMIT ?",
+            (self.max_size,)
+        ).fetchall()
+        for key, blob, created_at in reversed(rows):
+            self._cache[key] = (array("f", blob).tolist(), created_at)
+        print(f"Loaded {len(self._cache)} cached query embeddings from {path}")
+
+    def _key(self, normalized: str) -> str:
+        return f"{self.model_name}\x00{QUERY_TASK_TYPE}\x00{normalized}"
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                vector, created_at = entry
+                if self.ttl is None or time.time() - created_at <= self.ttl:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return vector
+                del self._cache[key]
+            self.misses += 1
+            return None
+
+    def _put(self, key, vector):
+        created_at = time.time()
+        with self._lock:
+            self._cache[key] = (vector, created_at)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO query_embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                        (key, array("f", vector).tobytes(), created_at)
+                    )
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    print(f"Could not persist query embedding: {e}")
+
+    def embed_query(self, text: str) -> List[float]:
+        normalized = normalize_query(text)
+        key = self._key(normalized)
+        vector = self._get(key)
+        if vector is None:
+            vector = embed_query(self.embedding, normalized)
+            self._put(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        normalized = normalize_query(text)
+        key = self._key(normalized)
+        vector = self._get(key)
+        if vector is None:
+            vector = await aembed_query(self.embedding, normalized)
+            self._put(key, vector)
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embedding.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embedding.aembed_documents(texts)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM query_embeddings")
+                self._conn.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "size": len(self._cache),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "persistent": self._conn is not None
+        }
+
+def cached_embeddings(embedding: Embeddings) -> CachedEmbeddings:
+    """Wrap an embedding with the query cache configured from the environment"""
+    if isinstance(embedding, CachedEmbeddings):
+        return embedding
+    ttl = float(os.getenv("EMBEDDING_CACHE_TTL", 7 * 24 * 3600))
+    return CachedEmbeddings(
+        embedding,
+        max_size=int(os.getenv("EMBEDDING_CACHE_SIZE", 10000)),
+        ttl=ttl if ttl > 0 else None,
+        persist_path=os.getenv("EMBEDDING_CACHE_PATH") or None
+    )
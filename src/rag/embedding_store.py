@@ -0,0 +1,135 @@
+from typing import List, Optional
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import numpy as np
+
+from src.rag.index_state import data_path
+
+def content_key(text: str, model_name: str) -> str:
+    return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+class EmbeddingStore:
+    """Content-addressed document embeddings on local disk.
+
+    Vectors live in a float32 matrix file that is memory-mapped for reads; a
+    SQLite index maps hash(model, chunk text) to the row holding its vector.
+    Rows are written and flushed before SQLite commits their offsets, and any
+    tail left by an interrupted append is truncated on open.
+    """
+
+    def __init__(self, directory: str, model_name: str) -> None:
+        self.directory = directory
+        self.model_name = model_name
+        self.matrix_path = os.path.join(directory, "vectors.f32")
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        self.dim = int(row[0]) if row else None
+        self._matrix = None
+        self._truncate_uncommitted()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_model(cls, model_name: str) -> "EmbeddingStore":
+        safe_name = re.sub(r"[^\w.-]+", "_", model_name)
+        return cls(os.path.dirname(data_path("embeddings", safe_name, "vectors.f32")), model_name)
+
+    def _committed_rows(self) -> int:
+        return self._conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM embeddings").fetchone()[0]
+
+    def _truncate_uncommitted(self):
+        """Drop row-file bytes past the last row SQLite knows about (an append interrupted before its commit)"""
+        if self.dim is None or not os.path.exists(self.matrix_path):
+            return
+        size = self._committed_rows() * 4 * self.dim
+        if os.path.getsize(self.matrix_path) > size:
+            with open(self.matrix_path, "r+b") as f:
+                f.truncate(size)
+
+    def _rows(self) -> int:
+        if self.dim is None or not os.path.exists(self.matrix_path):
+            return 0
+        return min(self._committed_rows(), os.path.getsize(self.matrix_path) // (4 * self.dim))
+
+    def _get_matrix(self):
+        rows = self._rows()
+        if self._matrix is None or self._matrix.shape[0] != rows:
+            self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(rows, self.dim)) if rows else None
+        return self._matrix
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        keys = [content_key(text, self.model_name) for text in texts]
+        with self._lock:
+            rows = {}
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start+500]
+                placeholders = ",".join("?" * len(chunk))
+                rows.update(self._conn.execute(
+                    f"SELECT key, row FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall())
+            matrix = self._get_matrix() if rows else None
+
+        results = []
+        for key in keys:
+            row = rows.get(key)
+            if row is None or matrix is None or row >= matrix.shape[0]:
+                results.append(None)
+                self.misses += 1
+            else:
+                results.append(matrix[row].tolist())
+                self.hits += 1
+        return results
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        if not texts:
+            return
+        array = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self.dim = array.shape[1]
+                self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)", (str(self.dim),))
+            elif array.shape[1] != self.dim:
+                raise ValueError(f"Embedding size {array.shape[1]} does not match store size {self.dim}")
+
+            keys = [content_key(text, self.model_name) for text in texts]
+            placeholders = ",".join("?" * len(keys))
+            existing = {key for (key,) in self._conn.execute(
+                f"SELECT key FROM embeddings WHERE key IN ({placeholders})", keys
+            ).fetchall()}
+            new_rows = []
+            seen = set()
+            for key, vector in zip(keys, array):
+                if key not in existing and key not in seen:
+                    seen.add(key)
+                    new_rows.append((key, vector))
+            if not new_rows:
+                return
+
+            # Overwrite from the last committed row so a stale tail can never shift offsets,
+            # and make the rows durable before SQLite points at them
+            first_row = self._committed_rows()
+            with open(self.matrix_path, "ab") as f:
+                f.truncate(first_row * 4 * self.dim)
+                f.write(np.vstack([vector for _, vector in new_rows]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            self._conn.executemany(
+                "INSERT INTO embeddings (key, row) VALUES (?, ?)",
+                [(key, first_row + i) for i, (key, _) in enumerate(new_rows)]
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self) -> dict:
+        return {"model": self.model_name, "size": len(self), "hits": self.hits, "misses": self.misses}
@@ -1,15 +1,20 @@
 from typing import Union, List, Dict
+from functools import lru_cache
 import glob
 from tqdm import tqdm
 import multiprocessing
 import json
-import time
-import bs4
 import os
-from langchain_community.document_loaders import WebBaseLoader
-from langchain_community.document_loaders import PyPDFLoader
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from langchain_core.documents import Document
+from concurrent.futures import ProcessPoolExecutor
 from src.rag.utils import LegalDocumentSplitter, TextSplitter, LawDocumentSplitter
+from src.rag.ids import source_id
+from src.rag.filters import published_date_from_filename
+from src.rag.web_fetcher import AsyncWebFetcher, make_documents
+from src.rag.page_cache import build_page_cache
+from src.rag.pdf_extract import build_pdf_text_cache, extract_page_range, page_count, page_ranges, pdfminer_pages
+from src.rag.manifest import file_fingerprint
+from src.rag.sections import parallel_split
 
 def extract_urls_from_json(json_file):
     with open(json_file, 'r', encoding='utf-8') as f:
@@ -21,35 +26,14 @@ def extract_urls_from_json(json_file):
             urls.append(item['url'])
     return urls
 
-URL_DOCUMENT_CACHE = {}
+@lru_cache(maxsize=None)
+def get_page_cache():
+    """Shared on-disk cache of extracted judgment text (None when PAGE_CACHE=0)"""
+    return build_page_cache()
 
-def fetch_content_from_url(url, retry_count=2, backoff_factor=1.5):
-    if url in URL_DOCUMENT_CACHE:
-        return URL_DOCUMENT_CACHE[url]
-    
-    for attempt in range(retry_count + 1):
-        try:
-            loader = WebBaseLoader(
-                web_paths=[url],
-                bs_kwargs=dict(parse_only=bs4.SoupStrainer(id="vanban_content"))
-            )
-            documents = loader.load()
-            
-            for doc in documents:
-                doc.metadata["source"] = url
-                doc.metadata["doc_id"] = hash(url)
-            
-            URL_DOCUMENT_CACHE[url] = documents
-            time.sleep(0.5)
-            return documents
-        except Exception as e:
-            if attempt < retry_count:
-                wait_time = backoff_factor * (2 ** attempt)
-                print(f"Error fetching {url}: {e}. Retrying in {wait_time:.1f}s...")
-                time.sleep(wait_time)
-            else:
-                print(f"Failed to fetch {url} after {retry_count+1} attempts: {e}")
-                return []
+def fetch_content_from_url(url, use_cache=True, **fetch_kwargs):
+    fetcher = AsyncWebFetcher(cache=get_page_cache() if use_cache else None, **fetch_kwargs)
+    return fetcher.fetch_all([url]).get(url, [])
 
 def get_optimal_workers():
     cores = multiprocessing.cpu_count()
@@ -63,76 +47,168 @@ class BaseLoader:
         pass
 
 class WebLoader(BaseLoader):
-    def __init__(self) -> None:
+    def __init__(self, fetch_kwargs: dict = None, offline: bool = False) -> None:
         super().__init__()
         self.num_workers = get_optimal_workers()
+        self.fetch_kwargs = fetch_kwargs or {}
+        self.offline = offline
 
     def __call__(self, json_files: List[str], **kwargs):
-        workers = kwargs.get('workers', self.num_workers)
         all_documents = []
+        for documents in self.iter_documents(json_files, **kwargs):
+            all_documents.extend(documents)
+        
+        print(f"Total documents loaded from URLs: {len(all_documents)}")
+        return all_documents
+
+    def iter_documents(self, json_files: List[str], **kwargs):
+        """Yield the documents of each URL as soon as it has been fetched, keeping at most max_pending pages in flight"""
+        workers = kwargs.get('workers', self.num_workers)
+        skip_sources = kwargs.get('skip_sources') or set()
+        max_pending = kwargs.get('max_pending') or workers * 2
+        use_cache = kwargs.get('use_cache', True)
         all_urls = []
+        published_dates = {}
         
         print("Extracting URLs from JSON files...")
         for json_file in json_files:
-            all_urls.extend(extract_urls_from_json(json_file))
+            urls = extract_urls_from_json(json_file)
+            published_date = published_date_from_filename(json_file)
+            if published_date:
+                published_dates.update((url, published_date) for url in urls)
+            all_urls.extend(urls)
+        
+        if skip_sources:
+            skipped = sum(url in skip_sources for url in all_urls)
+            all_urls = [url for url in all_urls if url not in skip_sources]
+            print(f"Skipping {skipped} unchanged URLs")
         
         total_urls = len(all_urls)
         print(f"Found {total_urls} URLs to process")
         
-        batch_size = min(max(10, workers * 2), 50)
+        cache = get_page_cache() if use_cache else None
+        if self.offline:
+            for url, documents in self._iter_cached(all_urls, cache):
+                yield self._with_published_date(documents, published_dates.get(url))
+            return
         
-        with ThreadPoolExecutor(max_workers=workers) as executor:
-            for i in range(0, len(all_urls), batch_size):
-                batch_urls = all_urls[i:i+batch_size]
-                
-                future_to_url = {executor.submit(fetch_content_from_url, url): url for url in batch_urls}
-                
-                completed = 0
-                with tqdm(total=len(batch_urls), desc=f"Batch {i//batch_size+1}/{(total_urls-1)//batch_size+1}", leave=False) as pbar:
-                    for future in as_completed(future_to_url):
-                        documents = future.result()
-                        all_documents.extend(documents)
-                        completed += 1
-                        pbar.update(1)
-                
-                if i + batch_size < len(all_urls) and completed > 0:
-                    time.sleep(min(1.0, 3.0 / completed))
+        fetcher = AsyncWebFetcher(cache=cache, **self.fetch_kwargs)
+        with tqdm(total=total_urls, desc="Fetching URLs", leave=False) as pbar:
+            for url, documents in fetcher.iter_fetch(all_urls, max_pending=max_pending):
+                pbar.update(1)
+                yield self._with_published_date(documents, published_dates.get(url))
         
-        print(f"Total documents loaded from URLs: {len(all_documents)}")
-        return all_documents
+        stats = fetcher.stats()
+        print(f"Fetched {stats['fetched']} pages ({stats['not_modified']} not modified, {stats['failed']} failed) "
+              f"in {stats['elapsed']:.2f}s, {stats['pages_per_second']:.1f} pages/s")
+
+    @staticmethod
+    def _with_published_date(documents, published_date):
+        if published_date:
+            for doc in documents:
+                doc.metadata["published_date"] = published_date
+        return documents
+
+    def _iter_cached(self, urls: List[str], cache):
+        """Offline mode: yield (url, documents) from the page cache only, never touching the network"""
+        if cache is None:
+            raise ValueError("Offline mode needs the page cache (PAGE_CACHE=0 disables it)")
+        missing = 0
+        for url in urls:
+            entry = cache.get(url)
+            if entry is None:
+                missing += 1
+                continue
+            yield url, make_documents(url, entry["text"])
+        print(f"Offline: loaded {len(urls) - missing} pages from the page cache, {missing} not cached")
 
 class PDFLoader(BaseLoader):
-    def __init__(self) -> None:
+    def __init__(self, processes: int = None) -> None:
         super().__init__()
         self.num_workers = get_optimal_workers()
+        self.processes = processes or os.cpu_count() or 1
         
     def __call__(self, pdf_files: List[str], **kwargs):
-        workers = kwargs.get('workers', self.num_workers)
         all_documents = []
+        for documents in self.iter_documents(pdf_files, **kwargs):
+            all_documents.extend(documents)
+        
+        print(f"Total documents extracted from PDFs: {len(all_documents)}")
+        return all_documents
+
+    def iter_documents(self, pdf_files: List[str], **kwargs):
+        """Yield the pages of each PDF once extracted.
+
+        Page text comes from the PDF text cache when the file hash is known;
+        otherwise page ranges of every PDF are parsed in a process pool, so a
+        single large law PDF is spread over all cores.
+        """
+        skip_sources = kwargs.get('skip_sources') or set()
+        
+        if skip_sources:
+            print(f"Skipping {sum(pdf in skip_sources for pdf in pdf_files)} unchanged PDF files")
+            pdf_files = [pdf for pdf in pdf_files if pdf not in skip_sources]
         
         print(f"Processing {len(pdf_files)} PDF files with paths:")
         for pdf_file in pdf_files:
             print(f"  - {pdf_file} (exists: {os.path.exists(pdf_file)})")
         
-        with ThreadPoolExecutor(max_workers=workers) as executor:
-            future_to_pdf = {executor.submit(self.process_pdf, pdf_file): pdf_file 
-                             for pdf_file in pdf_files}
+        cache = get_pdf_text_cache()
+        jobs = {}
+        executor = None
+        try:
+            for pdf_file in pdf_files:
+                if not os.path.isfile(pdf_file):
+                    print(f"PDF file does not exist or is not a file: {pdf_file}")
+                    continue
+                file_hash = file_fingerprint(pdf_file)
+                pages = cache.get(file_hash) if cache is not None else None
+                if pages is not None:
+                    print(f"Reusing cached text of {len(pages)} pages from {pdf_file}")
+                    yield self._to_documents(pdf_file, pages)
+                    continue
+                try:
+                    num_pages = page_count(pdf_file)
+                except Exception as e:
+                    print(f"Could not read page count of {pdf_file}: {e}")
+                    yield self.process_pdf(pdf_file)
+                    continue
+                if executor is None:
+                    executor = ProcessPoolExecutor(max_workers=self.processes)
+                jobs[pdf_file] = (file_hash, [
+                    executor.submit(extract_page_range, pdf_file, start, end)
+                    for start, end in page_ranges(num_pages, self.processes)
+                ])
             
-            with tqdm(total=len(pdf_files), desc="Processing PDFs") as pbar:
-                for future in as_completed(future_to_pdf):
-                    pdf_file = future_to_pdf[future]
-                    try:
-                        documents = future.result()
-                        print(f"Extracted {len(documents)} pages from {pdf_file}")
-                        all_documents.extend(documents)
-                    except Exception as e:
-                        print(f"Error processing {pdf_file}: {e}")
-                    pbar.update(1)
-        
-        print(f"Total documents extracted from PDFs: {len(all_documents)}")
-        return all_documents
+            for pdf_file, (file_hash, futures) in tqdm(jobs.items(), desc="Processing PDFs"):
+                try:
+                    pages = sorted(page for future in futures for page in future.result())
+                except Exception as e:
+                    print(f"Error processing {pdf_file}: {e}")
+                    pages = []
+                if not any(text.strip() for _, text in pages):
+                    yield self.process_pdf(pdf_file)
+                    continue
+                if cache is not None:
+                    cache.put(file_hash, pages)
+                print(f"Extracted {len(pages)} pages from {pdf_file} in {len(futures)} ranges")
+                yield self._to_documents(pdf_file, pages)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    def _to_documents(self, pdf_file, pages):
+        return [
+            Document(
+                page_content=text.strip(),
+                metadata={"source": pdf_file, "page": page, "doc_id": source_id(pdf_file, page)}
+            )
+            for page, text in pages
+            if text.strip()
+        ]
     
     def process_pdf(self, pdf_file):
+        """Sequential fallback that tries every extractor in turn on the whole file"""
         try:
             if not os.path.isfile(pdf_file):
                 print(f"PDF file does not exist or is not a file: {pdf_file}")
@@ -161,13 +237,9 @@ class PDFLoader(BaseLoader):
             
             for doc in documents:
                 doc.metadata["source"] = pdf_file
-                doc.metadata["doc_id"] = hash(f"{pdf_file}_{doc.metadata.get('page', 0)}")
-                
-                if isinstance(doc.metadata["doc_id"], int) and doc.metadata["doc_id"] < 0:
-                    doc.metadata["doc_id"] = abs(doc.metadata["doc_id"])
-                
                 if "page" not in doc.metadata:
                     doc.metadata["page"] = 0
+                doc.metadata["doc_id"] = source_id(pdf_file, doc.metadata["page"])
             
             return documents
         except Exception as e:
@@ -182,41 +254,8 @@ class PDFLoader(BaseLoader):
         return loader.load()
         
     def _try_pdfminer(self, pdf_file):
-        from langchain_core.documents import Document
-        
         try:
-            from pdfminer.high_level import extract_text, extract_pages
-            from pdfminer.layout import LTTextContainer
-            
-            full_text = extract_text(pdf_file)
-            
-            documents = []
-            for i, page_layout in enumerate(extract_pages(pdf_file)):
-                page_text = ""
-                for element in page_layout:
-                    if isinstance(element, LTTextContainer):
-                        page_text += element.get_text()
-                
-                if not page_text.strip() and full_text:
-                    parts = full_text.split('\n\n')
-                    page_fraction = max(1, len(parts) // 20)
-                    start_idx = i * page_fraction
-                    end_idx = (i + 1) * page_fraction
-                    page_text = '\n\n'.join(parts[start_idx:end_idx])
-                
-                if page_text.strip():
-                    documents.append(Document(
-                        page_content=page_text.strip(),
-                        metadata={"page": i, "source": pdf_file}
-                    ))
-            
-            if not documents and full_text:
-                documents = [Document(
-                    page_content=full_text,
-                    metadata={"page": 0, "source": pdf_file}
-                )]
-                
-            return documents
+            return self._to_documents(pdf_file, pdfminer_pages(pdf_file))
         except ImportError:
             from langchain_community.document_loaders import PDFMinerLoader
             loader = PDFMinerLoader(pdf_file)
@@ -227,15 +266,23 @@ class PDFLoader(BaseLoader):
         loader = UnstructuredPDFLoader(pdf_file)
         return loader.load()
 
+@lru_cache(maxsize=None)
+def get_pdf_text_cache():
+    """Shared cache of extracted PDF page text (None when PDF_TEXT_CACHE=0)"""
+    return build_pdf_text_cache()
+
 class Loader:
     def __init__(self,
                  split_kwargs: dict = {
                      "chunk_size": 1000,
                      "chunk_overlap": 200
                  },
-                 use_legal_splitter: bool = True) -> None:
+                 use_legal_splitter: bool = True,
+                 fetch_kwargs: dict = None,
+                 offline: bool = False,
+                 split_processes: int = None) -> None:
         self.loaders = {
-            "json": WebLoader(),
+            "json": WebLoader(fetch_kwargs, offline=offline),
             "pdf": PDFLoader()
         }
         self.doc_splitters = {
@@ -243,8 +290,9 @@ class Loader:
             "pdf": LawDocumentSplitter(**split_kwargs)
         }
         self.default_splitter = TextSplitter(**split_kwargs)
+        self.split_processes = split_processes
 
-    def load(self, files: Union[str, List[str]], workers: int = None):
+    def load(self, files: Union[str, List[str]], workers: int = None, skip_sources: set = None):
         if isinstance(files, str):
             files = [files]
         workers = workers or get_optimal_workers()
@@ -256,7 +304,7 @@ class Loader:
                 continue
             if ext in self.loaders:
                 print(f"Processing {len(file_list)} {ext.upper()} files...")
-                docs = self.loaders[ext](file_list, workers=workers)
+                docs = self.loaders[ext](file_list, workers=workers, skip_sources=skip_sources)
                 for doc in docs:
                     doc.metadata["file_type"] = ext
                 all_documents.extend(docs)
@@ -265,14 +313,14 @@ class Loader:
         split_documents = []
         if json_docs:
             print(f"Splitting {len(json_docs)} judgment documents...")
-            split_json_docs = self.doc_splitters["json"](json_docs)
+            split_json_docs = parallel_split(self.doc_splitters["json"], json_docs, self.split_processes)
             # Ensure file_type is preserved after splitting
             for doc in split_json_docs:
                 doc.metadata["file_type"] = "json"
             split_documents.extend(split_json_docs)
         if pdf_docs:
             print(f"Splitting {len(pdf_docs)} law documents...")
-            split_pdf_docs = self.doc_splitters["pdf"](pdf_docs)
+            split_pdf_docs = parallel_split(self.doc_splitters["pdf"], pdf_docs, self.split_processes)
             # Ensure file_type is preserved after splitting
             for doc in split_pdf_docs:
                 doc.metadata["file_type"] = "pdf"
@@ -280,6 +328,25 @@ class Loader:
         print(f"Total document chunks after splitting: {len(split_documents)}")
         return split_documents
 
+    def iter_load(self, files: Union[str, List[str]], workers: int = None, skip_sources: set = None):
+        """Streaming counterpart of load: yields the chunks of each source as soon as it is fetched and split"""
+        if isinstance(files, str):
+            files = [files]
+        workers = workers or get_optimal_workers()
+        file_groups = self._group_files_by_extension(files)
+        for ext, file_list in file_groups.items():
+            if not file_list or ext not in self.loaders:
+                continue
+            print(f"Streaming {len(file_list)} {ext.upper()} files...")
+            for docs in self.loaders[ext].iter_documents(file_list, workers=workers, skip_sources=skip_sources):
+                if not docs:
+                    continue
+                for doc in docs:
+                    doc.metadata["file_type"] = ext
+                for chunk in self.doc_splitters[ext](docs):
+                    chunk.metadata["file_type"] = ext
+                    yield chunk
+
     def _group_files_by_extension(self, files: List[str]) -> Dict[str, List[str]]:
         groups = {
             "json": [],
@@ -293,7 +360,7 @@ class Loader:
                 print(f"Warning: Unsupported file type: {file_path}")
         return groups
 
-    def load_dir(self, dir_path: str, workers: int = None):
+    def load_dir(self, dir_path: str, workers: int = None, skip_sources: set = None):
         json_files = glob.glob(f"{dir_path}/*.json")
         pdf_files = glob.glob(f"{dir_path}/*.pdf")
         all_files = json_files + pdf_files
@@ -302,4 +369,4 @@ class Loader:
             raise ValueError(f"No supported files (JSON or PDF) found in {dir_path}")
         
         print(f"Found {len(json_files)} JSON files and {len(pdf_files)} PDF files")
-        return self.load(all_files, workers=workers)
\ No newline at end of file
+        return self.load(all_files, workers=workers, skip_sources=skip_sources)
\ No newline at end of file
@@ -0,0 +1,83 @@
+from typing import Optional
+import datetime
+import os
+import re
+from qdrant_client import models
+
+# Payload fields indexed in every collection so filtered searches only visit matching points
+PAYLOAD_INDEXES = {
+    "metadata.source": models.PayloadSchemaType.KEYWORD,
+    "metadata.section": models.PayloadSchemaType.KEYWORD,
+    "metadata.file_type": models.PayloadSchemaType.KEYWORD,
+    "metadata.article": models.PayloadSchemaType.INTEGER,
+    "metadata.published_date": models.PayloadSchemaType.DATETIME
+}
+
+MATCH_FIELDS = ("source", "section", "file_type", "article")
+
+PERIOD_FILENAME = re.compile(r"(\d{2})-(\d{2})-(\d{4})_\d{2}-\d{2}-\d{4}$")
+
+def published_date_from_filename(json_file: str) -> Optional[str]:
+    """ISO start date of the crawl period a judgment list was collected for.
+
+    crawl.py names its output after the publication-date window it searched,
+    e.g. 01-02-2024_29-02-2024.json; the list page gives no exact day, so every
+    judgment in the file is dated to the start of that window.
+    """
+    match = PERIOD_FILENAME.search(os.path.splitext(os.path.basename(json_file))[0])
+    if not match:
+        return None
+    day, month, year = (int(group) for group in match.groups())
+    try:
+        return datetime.date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+def build_filter(filters: Optional[dict]) -> Optional[models.Filter]:
+    """Qdrant filter for {source, section, file_type, article, date_from, date_to}; None when nothing is set"""
+    if not filters:
+        return None
+    must = []
+    for field in MATCH_FIELDS:
+        value = filters.get(field)
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple)):
+            match = models.MatchAny(any=list(value))
+        else:
+            match = models.MatchValue(value=value)
+        must.append(models.FieldCondition(key=f"metadata.{field}", match=match))
+
+    date_from, date_to = filters.get("date_from"), filters.get("date_to")
+    if date_from or date_to:
+        must.append(models.FieldCondition(
+            key="metadata.published_date",
+            range=models.DatetimeRange(gte=date_from, lte=date_to)
+        ))
+    return models.Filter(must=must) if must else None
+
+def matches(metadata: dict, filters: Optional[dict]) -> bool:
+    """Same semantics as build_filter, evaluated on a chunk's metadata (used by the local BM25 index)"""
+    if not filters:
+        return True
+    for field in MATCH_FIELDS:
+        value = filters.get(field)
+        if value is None:
+            continue
+        actual = metadata.get(field)
+        if isinstance(value, (list, tuple)):
+            if actual not in value:
+                return False
+        elif actual != value:
+            return False
+
+    date_from, date_to = filters.get("date_from"), filters.get("date_to")
+    if date_from or date_to:
+        published = metadata.get("published_date")
+        if not published:
+            return False
+        if date_from and published < str(date_from)[:10]:
+            return False
+        if date_to and published > str(date_to)[:10]:
+            return False
+    return True
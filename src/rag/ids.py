@@ -0,0 +1,40 @@
+import uuid
+
+from src.rag.embedding_cache import normalize_query
+
+# Fixed namespace so ids are identical across processes, machines and Python versions
+ID_NAMESPACE = uuid.UUID("6f1c3a52-3d0e-5b8e-9a44-1c7d2f0b8e61")
+
+def normalize_content(text: str) -> str:
+    return normalize_query(text)
+
+def source_id(source: str, position=None) -> str:
+    """Id of a raw (unsplit) document: its URL or path, plus the page for PDFs"""
+    key = source if position is None else f"{source}#{position}"
+    return str(uuid.uuid5(ID_NAMESPACE, f"source:{key}"))
+
+def segment_id(parent_id: str, index) -> str:
+    """Id shared by the chunks of one section or article of a raw document, so the
+    context packer only stitches chunks that were really split from the same text"""
+    return str(uuid.uuid5(ID_NAMESPACE, f"segment:{parent_id}#{index}"))
+
+def chunk_id(text: str, source: str = "", section: str = "", chunk_index: str = "") -> str:
+    """Point id of a chunk: its source, section and position in it, plus its normalized content.
+
+    Ids are stable across runs and machines. Identical text in two judgments
+    stays two points, so each keeps its own source, section and chunk_index
+    for filters, context merging and citations; the EmbeddingStore, keyed by
+    text alone, still embeds such duplicates only once.
+    """
+    key = "\x1f".join((str(source), str(section), str(chunk_index), normalize_content(text)))
+    return str(uuid.uuid5(ID_NAMESPACE, f"chunk:{key}"))
+
+def document_chunk_id(doc) -> str:
+    """chunk_id of a Document from its page_content and metadata"""
+    metadata = doc.metadata
+    return chunk_id(
+        doc.page_content,
+        metadata.get("source", ""),
+        metadata.get("section", ""),
+        metadata.get("chunk_index", "")
+    )
@@ -0,0 +1,30 @@
+import os
+import time
+
+DATA_DIR = os.getenv("LECO_DATA_DIR", ".leco")
+
+def data_path(*parts) -> str:
+    """Path under the local data directory, creating parent directories"""
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+def _version_file(collection_name: str) -> str:
+    return data_path("index_versions", f"{collection_name}.version")
+
+def bump_index_version(collection_name: str) -> int:
+    """Record that a collection has been (re)indexed so dependent caches can invalidate"""
+    version = time.time_ns()
+    path = _version_file(collection_name)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(str(version))
+    os.replace(tmp_path, path)
+    return version
+
+def get_index_version(collection_name: str) -> int:
+    try:
+        with open(_version_file(collection_name), "r") as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
@@ -0,0 +1,214 @@
+from typing import Iterable, List
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+import time
+import uuid
+from langchain_core.documents import Document
+from qdrant_client import models
+
+from src.rag.ratelimit import TokenBucket, is_rate_limit_error
+
+_STOP = object()
+
+def make_point(doc: Document, vector) -> models.PointStruct:
+    doc_id = doc.metadata["doc_id"]
+    metadata = doc.metadata
+    try:
+        uuid.UUID(str(doc_id))
+    except ValueError:
+        valid_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, str(doc_id)))
+        print(f"Converting ID {doc_id} to valid UUID: {valid_id}")
+        doc_id = valid_id
+        metadata = {**metadata, "doc_id": valid_id}
+    return models.PointStruct(
+        id=str(doc_id),
+        vector=list(vector),
+        payload={
+            "page_content": doc.page_content,
+            "metadata": metadata
+        }
+    )
+
+class IngestionEngine:
+    """Embeds and upserts documents as a pipeline.
+
+    Up to max_in_flight embedding batches run at once while a writer thread
+    upserts finished batches into Qdrant, so the embedding API and Qdrant work
+    in parallel. The batch size grows after successful calls and is halved on
+    rate-limit errors, which also pause the shared token bucket before retrying.
+    """
+
+    def __init__(self,
+                 embedding,
+                 client,
+                 collection_name: str,
+                 batch_size: int = 64,
+                 min_batch_size: int = 8,
+                 max_batch_size: int = 256,
+                 max_in_flight: int = 4,
+                 requests_per_second: float = None,
+                 max_retries: int = 6,
+                 backoff_seconds: float = 2.0,
+                 embedding_store=None) -> None:
+        self.embedding = embedding
+        self.embedding_store = embedding_store
+        self.client = client
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.bucket = TokenBucket(rate=requests_per_second)
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.embedded = 0
+        self.upserted = 0
+        self.batches = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.store_hits = 0
+        self.elapsed = 0.0
+
+    def _grow(self):
+        with self._lock:
+            self.batch_size = min(self.max_batch_size, self.batch_size + max(1, self.batch_size // 4))
+
+    def _shrink(self):
+        with self._lock:
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+
+    def embed_texts(self, texts: List[str]):
+        return self.embedding.embed_documents(texts)
+
+    def _embed_batch(self, batch: List[Document]):
+        texts = [doc.page_content for doc in batch]
+        vectors = [None] * len(texts)
+        if self.embedding_store is not None:
+            vectors = self.embedding_store.get_many(texts)
+            with self._lock:
+                self.store_hits += sum(vector is not None for vector in vectors)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if not missing:
+            return batch, vectors
+
+        # Identical text in several chunks (e.g. boilerplate shared by judgments) is embedded once
+        missing_texts = list(dict.fromkeys(texts[i] for i in missing))
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                new_vectors = self.embed_texts(missing_texts)
+                with self._lock:
+                    self.embedded += len(missing_texts)
+                self._grow()
+                if self.embedding_store is not None:
+                    self.embedding_store.put_many(missing_texts, new_vectors)
+                by_text = dict(zip(missing_texts, new_vectors))
+                for i in missing:
+                    vectors[i] = by_text[texts[i]]
+                return batch, vectors
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                self.retries += 1
+                wait_time = self.backoff_seconds * (2 ** attempt)
+                if is_rate_limit_error(e):
+                    self.rate_limited += 1
+                    self._shrink()
+                    self.bucket.backoff(wait_time)
+                    print(f"Rate limited while embedding ({e}). Backing off {wait_time:.1f}s, "
+                          f"batch size now {self.batch_size}")
+                else:
+                    print(f"Error embedding batch: {e}. Retrying in {wait_time:.1f}s...")
+                    time.sleep(wait_time)
+
+    def _writer(self, upsert_queue: queue.Queue, errors: list):
+        while True:
+            item = upsert_queue.get()
+            if item is _STOP:
+                return
+            if errors:
+                continue
+            batch, vectors = item
+            try:
+                points = [make_point(doc, vector) for doc, vector in zip(batch, vectors)]
+                self.client.upsert(collection_name=self.collection_name, points=points)
+                self.upserted += len(points)
+            except Exception as e:
+                errors.append(e)
+
+    def _batches(self, documents: Iterable[Document]):
+        batch = []
+        for doc in documents:
+            batch.append(doc)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def run(self, documents: Iterable[Document]) -> dict:
+        self._reset_stats()
+        start_time = time.time()
+        upsert_queue = queue.Queue(maxsize=self.max_in_flight)
+        errors = []
+        writer = threading.Thread(target=self._writer, args=(upsert_queue, errors), daemon=True)
+        writer.start()
+
+        in_flight = threading.BoundedSemaphore(self.max_in_flight)
+
+        def on_done(future):
+            try:
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                    return
+                upsert_queue.put(future.result())
+            finally:
+                in_flight.release()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+                for batch in self._batches(documents):
+                    if errors:
+                        break
+                    in_flight.acquire()
+                    self.batches += 1
+                    future = executor.submit(self._embed_batch, batch)
+                    future.add_done_callback(on_done)
+                    if self.batches % 10 == 0:
+                        rate = self.embedded / max(time.time() - start_time, 1e-9)
+                        print(f"Submitted {self.batches} batches, {self.upserted} points upserted, "
+                              f"{rate:.1f} embeddings/s")
+        finally:
+            upsert_queue.put(_STOP)
+            writer.join()
+
+        if errors:
+            raise errors[0]
+
+        self.elapsed = time.time() - start_time
+        stats = self.stats()
+        print(f"Ingested {stats['upserted']} points into '{self.collection_name}' in {self.elapsed:.2f}s "
+              f"({self.embedded} embedded by the API at {stats['embeddings_per_second']:.1f} embeddings/s, "
+              f"{self.store_hits} vectors reused from the local store, {self.batches} batches, "
+              f"{self.rate_limited} rate-limited retries)")
+        return stats
+
+    def stats(self) -> dict:
+        return {
+            "embedded": self.embedded,
+            "upserted": self.upserted,
+            "batches": self.batches,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "store_hits": self.store_hits,
+            "elapsed": self.elapsed,
+            # embedded counts texts sent to the embedding API only; store_hits are reused vectors
+            "embeddings_per_second": self.embedded / self.elapsed if self.elapsed else 0.0,
+            "points_per_second": self.upserted / self.elapsed if self.elapsed else 0.0,
+            "final_batch_size": self.batch_size
+        }
@@ -1,15 +1,35 @@
 from pydantic import BaseModel, Field
-from typing import Literal
+from typing import List, Literal, Optional, Union
+import datetime
 
+from src.rag.sections import SECTION_TITLES
 from src.rag.vectorstore import VectorDB
-from src.rag.offline_rag import Offline_RAG
+from src.rag.offline_rag import Offline_RAG, AsyncOffline_RAG
+
+class SearchFilters(BaseModel):
+    source: Optional[Union[str, List[str]]] = Field(default=None, title="Judgment URL(s) or law PDF path(s) to search in")
+    section: Optional[Literal[tuple(SECTION_TITLES)]] = Field(default=None, title="Judgment section, e.g. QUYẾT ĐỊNH")
+    article: Optional[int] = Field(default=None, title="Law article number (Điều)")
+    file_type: Optional[Literal["json", "pdf"]] = Field(default=None, title="json for judgments, pdf for laws")
+    date_from: Optional[datetime.date] = Field(default=None, title="Judgments published on or after this date")
+    date_to: Optional[datetime.date] = Field(default=None, title="Judgments published on or before this date")
 
 class InputQA(BaseModel):
     question: str = Field(..., title="Question to ask the model")
-    source_type: Literal["judgment", "law"] = Field(default="judgment", title="Source type: judgment or law")
+    source_type: Literal["judgment", "law", "all"] = Field(default="judgment", title="Source type: judgment, law or all")
+    session_id: Optional[str] = Field(default=None, title="Conversation id; falls back to the X-Session-Id header")
+    filters: Optional[SearchFilters] = Field(default=None, title="Metadata filters applied inside the vector search")
+
+    def filter_dict(self) -> Optional[dict]:
+        if self.filters is None:
+            return None
+        return self.filters.model_dump(mode="json", exclude_none=True) or None
 
 class OutputQA(BaseModel):
     answer: str = Field(..., title="Answer from the model")
 
-def build_rag_chain(llm):
-    return Offline_RAG(llm)
\ No newline at end of file
+def build_rag_chain(llm, registry=None, answer_cache=None):
+    return Offline_RAG(llm, registry=registry, answer_cache=answer_cache)
+
+def build_async_rag_chain(llm, registry=None, answer_cache=None):
+    return AsyncOffline_RAG(llm, registry=registry, answer_cache=answer_cache)
\ No newline at end of file
@@ -0,0 +1,117 @@
+from collections import defaultdict
+import hashlib
+import json
+import os
+import time
+
+from src.rag.index_state import data_path
+
+def file_fingerprint(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ChunkRecorder:
+    """Collects chunk ids and a content fingerprint per source without holding on to the chunks"""
+
+    def __init__(self) -> None:
+        self._ids = defaultdict(list)
+        self._digests = {}
+
+    def add(self, chunk):
+        source = chunk.metadata["source"]
+        self._ids[source].append(str(chunk.metadata["doc_id"]))
+        digest = self._digests.setdefault(source, hashlib.sha256())
+        digest.update(chunk.page_content.encode("utf-8"))
+        digest.update(b"\x00")
+
+    def observe(self, chunks):
+        """Pass chunks through, recording each once the consumer asks for the next one,
+        i.e. after VectorDB has assigned its doc_id"""
+        for chunk in chunks:
+            yield chunk
+            self.add(chunk)
+
+    def results(self) -> dict:
+        return {source: (ids, self._digests[source].hexdigest()) for source, ids in self._ids.items()}
+
+class IngestManifest:
+    """Per-source record of what load_data.py has indexed.
+
+    Each entry maps a source (judgment URL or PDF path) to its collection, a
+    content fingerprint, the splitter config it was chunked with and the chunk
+    ids it produced. Sources whose entry still matches are neither fetched nor
+    split again; chunks of removed or changed sources are deleted.
+    """
+
+    def __init__(self, path: str = None) -> None:
+        self.path = path or data_path("manifest.json")
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("sources", {})
+
+    def clear(self, collection_name: str = None):
+        if collection_name is None:
+            self.entries = {}
+        else:
+            self.entries = {source: entry for source, entry in self.entries.items()
+                            if entry["collection"] != collection_name}
+
+    def plan(self, current: dict, splitter_config: dict):
+        """current: {source: (collection, fingerprint or None)}.
+
+        Returns (unchanged sources to skip, sources to (re)load, removed sources).
+        URL sources carry no fingerprint up front since judgments do not change
+        once published; they are reloaded only when the splitter config changes.
+        """
+        unchanged, to_load = set(), set()
+        for source, (collection, fingerprint) in current.items():
+            entry = self.entries.get(source)
+            if (entry is not None
+                    and entry["collection"] == collection
+                    and entry["splitter"] == splitter_config
+                    and (fingerprint is None or entry["fingerprint"] == fingerprint)):
+                unchanged.add(source)
+            else:
+                to_load.add(source)
+        removed = set(self.entries) - set(current)
+        return unchanged, to_load, removed
+
+    def update(self, current: dict, recorded: dict, splitter_config: dict) -> dict:
+        """Record freshly indexed sources, forget removed ones and return {collection: stale chunk ids}"""
+        stale = defaultdict(set)
+        for source in list(self.entries):
+            if source not in current:
+                entry = self.entries.pop(source)
+                stale[entry["collection"]].update(entry["chunk_ids"])
+
+        for source, (chunk_ids, content_fingerprint) in recorded.items():
+            collection, fingerprint = current[source]
+            previous = self.entries.get(source)
+            if previous is not None:
+                stale[previous["collection"]].update(previous["chunk_ids"])
+            self.entries[source] = {
+                "collection": collection,
+                "fingerprint": fingerprint or content_fingerprint,
+                "splitter": splitter_config,
+                "chunk_ids": chunk_ids,
+                "updated_at": time.time()
+            }
+
+        referenced = defaultdict(set)
+        for entry in self.entries.values():
+            referenced[entry["collection"]].update(entry["chunk_ids"])
+        return {
+            collection: sorted(ids - referenced[collection])
+            for collection, ids in stale.items()
+            if ids - referenced[collection]
+        }
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "sources": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
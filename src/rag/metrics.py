@@ -0,0 +1,169 @@
+from typing import Dict, Optional, Sequence, Tuple
+from contextvars import ContextVar
+import bisect
+import os
+import threading
+import time
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CHUNK_BUCKETS = (0, 1, 2, 3, 5, 8, 10, 20, 50, 100)
+PROMPT_BUCKETS = (500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Histogram:
+    """Prometheus histogram with fixed buckets, one series per label combination"""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # per-bucket counts (not cumulative), then sum and count
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            inf = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {values[-1]}")
+        return "\n".join(lines)
+
+class Metrics:
+    """Pipeline histograms exported on /metrics; METRICS=0 turns every recording call into a no-op"""
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.stage_seconds = Histogram(
+            "leco_stage_seconds", "Time spent in each RAG pipeline stage", LATENCY_BUCKETS, ("stage",)
+        )
+        self.request_seconds = Histogram(
+            "leco_request_seconds", "HTTP request duration until the response starts", LATENCY_BUCKETS, ("path",)
+        )
+        self.retrieved_chunks = Histogram(
+            "leco_retrieved_chunks", "Chunks returned by the retriever per question", CHUNK_BUCKETS, ("source_type",)
+        )
+        self.prompt_chars = Histogram(
+            "leco_prompt_chars", "Characters in the prompt sent to the LLM", PROMPT_BUCKETS, ("source_type",)
+        )
+
+    def render(self) -> str:
+        histograms = (self.stage_seconds, self.request_seconds, self.retrieved_chunks, self.prompt_chars)
+        return "\n".join(histogram.render() for histogram in histograms) + "\n"
+
+METRICS = Metrics(enabled=os.getenv("METRICS", "1") != "0")
+
+# Stage durations of the request being served, reported in its Server-Timing header
+_request_timings: ContextVar[Optional[dict]] = ContextVar("leco_request_timings", default=None)
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        METRICS.stage_seconds.observe(elapsed, self.stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[self.stage] = timings.get(self.stage, 0.0) + elapsed
+        return False
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+def span(stage: str):
+    """Context manager timing one pipeline stage (embed, search, bm25, mmr, format, prompt, generate, parse)"""
+    return _Span(stage) if METRICS.enabled else _NOOP_SPAN
+
+def observe_retrieval(source_type: str, num_chunks: int):
+    if METRICS.enabled:
+        METRICS.retrieved_chunks.observe(num_chunks, source_type or "")
+
+def observe_prompt(source_type: str, prompt: str):
+    if METRICS.enabled:
+        METRICS.prompt_chars.observe(len(prompt), source_type or "")
+
+def request_timings() -> Optional[dict]:
+    """Stage durations (seconds) recorded so far for the current request, or None outside a request"""
+    return _request_timings.get()
+
+def server_timing(timings: dict) -> str:
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+class ServerTimingMiddleware:
+    """ASGI middleware that collects the request's spans and adds a Server-Timing header.
+
+    Streaming responses send their headers before the chain runs, so their
+    header only covers work done up to that point.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        timings = {}
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                elapsed = time.perf_counter() - start
+                # Label by route template so unknown paths cannot create new series
+                route = scope.get("route")
+                METRICS.request_seconds.observe(elapsed, getattr(route, "path", "unmatched"))
+                header = server_timing({**timings, "total": elapsed})
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"server-timing", header.encode("latin-1"))
+                ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
@@ -0,0 +1,50 @@
+from typing import Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import contextvars
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+SCORE_KEYS = ("mmr_score", "rrf_score", "score")
+
+def normalize_scores(docs: List[Document]) -> List[float]:
+    """Min-max normalize one collection's scores to [0, 1]; falls back to rank when scores are missing"""
+    if not docs:
+        return []
+    for key in SCORE_KEYS:
+        scores = [doc.metadata.get(key) for doc in docs]
+        if all(score is not None for score in scores):
+            low, high = min(scores), max(scores)
+            if high > low:
+                return [(score - low) / (high - low) for score in scores]
+            return [1.0] * len(docs)
+    return [1.0 - rank / len(docs) for rank in range(len(docs))]
+
+def merge_results(results: Dict[str, List[Document]]) -> List[Document]:
+    merged = []
+    for source_type, docs in results.items():
+        for doc, score in zip(docs, normalize_scores(docs)):
+            doc.metadata["_source_type"] = source_type
+            doc.metadata["normalized_score"] = score
+            merged.append(doc)
+    merged.sort(key=lambda doc: doc.metadata["normalized_score"], reverse=True)
+    return merged
+
+class MultiCollectionRetriever(BaseRetriever):
+    """Searches several collections concurrently and merges them on normalized scores"""
+    retrievers: Dict[str, Any]
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None, filters: dict = None) -> List[Document]:
+        with ThreadPoolExecutor(max_workers=len(self.retrievers)) as executor:
+            futures = {
+                # Run in a copy of the caller's context so per-request metric spans are attributed to it
+                source_type: executor.submit(contextvars.copy_context().run, retriever.invoke, query, filters=filters)
+                for source_type, retriever in self.retrievers.items()
+            }
+            results = {source_type: future.result() for source_type, future in futures.items()}
+        return merge_results(results)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None, filters: dict = None) -> List[Document]:
+        source_types = list(self.retrievers)
+        docs = await asyncio.gather(*(self.retrievers[source_type].ainvoke(query, filters=filters) for source_type in source_types))
+        return merge_results(dict(zip(source_types, docs)))
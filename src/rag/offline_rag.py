@@ -1,8 +1,9 @@
-import re
 from langchain.prompts import PromptTemplate
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
 import os
+from src.rag.context import ContextPacker
+from src.rag.metrics import observe_prompt, observe_retrieval, span
 
 class Str_OutputParser(StrOutputParser):
     def __init__(self) -> None:
@@ -11,22 +12,97 @@ class Str_OutputParser(StrOutputParser):
     def parse(self, text: str) -> str:
         return self.extract_answer(text)
 
-    def extract_answer(self,
-                       text_response: str,
-                       pattern: str = r"Trả lời:\s*(.*)"
-                       ) -> str:
+    def extract_answer(self, text_response: str) -> str:
+        """The answer without a leading answer marker, extracted exactly as the stream does it"""
+        extractor = StreamingAnswerExtractor()
+        return extractor.feed(text_response) + extractor.finish()
+
+
+# Markers the model may open its answer with; the first echoes the end of prompt.txt
+ANSWER_MARKERS = ("Trả lời trực tiếp:", "Trả lời:")
+
+def parse_source_shares(value: str) -> dict:
+    """Parse 'judgment=0.6,law=0.4' into a dict of context-budget shares"""
+    shares = {}
+    for item in value.split(","):
+        if "=" in item:
+            source_type, share = item.split("=", 1)
+            shares[source_type.strip()] = float(share)
+    return shares
 
-        match = re.search(pattern, text_response, re.DOTALL)
-        if match:
-            answer_text = match.group(1).strip()
-            return answer_text
-        else:
-            return text_response
+
+class StreamingAnswerExtractor:
+    """Strips an answer marker that opens the response, forwarding everything else as it arrives.
+
+    The prompt ends with "Trả lời trực tiếp:", and the model sometimes echoes
+    that or "Trả lời:" before answering. Only a marker at the very start
+    counts, so text is held back just while it could still become one (a few
+    characters); a marker later in the answer is ordinary text. Surrounding
+    whitespace is dropped. Str_OutputParser runs the same extractor over the
+    whole response, so streamed and non-streamed answers are identical.
+    """
+
+    def __init__(self, markers=ANSWER_MARKERS) -> None:
+        self.markers = [marker.lower() for marker in markers]
+        self.buffer = ""
+        self.pending = ""
+        self.found = False
+        self.started = False
+
+    def feed(self, chunk: str) -> str:
+        if not self.found:
+            self.buffer += chunk
+            head = self.buffer.lstrip().lower()
+            if not head:
+                return ""
+            for marker in self.markers:
+                if head.startswith(marker):
+                    chunk = self.buffer.lstrip()[len(marker):]
+                    break
+            else:
+                if any(marker.startswith(head) for marker in self.markers):
+                    return ""
+                chunk = self.buffer
+            self.found = True
+            self.buffer = ""
+
+        if not self.started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                return ""
+            self.started = True
+
+        text = self.pending + chunk
+        stripped = text.rstrip()
+        self.pending = text[len(stripped):]
+        return stripped
+
+    def finish(self) -> str:
+        if not self.found:
+            # The whole response was a prefix of a marker, e.g. just "Trả lời"
+            text, self.buffer = self.buffer.strip(), ""
+            self.found = True
+            return text
+        self.pending = ""
+        return ""
 
 
 class Offline_RAG:
-    def __init__(self, llm) -> None:
+    def __init__(self,
+                 llm,
+                 registry=None,
+                 answer_cache=None,
+                 max_context_tokens: int = int(os.getenv("MAX_CONTEXT_TOKENS", 6000)),
+                 chunk_overlap: int = 200,
+                 source_shares: dict = None) -> None:
         self.llm = llm
+        self.registry = registry
+        self.answer_cache = answer_cache
+        self.source_shares = source_shares or parse_source_shares(os.getenv("SOURCE_SHARES", "judgment=0.5,law=0.5"))
+        self.context_packer = ContextPacker(
+            max_tokens=max_context_tokens if max_context_tokens > 0 else None,
+            chunk_overlap=chunk_overlap
+        )
         self.prompt = PromptTemplate(
             input_variables=["context", "question", "chat_history"],
             template=self.load_prompt_template("prompt.txt")
@@ -49,55 +125,103 @@ class Offline_RAG:
         return rag_chain
 
     def get_chain(self):
-        from src.rag.vectorstore import VectorDB
+        registry = self.get_registry()
         
         def dynamic_retrieval_chain(inputs):
             source_type = inputs.get("source_type", "judgment")
             question = inputs["question"]
             chat_history = inputs.get("chat_history", "")
             
-            if source_type == "law":
-                collection_name = "law_collection"
-            else:
-                collection_name = "judgment_collection"
-            
-            retriever = VectorDB(collection_name=collection_name).get_retriever()
-            context = self.format_docs(retriever.invoke(question), source_type=source_type)
+            filters = inputs.get("filters") or None
             
-            formatted_inputs = {
-                "context": context,
-                "question": question,
-                "chat_history": chat_history
-            }
+            question_vector = None
+            if self.answer_cache is not None and not chat_history and not filters:
+                question_vector = self.answer_cache.embed(question)
+                cached_answer = self.answer_cache.lookup(question_vector, source_type)
+                if cached_answer is not None:
+                    return cached_answer
             
-            response = self.prompt.format(**formatted_inputs)
-            llm_response = self.llm.invoke(response)
+            retriever = registry.get_retriever(source_type)
+            docs = retriever.invoke(question, filters=filters)
+            response = self.build_prompt(docs, question, source_type, chat_history)
+            with span("generate"):
+                llm_response = self.llm.invoke(response)
             
-            return self.str_parser.parse(llm_response.content if hasattr(llm_response, 'content') else str(llm_response))
+            answer = self.parse_response(llm_response)
+            if question_vector is not None:
+                self.answer_cache.store(question_vector, source_type, question, answer)
+            return answer
         
         return dynamic_retrieval_chain
 
+    def get_registry(self):
+        if self.registry is None:
+            from src.rag.registry import RetrieverRegistry
+            self.registry = RetrieverRegistry()
+        return self.registry
+
+    def build_prompt(self, docs, question, source_type=None, chat_history=""):
+        observe_retrieval(source_type, len(docs))
+        with span("format"):
+            context = self.format_docs(docs, source_type=source_type)
+        formatted_inputs = {
+            "context": context,
+            "question": question,
+            "chat_history": chat_history
+        }
+        with span("prompt"):
+            prompt = self.prompt.format(**formatted_inputs)
+        observe_prompt(source_type, prompt)
+        return prompt
+
+    def parse_response(self, llm_response):
+        with span("parse"):
+            return self.str_parser.parse(llm_response.content if hasattr(llm_response, 'content') else str(llm_response))
+
     def format_docs(self, docs, source_type=None):
-        sorted_docs = sorted(docs, key=self._get_sort_key)
+        if source_type == "all":
+            blocks = self._pack_by_source_type(docs)
+        else:
+            blocks = self.context_packer.pack(docs)
+        sorted_blocks = sorted(blocks, key=lambda block: self._get_sort_key(block.docs[0]))
         formatted_docs = []
 
-        for doc in sorted_docs:
-            chunk_index = doc.metadata.get("chunk_index", "")
-            section = doc.metadata.get("section", "")
-            source = doc.metadata.get("source", "")
+        for block in sorted_blocks:
+            chunk_index = block.chunk_index
+            section = block.metadata.get("section", "")
+            source = block.metadata.get("source", "")
 
-            if source_type == "judgment" and source:
+            is_judgment = source_type == "judgment" or (
+                source_type == "all" and block.metadata.get("file_type") == "json"
+            )
+            if is_judgment and source:
                 header = f"[BẢN ÁN: {source}]"
             elif section and chunk_index:
                 header = f"[{section} - {chunk_index}]"
             else:
                 header = ""
             
-            formatted_content = f"{header}\n{doc.page_content}" if header else doc.page_content
+            formatted_content = f"{header}\n{block.text}" if header else block.text
             formatted_docs.append(formatted_content)
 
         return "\n\n".join(formatted_docs)
         
+    def _pack_by_source_type(self, docs):
+        """Give each collection its configured share of the context budget"""
+        max_tokens = self.context_packer.max_tokens
+        groups = {}
+        for doc in docs:
+            groups.setdefault(doc.metadata.get("_source_type", "judgment"), []).append(doc)
+
+        total_share = sum(self.source_shares.get(source_type, 0) for source_type in groups) or 1.0
+        blocks = []
+        for source_type, group in groups.items():
+            budget = None
+            if max_tokens is not None:
+                budget = int(max_tokens * self.source_shares.get(source_type, 0) / total_share)
+            blocks.extend(self.context_packer.pack(group, max_tokens=budget))
+        return blocks
+
     def _get_sort_key(self, doc):
         chunk_index = doc.metadata.get("chunk_index", "")
         if not chunk_index:
@@ -117,4 +241,79 @@ class Offline_RAG:
     def load_prompt_template(self, filename):
         path = os.path.join(os.path.dirname(__file__), filename)
         with open(path, "r", encoding="utf-8") as f:
-            return f.read()
\ No newline at end of file
+            return f.read()
+
+
+class AsyncOffline_RAG(Offline_RAG):
+    """Offline_RAG whose chain awaits retrieval and generation instead of blocking the event loop"""
+
+    def get_chain(self):
+        registry = self.get_registry()
+
+        async def dynamic_retrieval_chain(inputs):
+            source_type = inputs.get("source_type", "judgment")
+            question = inputs["question"]
+            chat_history = inputs.get("chat_history", "")
+
+            filters = inputs.get("filters") or None
+
+            question_vector = None
+            if self.answer_cache is not None and not chat_history and not filters:
+                question_vector = await self.answer_cache.aembed(question)
+                cached_answer = self.answer_cache.lookup(question_vector, source_type)
+                if cached_answer is not None:
+                    return cached_answer
+
+            retriever = registry.get_retriever(source_type)
+            docs = await retriever.ainvoke(question, filters=filters)
+            response = self.build_prompt(docs, question, source_type, chat_history)
+            with span("generate"):
+                llm_response = await self.llm.ainvoke(response)
+
+            answer = self.parse_response(llm_response)
+            if question_vector is not None:
+                self.answer_cache.store(question_vector, source_type, question, answer)
+            return answer
+
+        return dynamic_retrieval_chain
+
+    def get_stream_chain(self):
+        registry = self.get_registry()
+
+        async def stream_retrieval_chain(inputs):
+            source_type = inputs.get("source_type", "judgment")
+            question = inputs["question"]
+            chat_history = inputs.get("chat_history", "")
+
+            filters = inputs.get("filters") or None
+
+            question_vector = None
+            if self.answer_cache is not None and not chat_history and not filters:
+                question_vector = await self.answer_cache.aembed(question)
+                cached_answer = self.answer_cache.lookup(question_vector, source_type)
+                if cached_answer is not None:
+                    yield cached_answer
+                    return
+
+            retriever = registry.get_retriever(source_type)
+            docs = await retriever.ainvoke(question, filters=filters)
+            response = self.build_prompt(docs, question, source_type, chat_history)
+
+            extractor = StreamingAnswerExtractor()
+            parts = []
+            # Covers the whole stream, including the time the client takes to consume it
+            with span("generate"):
+                async for chunk in self.llm.astream(response):
+                    text = extractor.feed(chunk.content if hasattr(chunk, 'content') else str(chunk))
+                    if text:
+                        parts.append(text)
+                        yield text
+            text = extractor.finish()
+            if text:
+                parts.append(text)
+                yield text
+
+            if question_vector is not None:
+                self.answer_cache.store(question_vector, source_type, question, "".join(parts))
+
+        return stream_retrieval_chain
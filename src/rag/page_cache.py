@@ -0,0 +1,116 @@
+from typing import Iterator, Optional
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from src.rag.index_state import data_path
+
+class DiskPageCache:
+    """Extracted judgment text keyed by URL, zlib-compressed in SQLite.
+
+    Entries keep the HTTP validators for conditional requests plus fetch and
+    last-check timestamps. When the compressed size exceeds max_bytes, the
+    entries checked least recently are evicted down to 90% of the limit.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 1024 * 1024 * 1024, compress_level: int = 6) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compress_level = compress_level
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, body BLOB NOT NULL, size INTEGER NOT NULL, "
+            "etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL, checked_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_checked_at ON pages (checked_at)")
+        self._conn.commit()
+        self.total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def get(self, url: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, fetched_at, checked_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        body, etag, last_modified, fetched_at, checked_at = row
+        return {
+            "text": zlib.decompress(body).decode("utf-8"),
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": fetched_at,
+            "checked_at": checked_at
+        }
+
+    def put(self, url: str, text: str, etag: str = None, last_modified: str = None):
+        body = zlib.compress(text.encode("utf-8"), self.compress_level)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, body, size, etag, last_modified, fetched_at, checked_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, body, len(body), etag, last_modified, now, now)
+            )
+            self.total_bytes += len(body) - (row[0] if row else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict(int(self.max_bytes * 0.9))
+            self._conn.commit()
+
+    def touch(self, url: str):
+        """Record a successful revalidation (304)"""
+        with self._lock:
+            self._conn.execute("UPDATE pages SET checked_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def _evict(self, target_bytes: int):
+        rows = self._conn.execute("SELECT url, size FROM pages ORDER BY checked_at").fetchall()
+        evicted = []
+        for url, size in rows:
+            if self.total_bytes <= target_bytes:
+                break
+            evicted.append((url,))
+            self.total_bytes -= size
+        self._conn.executemany("DELETE FROM pages WHERE url = ?", evicted)
+        self.evictions += len(evicted)
+
+    def urls(self) -> Iterator[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT url FROM pages").fetchall()
+        return (url for (url,) in rows)
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM pages WHERE url = ?", (url,)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
+
+def build_page_cache() -> Optional[DiskPageCache]:
+    """Page cache configured from the environment, or None when PAGE_CACHE=0"""
+    if os.getenv("PAGE_CACHE", "1") == "0":
+        return None
+    max_mb = float(os.getenv("PAGE_CACHE_MAX_MB", 1024))
+    path = os.getenv("PAGE_CACHE_PATH") or data_path("pages.sqlite3")
+    return DiskPageCache(path, max_bytes=int(max_mb * 1024 * 1024))
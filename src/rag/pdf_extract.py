@@ -0,0 +1,95 @@
+from typing import List, Optional, Tuple
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from src.rag.index_state import data_path
+
+# Bump when extraction changes so cached page text is not reused
+EXTRACTOR_VERSION = 1
+
+def page_count(pdf_file: str) -> int:
+    from pypdf import PdfReader
+    return len(PdfReader(pdf_file).pages)
+
+def page_ranges(num_pages: int, workers: int, min_pages: int = 4) -> List[Tuple[int, int]]:
+    """Split [0, num_pages) into about one contiguous range per worker"""
+    size = max(min_pages, math.ceil(num_pages / max(1, workers)))
+    return [(start, min(start + size, num_pages)) for start in range(0, num_pages, size)]
+
+def pdfminer_pages(pdf_file: str, start: int = 0, end: int = None) -> List[Tuple[int, str]]:
+    """[(page, text)] from one pdfminer layout pass (all pages from start when end is None)"""
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+
+    if end is None and start:
+        end = page_count(pdf_file)
+    page_numbers = range(start, end) if end is not None else None
+    pages = []
+    for page, page_layout in enumerate(extract_pages(pdf_file, page_numbers=page_numbers), start):
+        text = "".join(element.get_text() for element in page_layout if isinstance(element, LTTextContainer))
+        pages.append((page, text))
+    return pages
+
+def extract_page_range(pdf_file: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Process-pool worker: [(page, text)] for pages [start, end) of one PDF.
+
+    Uses pypdf and falls back to a single pdfminer layout pass over the same
+    range when pypdf fails or finds no text.
+    """
+    try:
+        from pypdf import PdfReader
+        reader = PdfReader(pdf_file)
+        pages = [(i, reader.pages[i].extract_text() or "") for i in range(start, end)]
+        if any(text.strip() for _, text in pages):
+            return pages
+    except Exception as e:
+        print(f"pypdf failed on {pdf_file} pages {start}-{end}: {e}")
+    return pdfminer_pages(pdf_file, start, end)
+
+class PdfTextCache:
+    """Extracted page text keyed by PDF content hash, so unchanged PDFs are never parsed again"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pdf_pages ("
+            "file_hash TEXT NOT NULL, version INTEGER NOT NULL, pages BLOB NOT NULL, created REAL NOT NULL, "
+            "PRIMARY KEY (file_hash, version))"
+        )
+        self._conn.commit()
+
+    def get(self, file_hash: str) -> Optional[List[Tuple[int, str]]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT pages FROM pdf_pages WHERE file_hash = ? AND version = ?", (file_hash, EXTRACTOR_VERSION)
+            ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [tuple(page) for page in json.loads(zlib.decompress(row[0]).decode("utf-8"))]
+
+    def put(self, file_hash: str, pages: List[Tuple[int, str]]):
+        body = zlib.compress(json.dumps(pages, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pdf_pages (file_hash, version, pages, created) VALUES (?, ?, ?, ?)",
+                (file_hash, EXTRACTOR_VERSION, body, time.time())
+            )
+            self._conn.commit()
+
+def build_pdf_text_cache() -> Optional[PdfTextCache]:
+    """PDF page text cache configured from the environment, or None when PDF_TEXT_CACHE=0"""
+    if os.getenv("PDF_TEXT_CACHE", "1") == "0":
+        return None
+    return PdfTextCache(os.getenv("PDF_TEXT_CACHE_PATH") or data_path("pdf_text.sqlite3"))
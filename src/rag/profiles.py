@@ -0,0 +1,91 @@
+from typing import Optional
+import os
+from qdrant_client import models
+
+# Collection profiles: HNSW build/search settings, int8 quantization and on-disk storage.
+#   m, ef_construct  HNSW graph degree and build beam (None keeps Qdrant's 16/100)
+#   ef               search beam (None keeps Qdrant's default)
+#   quantization     "int8" keeps a scalar-quantized copy of every vector for search
+#   always_ram       keep the quantized vectors in RAM even when everything else is on disk
+#   rescore          re-rank quantized candidates with the original vectors, oversampling x limit of them
+#   on_disk          original vectors memory-mapped from disk instead of held in RAM
+#   hnsw_on_disk     HNSW graph memory-mapped from disk
+COLLECTION_PROFILES = {
+    "default": {},
+    "accurate": {"m": 32, "ef_construct": 256, "ef": 256},
+    "compact": {
+        "m": 16, "ef_construct": 128, "ef": 128,
+        "quantization": "int8", "always_ram": True, "rescore": True, "oversampling": 2.0,
+        "on_disk": True
+    },
+    "low_memory": {
+        "m": 16, "ef_construct": 128, "ef": 128,
+        "quantization": "int8", "always_ram": False, "rescore": True, "oversampling": 2.0,
+        "on_disk": True, "hnsw_on_disk": True
+    }
+}
+
+def get_profile(name: Optional[str] = None) -> dict:
+    """Profile settings by name; COLLECTION_PROFILE selects it when no name is given"""
+    name = name or os.getenv("COLLECTION_PROFILE", "default")
+    if name not in COLLECTION_PROFILES:
+        raise ValueError(f"Unknown collection profile '{name}', expected one of {', '.join(COLLECTION_PROFILES)}")
+    return {"name": name, **COLLECTION_PROFILES[name]}
+
+def vectors_config(size: int, profile: dict) -> models.VectorParams:
+    return models.VectorParams(
+        size=size,
+        distance=models.Distance.COSINE,
+        on_disk=profile.get("on_disk") or None
+    )
+
+def hnsw_config(profile: dict) -> Optional[models.HnswConfigDiff]:
+    if not any(profile.get(key) is not None for key in ("m", "ef_construct", "hnsw_on_disk")):
+        return None
+    return models.HnswConfigDiff(
+        m=profile.get("m"),
+        ef_construct=profile.get("ef_construct"),
+        on_disk=profile.get("hnsw_on_disk")
+    )
+
+def quantization_config(profile: dict) -> Optional[models.ScalarQuantization]:
+    if profile.get("quantization") is None:
+        return None
+    if profile["quantization"] != "int8":
+        raise ValueError(f"Unsupported quantization '{profile['quantization']}', only int8 is available")
+    return models.ScalarQuantization(
+        scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8,
+            quantile=0.99,
+            always_ram=profile.get("always_ram", True)
+        )
+    )
+
+def search_params(profile: dict) -> Optional[models.SearchParams]:
+    """Query-time HNSW beam and quantization rescoring for a profile (None for Qdrant defaults)"""
+    quantization = None
+    if profile.get("quantization") is not None:
+        quantization = models.QuantizationSearchParams(
+            rescore=profile.get("rescore", True),
+            oversampling=profile.get("oversampling")
+        )
+    if profile.get("ef") is None and quantization is None:
+        return None
+    return models.SearchParams(hnsw_ef=profile.get("ef"), quantization=quantization)
+
+def estimate_memory(num_vectors: int, dim: int, profile: dict) -> dict:
+    """Rough bytes Qdrant keeps resident for the vectors and graph of one collection under a profile.
+
+    Original vectors are float32; the HNSW graph stores about 2*m u32 links
+    per point on its base layer. Parts placed on disk are only cached by the
+    OS page cache when RAM is available.
+    """
+    vectors = num_vectors * dim * 4
+    quantized = num_vectors * dim if profile.get("quantization") == "int8" else 0
+    graph = num_vectors * (profile.get("m") or 16) * 2 * 4
+    resident = (
+        (0 if profile.get("on_disk") else vectors)
+        + (quantized if profile.get("always_ram", True) else 0)
+        + (0 if profile.get("hnsw_on_disk") else graph)
+    )
+    return {"vectors": vectors, "quantized": quantized, "graph": graph, "resident": resident}
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+import time
+
+RATE_LIMIT_MARKERS = ("429", "resource_exhausted", "resourceexhausted", "rate limit", "ratelimit", "quota", "too many requests")
+
+def is_rate_limit_error(error: Exception) -> bool:
+    text = f"{error.__class__.__name__} {error}".lower()
+    return any(marker in text for marker in RATE_LIMIT_MARKERS)
+
+class TokenBucket:
+    """Token bucket shared by worker threads or coroutines, with a global pause for backoff"""
+
+    def __init__(self, rate: float = None, capacity: float = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate or 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        """Take tokens if available, otherwise return how long to wait"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.rate is None:
+                return 0.0
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0):
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: float = 1.0):
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def backoff(self, seconds: float):
+        """Stop handing out tokens for the given time, e.g. after a 429"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
@@ -0,0 +1,188 @@
+import threading
+import os
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from dotenv import load_dotenv
+
+from src.rag.vectorstore import VectorDB
+from src.rag.embedded_store import AsyncEmbeddedClient, EmbeddedClient, aconnect, connect
+from src.rag.embedding_cache import CachedEmbeddings, cached_embeddings
+from src.rag.embedding_batcher import BatchingEmbeddings, batching_embeddings
+from src.rag.bm25 import BM25Store, HybridRetriever, bm25_path
+from src.rag.diversity import MMRRetriever
+from src.rag.multi_retriever import MultiCollectionRetriever
+
+load_dotenv()
+
+COLLECTIONS = {
+    "judgment": "judgment_collection",
+    "law": "law_collection"
+}
+
+class RetrieverRegistry:
+    """Builds one VectorDB per collection and shares it across requests"""
+
+    def __init__(self,
+                 collections: dict = None,
+                 embedding=None,
+                 client=None,
+                 async_client=None,
+                 location=os.getenv("VECTOR_DB_URL"),
+                 search_kwargs: dict = None,
+                 retrieval_mode: str = os.getenv("RETRIEVAL_MODE", "hybrid"),
+                 max_per_source: int = int(os.getenv("MAX_PER_SOURCE", "0")),
+                 lambda_mult: float = float(os.getenv("MMR_LAMBDA", "0.5"))) -> None:
+        self.collections = collections or dict(COLLECTIONS)
+        self.location = location
+        self.search_kwargs = search_kwargs or {"k": 5}
+        self.retrieval_mode = retrieval_mode
+        self.max_per_source = self.search_kwargs.get("max_per_source", max_per_source)
+        self.lambda_mult = self.search_kwargs.get("lambda_mult", lambda_mult)
+        self._embedding = self._wrap_embedding(embedding) if embedding is not None else None
+        self._client = client
+        self._async_client = async_client
+        self._vector_dbs = {}
+        self._retrievers = {}
+        self._lock = threading.Lock()
+
+    @property
+    def embedding(self):
+        if self._embedding is None:
+            with self._lock:
+                if self._embedding is None:
+                    self._embedding = self._wrap_embedding(GoogleGenerativeAIEmbeddings(
+                        model="models/embedding-001",
+                        google_api_key=os.getenv("GEMINI_API_KEY")
+                    ))
+        return self._embedding
+
+    @staticmethod
+    def _wrap_embedding(embedding):
+        if isinstance(embedding, CachedEmbeddings):
+            return embedding
+        return cached_embeddings(batching_embeddings(embedding))
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = connect(self.location)
+        return self._client
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            with self._lock:
+                if self._async_client is None:
+                    if isinstance(self._client, EmbeddedClient):
+                        self._async_client = AsyncEmbeddedClient(self._client)
+                    else:
+                        self._async_client = aconnect(self.location)
+        return self._async_client
+
+    def collection_name(self, source_type: str) -> str:
+        return self.collections.get(source_type, self.collections["judgment"])
+
+    def get_vector_db(self, source_type: str) -> VectorDB:
+        collection_name = self.collection_name(source_type)
+        vector_db = self._vector_dbs.get(collection_name)
+        if vector_db is not None:
+            return vector_db
+
+        embedding = self.embedding
+        client = self.client
+        async_client = self.async_client
+        with self._lock:
+            vector_db = self._vector_dbs.get(collection_name)
+            if vector_db is None:
+                vector_db = VectorDB(
+                    collection_name=collection_name,
+                    embedding=embedding,
+                    location=self.location,
+                    client=client,
+                    async_client=async_client
+                )
+                self._vector_dbs[collection_name] = vector_db
+                self._retrievers[collection_name] = self._build_retriever(vector_db)
+        return vector_db
+
+    def _build_retriever(self, vector_db):
+        k = self.search_kwargs.get("k", 5)
+        fetch_k = self.search_kwargs.get("fetch_k", max(4 * k, 20))
+        if self.retrieval_mode == "mmr":
+            print(f"Using MMR retrieval for '{vector_db.collection_name}' "
+                  f"(lambda {self.lambda_mult}, at most {self.max_per_source or 'any'} chunks per source)")
+            return MMRRetriever(
+                vector_db=vector_db,
+                k=k,
+                fetch_k=fetch_k,
+                lambda_mult=self.lambda_mult,
+                max_per_source=self.max_per_source
+            )
+        if self.retrieval_mode == "hybrid":
+            bm25_store = BM25Store(bm25_path(vector_db.collection_name))
+            if bm25_store.exists():
+                print(f"Using hybrid BM25 + dense retrieval for '{vector_db.collection_name}'")
+                return HybridRetriever(
+                    vector_db=vector_db,
+                    bm25_store=bm25_store,
+                    k=k,
+                    fetch_k=fetch_k,
+                    max_per_source=self.max_per_source
+                )
+            print(f"No BM25 index for '{vector_db.collection_name}', using dense retrieval only")
+        return vector_db.get_retriever({"k": k})
+
+    def get_retriever(self, source_type: str):
+        if source_type == "all":
+            return self._get_all_retriever()
+        collection_name = self.collection_name(source_type)
+        retriever = self._retrievers.get(collection_name)
+        if retriever is None:
+            self.get_vector_db(source_type)
+            retriever = self._retrievers[collection_name]
+        return retriever
+
+    def _get_all_retriever(self):
+        retriever = self._retrievers.get("all")
+        if retriever is not None:
+            return retriever
+
+        retrievers = {}
+        for source_type in self.collections:
+            try:
+                retrievers[source_type] = self.get_retriever(source_type)
+            except Exception as e:
+                print(f"Skipping '{source_type}' in multi-collection search: {e}")
+        if not retrievers:
+            raise ValueError("No collection is available for source_type 'all'")
+
+        retriever = MultiCollectionRetriever(retrievers=retrievers)
+        with self._lock:
+            if len(retrievers) == len(self.collections):
+                self._retrievers["all"] = retriever
+        return retriever
+
+    def warmup(self):
+        """Build every collection up front and open the Qdrant connection"""
+        for source_type, collection_name in self.collections.items():
+            try:
+                self.get_vector_db(source_type)
+                self.client.count(collection_name=collection_name)
+                print(f"Retriever for '{collection_name}' is ready")
+            except Exception as e:
+                print(f"Could not warm up retriever for '{collection_name}': {e}")
+
+    def stats(self) -> dict:
+        stats = {"embedding_cache": self.embedding.stats()}
+        if isinstance(self.embedding.embedding, BatchingEmbeddings):
+            stats["embedding_batcher"] = self.embedding.embedding.stats()
+        return stats
+
+    async def awarmup(self):
+        """Same as warmup, and also opens the async Qdrant connection"""
+        self.warmup()
+        try:
+            await self.async_client.get_collections()
+        except Exception as e:
+            print(f"Could not warm up async Qdrant client: {e}")
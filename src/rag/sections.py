@@ -0,0 +1,68 @@
+from typing import List, NamedTuple, Optional
+from concurrent.futures import ProcessPoolExecutor
+import os
+import re
+
+SECTION_TITLES = ["THÔNG TIN VỤ ÁN", "NỘI DUNG VỤ ÁN", "NHẬN ĐỊNH CỦA TÒA ÁN", "QUYẾT ĐỊNH"]
+
+class Segment(NamedTuple):
+    """Offsets of one section/article: its heading is text[start:name_end], its body text[start:end]"""
+    start: int
+    end: int
+    name_end: int
+    number: Optional[str] = None
+    title: Optional[str] = None
+
+    def name(self, text: str) -> str:
+        if self.title is not None:
+            return self.title
+        return text[self.start:self.name_end].strip()
+
+    def body(self, text: str) -> str:
+        return text[self.start:self.end].strip()
+
+class SegmentTokenizer:
+    """Splits a text at heading matches of one precompiled pattern in a single pass.
+
+    Each segment runs from its heading to the next one; text before the first
+    heading is not part of any segment. A named group "number" is kept on the
+    segment (e.g. the article number of "Điều 51").
+
+    Matching is case-insensitive. The pattern is written in lower case and run
+    case-sensitively over text.lower(), which is several times faster than
+    re.IGNORECASE; the latter is only used if lowercasing changes the length,
+    since offsets must point into the original text.
+    """
+
+    def __init__(self, pattern: str) -> None:
+        self.regex = re.compile(pattern)
+        self.ignorecase_regex = re.compile(pattern, re.IGNORECASE)
+
+    def tokenize(self, text: str) -> List[Segment]:
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            matches = list(self.regex.finditer(lowered))
+        else:
+            matches = list(self.ignorecase_regex.finditer(text))
+        segments = []
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+            number = match.group("number") if "number" in self.regex.groupindex else None
+            segments.append(Segment(match.start(), end, match.end(), number))
+        return segments
+
+SECTION_TOKENIZER = SegmentTokenizer("|".join(re.escape(title.lower()) for title in SECTION_TITLES))
+ARTICLE_TOKENIZER = SegmentTokenizer(r"điều\s+(?P<number>\d+)\.?\s*[^\n]*")
+
+def _split_batch(splitter, documents):
+    return splitter(documents)
+
+def parallel_split(splitter, documents, processes: int = None, batch_size: int = 32):
+    """Run a splitter over many documents in a process pool, keeping document order"""
+    processes = processes or os.cpu_count() or 1
+    if processes <= 1 or len(documents) <= batch_size:
+        return splitter(documents)
+    batches = [documents[i:i+batch_size] for i in range(0, len(documents), batch_size)]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        results = executor.map(_split_batch, [splitter] * len(batches), batches)
+        return [chunk for chunks in results for chunk in chunks]
@@ -1,10 +1,9 @@
 from typing import List, Optional
-import re
 import os
-import uuid
-import hashlib
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from src.rag.ids import chunk_id, document_chunk_id, segment_id, source_id
+from src.rag.sections import ARTICLE_TOKENIZER, SECTION_TOKENIZER, Segment
 
 class TextSplitter:
     def __init__(self,
@@ -20,20 +19,23 @@ class TextSplitter:
         )
 
     def __call__(self, documents):
-        return self.splitter.split_documents(documents)
+        chunks = self.splitter.split_documents(documents)
+        positions = {}
+        for chunk in chunks:
+            # Position within the parent document (its doc_id before it is replaced by the chunk's)
+            parent = chunk.metadata.get("doc_id", chunk.metadata.get("source", ""))
+            position = positions[parent] = positions.get(parent, -1) + 1
+            chunk.metadata["doc_id"] = chunk_id(
+                chunk.page_content, chunk.metadata.get("source", ""), chunk.metadata.get("page", ""), position
+            )
+        return chunks
     
 class LegalDocumentSplitter:
     def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, min_chunk_size: int = 100):
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         self.min_chunk_size = min_chunk_size
-        
-        self.section_patterns = [
-            r'THÔNG TIN VỤ ÁN',
-            r'NỘI DUNG VỤ ÁN', 
-            r'NHẬN ĐỊNH CỦA TÒA ÁN',
-            r'QUYẾT ĐỊNH'
-        ]
+        self.tokenizer = SECTION_TOKENIZER
         
         self.splitter = RecursiveCharacterTextSplitter(
             separators=["\n\n", "\n", ". ", " ", ""],
@@ -46,14 +48,16 @@ class LegalDocumentSplitter:
         
         for doc in documents:
             source = doc.metadata.get("source", "unknown")
-            doc_hash = hashlib.md5(source.encode()).hexdigest()[:8]
+            published_date = doc.metadata.get("published_date")
+            parent_id = doc.metadata.get("doc_id") or source_id(source)
             
             sections = self._split_by_sections(doc.page_content)
             
-            chunk_counter = 0
             for section_idx, (section_name, section_text) in enumerate(sections):
                 if not section_text.strip() or len(section_text.strip()) < self.min_chunk_size:
                     continue
+                # Canonical heading (as in SECTION_TITLES) so section filters match exactly
+                section_name = section_name.upper()
                 
                 text_chunks = self.splitter.create_documents([section_text])
                 
@@ -61,45 +65,26 @@ class LegalDocumentSplitter:
                     if len(chunk.page_content.strip()) < self.min_chunk_size:
                         continue
                     
-                    chunk_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, 
-                                            f"{doc_hash}_{chunk_counter}"))
-                    
                     chunk.metadata.update({
                         "source": source,
                         "section": section_name,
                         "chunk_index": f"J.{section_idx}.{chunk_idx}",
-                        "doc_id": chunk_id,
+                        "parent_id": segment_id(parent_id, section_idx),
                         "file_type": "json"
                     })
+                    chunk.metadata["doc_id"] = document_chunk_id(chunk)
+                    if published_date:
+                        chunk.metadata["published_date"] = published_date
                     
                     result_chunks.append(chunk)
-                    chunk_counter += 1
         
         return result_chunks
     
     def _split_by_sections(self, text: str) -> List[tuple]:
-        sections = []
-        
-        section_positions = []
-        for pattern in self.section_patterns:
-            matches = list(re.finditer(pattern, text, re.IGNORECASE))
-            for match in matches:
-                section_positions.append((match.start(), match.group()))
-        
-        section_positions.sort()
-        
-        if not section_positions:
+        segments = self.tokenizer.tokenize(text)
+        if not segments:
             return [("DOCUMENT", text)]
-        
-        for i, (start_pos, section_name) in enumerate(section_positions):
-            end_pos = len(text)
-            if i < len(section_positions) - 1:
-                end_pos = section_positions[i + 1][0]
-            
-            section_text = text[start_pos:end_pos].strip()
-            sections.append((section_name, section_text))
-        
-        return sections
+        return [(segment.name(text), segment.body(text)) for segment in segments]
 
     def __call__(self, documents):
         return self.split_documents(documents)
@@ -109,8 +94,7 @@ class LawDocumentSplitter:
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         self.min_chunk_size = min_chunk_size
-        
-        self.article_pattern = re.compile(r'(Điều\s+\d+\.?\s*[^\n]*)', re.IGNORECASE)
+        self.tokenizer = ARTICLE_TOKENIZER
         
         self.splitter = RecursiveCharacterTextSplitter(
             separators=["\n\n", "\n", ". ", " ", ""],
@@ -120,23 +104,26 @@ class LawDocumentSplitter:
 
     def split_documents(self, documents: List[Document]) -> List[Document]:
         result_chunks = []
-        global_chunk_counter = 0
         
-        for doc_idx, doc in enumerate(documents):
+        for doc in documents:
             source = doc.metadata.get("source", "unknown")
-            doc_hash = hashlib.md5(source.encode()).hexdigest()[:8]
+            # Each PDF page is split on its own, and "Điều N" cross-references start
+            # articles too, so chunk_index repeats within a law; parent_id does not
+            parent_id = doc.metadata.get("doc_id") or source_id(source, doc.metadata.get("page"))
             
-            articles = self._find_articles(doc.page_content)
+            text = doc.page_content
+            articles = self._find_articles(text)
             
-            for article_idx, (article_name, article_text) in enumerate(articles):
-                if not article_text.strip():
+            for article_idx, article in enumerate(articles):
+                article_name = article.name(text)
+                article_text = article.body(text)
+                if not article_text:
                     continue
                 
-                article_num_match = re.search(r'(\d+)', article_name)
-                article_num = article_num_match.group(1) if article_num_match else str(article_idx)
+                article_num = article.number or str(article_idx)
                 
-                if len(article_text.strip()) < self.min_chunk_size:
-                    extended_text = self._get_extended_context(articles, article_idx)
+                if len(article_text) < self.min_chunk_size:
+                    extended_text = self._get_extended_context(text, articles, article_idx)
                     if len(extended_text) >= self.min_chunk_size:
                         article_text = extended_text
                     else:
@@ -149,55 +136,32 @@ class LawDocumentSplitter:
                     if len(chunk.page_content.strip()) < self.min_chunk_size:
                         continue
                     
-                    chunk_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, 
-                                            f"{doc_hash}_{doc_idx}_{article_idx}_{chunk_idx}"))
-                    
                     chunk.metadata.update({
                         "source": source,
                         "section": article_name,
                         "chunk_index": f"L.{article_num}.{chunk_idx}",
-                        "doc_id": chunk_id,
+                        "parent_id": segment_id(parent_id, article_idx),
                         "file_type": "pdf"
                     })
+                    chunk.metadata["doc_id"] = document_chunk_id(chunk)
+                    if article.number is not None:
+                        chunk.metadata["article"] = int(article.number)
                     
                     result_chunks.append(chunk)
-                    global_chunk_counter += 1
         
         return result_chunks
     
-    def _get_extended_context(self, articles, current_idx, max_context=2):
+    def _get_extended_context(self, text, articles, current_idx, max_context=2):
         """Get extended context by including surrounding articles"""
-        extended_text = ""
-        
         start_idx = max(0, current_idx - max_context)
         end_idx = min(len(articles), current_idx + max_context + 1)
-        
-        for idx in range(start_idx, end_idx):
-            if idx < len(articles):
-                extended_text += articles[idx][1] + "\n\n"
-        
-        return extended_text.strip()
+        return "\n\n".join(article.body(text) for article in articles[start_idx:end_idx]).strip()
     
-    def _find_articles(self, text: str) -> List[tuple]:
+    def _find_articles(self, text: str) -> List[Segment]:
         """Find law articles in Vietnamese legal text"""
-        articles = []
-        matches = list(self.article_pattern.finditer(text))
-        
-        if not matches:
-            return [("DOCUMENT", text)]
-        
-        for i, match in enumerate(matches):
-            article_name = match.group(1).strip()
-            start_pos = match.start()
-            
-            if i < len(matches) - 1:
-                end_pos = matches[i + 1].start()
-            else:
-                end_pos = len(text)
-            
-            article_text = text[start_pos:end_pos].strip()
-            articles.append((article_name, article_text))
-        
+        articles = self.tokenizer.tokenize(text)
+        if not articles:
+            return [Segment(0, len(text), 0, title="DOCUMENT")]
         return articles
 
     def __call__(self, documents):
@@ -1,13 +1,36 @@
+from typing import Any, List
 from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient, models
+from qdrant_client import models
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from src.rag.embedding_cache import cached_embeddings, get_model_name
+from src.rag.embedding_store import EmbeddingStore
+from src.rag.embedded_store import AsyncEmbeddedClient, EmbeddedClient, aconnect, connect
+from src.rag.index_state import bump_index_version
+from src.rag.ids import document_chunk_id
+from src.rag.filters import PAYLOAD_INDEXES, build_filter
+from src.rag.profiles import get_profile, hnsw_config, quantization_config, search_params, vectors_config
+from src.rag.ingest import IngestionEngine
+from src.rag.metrics import span
+from itertools import islice
+import numpy as np
 import os
-import uuid
-import hashlib
 from dotenv import load_dotenv
 
 load_dotenv()
 
+class VectorDBRetriever(BaseRetriever):
+    """Retriever over a VectorDB with a native async path"""
+    vector_db: Any
+    search_kwargs: dict = {"k": 5}
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None, filters: dict = None) -> List[Document]:
+        return self.vector_db.search(query, filters=filters, **self.search_kwargs)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None, filters: dict = None) -> List[Document]:
+        return await self.vector_db.asearch(query, filters=filters, **self.search_kwargs)
+
 class VectorDB:
     def __init__(self,
                 documents=None,
@@ -16,61 +39,74 @@ class VectorDB:
                 collection_name="judgment_collection",
                 location=os.getenv("VECTOR_DB_URL"),
                 client=None,
+                async_client=None,
                 reset_collection=False,
-                upsert=True
+                upsert=True,
+                ingest_kwargs=None,
+                embedding_store=None,
+                profile=None
             ) -> None:
 
-        self.embedding = embedding or GoogleGenerativeAIEmbeddings(
+        self.embedding = cached_embeddings(embedding or GoogleGenerativeAIEmbeddings(
             model="models/embedding-001",
             google_api_key=os.getenv("GEMINI_API_KEY")
-        )
+        ))
 
         self.vector_db = vector_db
         self.collection_name = collection_name
         self.location = location
-        self.client = client if client else QdrantClient(url=location)
+        self.client = client if client else connect(location)
+        self._async_client = async_client
         self.upsert = upsert
         self.reset_collection = reset_collection
+        self.ingest_kwargs = ingest_kwargs or {}
+        self._embedding_store = embedding_store
+        self.profile = get_profile(profile)
+        self.search_params = search_params(self.profile)
         
         if reset_collection:
             try:
                 self.client.delete_collection(collection_name)
+                bump_index_version(collection_name)
                 print(f"Deleted existing collection: {collection_name}")
             except Exception as e:
                 print(f"Collection {collection_name} didn't exist or couldn't be deleted: {e}")
         
         self.db = self._build_db(documents)
 
-    def get_document_ids(self, docs):
-        for doc in docs:
-            if "doc_id" in doc.metadata and doc.metadata["doc_id"]:
-                if isinstance(doc.metadata["doc_id"], int):
-                    doc.metadata["doc_id"] = str(uuid.uuid5(uuid.NAMESPACE_DNS, f"hash_{doc.metadata['doc_id']}"))
-                continue
-                
-            if "source" in doc.metadata and doc.metadata["source"]:
-                source = doc.metadata["source"]
-                content_hash = hashlib.md5(doc.page_content.encode()).hexdigest()[:8]
-                unique_str = f"{source}_{content_hash}"
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            if isinstance(self.client, EmbeddedClient):
+                self._async_client = AsyncEmbeddedClient(self.client)
             else:
-                unique_str = doc.page_content
-                
-            doc_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, unique_str))
+                self._async_client = aconnect(self.location)
+        return self._async_client
+
+    def _assign_document_id(self, doc):
+        """Point id from source, position and content (see src.rag.ids); ids set by the splitters are kept as is"""
+        doc_id = doc.metadata.get("doc_id")
+        if not isinstance(doc_id, str) or not doc_id:
+            doc_id = document_chunk_id(doc)
             doc.metadata["doc_id"] = doc_id
-        
-        return [doc.metadata["doc_id"] for doc in docs]
+        return doc_id
 
-    def _build_db(self, documents):
-        if documents is None:
-            db = self.vector_db(
-                client=self.client,
-                collection_name=self.collection_name,
-                embedding=self.embedding 
-            )
-            return db
-            
-        doc_ids = self.get_document_ids(documents)
-            
+    def get_document_ids(self, docs):
+        return [self._assign_document_id(doc) for doc in docs]
+
+    def _iter_with_ids(self, documents, counts):
+        """Assign ids and drop chunks whose id was already seen in this run, so duplicates are embedded once"""
+        seen = set()
+        for doc in documents:
+            doc_id = self._assign_document_id(doc)
+            if doc_id in seen:
+                counts["duplicates"] += 1
+                continue
+            seen.add(doc_id)
+            yield doc
+
+    def _ensure_collection(self):
+        """Create the collection if needed and return (existed_before, point_count)"""
         collections = self.client.get_collections()
         collection_exists = any(col.name == self.collection_name for col in collections.collections)
         
@@ -84,86 +120,112 @@ class VectorDB:
             
             self.client.create_collection(
                 collection_name=self.collection_name,
-                vectors_config=models.VectorParams(
-                    size=vector_size,
-                    distance=models.Distance.COSINE
-                )
+                vectors_config=vectors_config(vector_size, self.profile),
+                hnsw_config=hnsw_config(self.profile),
+                quantization_config=quantization_config(self.profile)
             )
-            print(f"Created new collection '{self.collection_name}'")
+            print(f"Created new collection '{self.collection_name}' with profile '{self.profile['name']}'")
+        self.ensure_payload_indexes()
+        return collection_exists, count
+
+    def apply_profile(self):
+        """Reconfigure an existing collection to this VectorDB's profile; Qdrant rebuilds segments in the background"""
+        profile = self.profile
+        self.client.update_collection(
+            collection_name=self.collection_name,
+            vectors_config={"": models.VectorParamsDiff(on_disk=bool(profile.get("on_disk")))},
+            hnsw_config=models.HnswConfigDiff(
+                m=profile.get("m", 16),
+                ef_construct=profile.get("ef_construct", 100),
+                on_disk=bool(profile.get("hnsw_on_disk"))
+            ),
+            quantization_config=quantization_config(profile) or models.Disabled.DISABLED
+        )
+        print(f"Applied profile '{profile['name']}' to collection '{self.collection_name}'")
+
+    def ensure_payload_indexes(self):
+        """Create the payload indexes used by metadata filters (see src.rag.filters) that the collection lacks"""
+        info = self.client.get_collection(self.collection_name)
+        existing = info.payload_schema or {}
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            if field_name in existing:
+                continue
+            self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field_name,
+                field_schema=field_schema
+            )
+            print(f"Created payload index on '{field_name}' in '{self.collection_name}'")
+
+    def _build_db(self, documents):
+        if documents is not None:
+            self.index_documents(documents)
+            
+        db = self.vector_db(
+            client=self.client,
+            collection_name=self.collection_name,
+            embedding=self.embedding
+        )
+        return db
+
+    def index_documents(self, documents):
+        """Index a list of chunks, or stream them from any iterable without materializing it"""
+        counts = {"duplicates": 0}
+        if isinstance(documents, (list, tuple)):
+            documents = list(self._iter_with_ids(documents, counts))
+            described = f"{len(documents)} documents"
+        else:
+            documents = self._iter_with_ids(documents, counts)
+            described = "streamed documents"
+            
+        collection_exists, count = self._ensure_collection()
             
         if self.reset_collection:
-            print(f"RESET MODE: Adding all {len(documents)} documents to collection '{self.collection_name}'")
-            self._add_all_documents(documents)
+            print(f"RESET MODE: Adding all {described} to collection '{self.collection_name}'")
+            stats = self._add_all_documents(documents)
             
         elif self.upsert and collection_exists:
-            print(f"UPSERT MODE: Checking {len(documents)} documents for new ones in collection '{self.collection_name}'")
-            self._upsert_new_documents(documents, count)
+            print(f"UPSERT MODE: Checking {described} for new ones in collection '{self.collection_name}'")
+            stats = self._upsert_new_documents(documents, count)
             
         else:
-            print(f"DEFAULT MODE: Adding all {len(documents)} documents to collection '{self.collection_name}'")
-            self._add_all_documents(documents)
-            
-        db = self.vector_db(
+            print(f"DEFAULT MODE: Adding all {described} to collection '{self.collection_name}'")
+            stats = self._add_all_documents(documents)
+        
+        if counts["duplicates"]:
+            print(f"Collapsed {counts['duplicates']} duplicate chunks into existing points")
+        bump_index_version(self.collection_name)
+        return stats
+    
+    @property
+    def embedding_store(self):
+        """Local store of document embeddings consulted before the embedding API (EMBEDDING_STORE=0 disables it)"""
+        if self._embedding_store is None and os.getenv("EMBEDDING_STORE", "1") != "0":
+            self._embedding_store = EmbeddingStore.for_model(get_model_name(self.embedding))
+        return self._embedding_store
+
+    def _ingest(self, documents):
+        engine = IngestionEngine(
+            embedding=self.embedding,
             client=self.client,
             collection_name=self.collection_name,
-            embedding=self.embedding
+            embedding_store=self.embedding_store,
+            **self.ingest_kwargs
         )
-        return db
-    
+        return engine.run(documents)
+
     def _add_all_documents(self, documents):
         """Add all documents without checking for existing ones"""
-        optimal_batch = min(max(50, len(documents) // 10), 200)
-        
-        for i in range(0, len(documents), optimal_batch):
-            batch = documents[i:i+optimal_batch]
-            print(f"Processing batch {i//optimal_batch + 1}/{(len(documents)-1)//optimal_batch + 1}")
-            
-            texts = [doc.page_content for doc in batch]
-            embeddings = self.embedding.embed_documents(texts)
-            
-            points = []
-            for doc, embedding in zip(batch, embeddings):
-                doc_id = doc.metadata["doc_id"]
-                try:
-                    uuid.UUID(doc_id)
-                    points.append({
-                        "id": doc_id,
-                        "vector": embedding,
-                        "payload": {
-                            "page_content": doc.page_content,
-                            "metadata": doc.metadata
-                        }
-                    })
-                except ValueError:
-                    valid_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, doc_id))
-                    print(f"Converting ID {doc_id} to valid UUID: {valid_id}")
-                    points.append({
-                        "id": valid_id,
-                        "vector": embedding,
-                        "payload": {
-                            "page_content": doc.page_content,
-                            "metadata": {**doc.metadata, "doc_id": valid_id}
-                        }
-                    })
-                    
-                print(f"Upserting {len(points)} points to collection")
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=points
-            )
+        return self._ingest(documents)
     
-    def _upsert_new_documents(self, documents, original_count):
-        """Only add documents that don't already exist"""
-        batch_size = min(max(20, len(documents) // 20), 200)
-        total_processed = 0
-        skip_count = 0
-        
-        for i in range(0, len(documents), batch_size):
-            batch = documents[i:i+batch_size]
+    def _new_documents(self, documents, check_batch_size, counts):
+        documents = iter(documents)
+        while True:
+            batch = list(islice(documents, check_batch_size))
+            if not batch:
+                break
             batch_ids = [doc.metadata["doc_id"] for doc in batch]
             
-            print(f"Checking batch {i//batch_size + 1}: {len(batch)} documents")
-            
             try:
                 existing_points = self.client.retrieve(
                     collection_name=self.collection_name,
@@ -171,58 +233,128 @@ class VectorDB:
                     with_payload=False,
                     with_vectors=False
                 )
-                existing_ids = [point.id for point in existing_points]
-                print(f"Found {len(existing_ids)} existing documents in this batch")
+                existing_ids = {str(point.id) for point in existing_points}
             except Exception as e:
                 print(f"Error checking existing documents: {e}")
-                existing_ids = []
-            
-            new_batch = [doc for doc in batch if doc.metadata["doc_id"] not in existing_ids]
-            skip_count += len(batch) - len(new_batch)
-            
-            if not new_batch:
-                print(f"No new documents in this batch, skipping")
-                continue
-                
-            print(f"Adding {len(new_batch)} new documents from this batch")
-            embed_batch_size = min(50, len(new_batch))
-            all_points = []
-            
-            for j in range(0, len(new_batch), embed_batch_size):
-                sub_batch = new_batch[j:j+embed_batch_size]
-                texts = [doc.page_content for doc in sub_batch]
-                
-                embeddings = self.embedding.embed_documents(texts)
-                
-                for doc, embedding in zip(sub_batch, embeddings):
-                    doc_id = doc.metadata["doc_id"]
-                    all_points.append({
-                        "id": doc_id,
-                        "vector": embedding,
-                        "payload": {
-                            "page_content": doc.page_content,
-                            "metadata": doc.metadata
-                        }
-                    })
+                existing_ids = set()
             
-            if all_points:
-                self.client.upsert(
-                    collection_name=self.collection_name,
-                    points=all_points
-                )
-                total_processed += len(all_points)
+            for doc in batch:
+                if str(doc.metadata["doc_id"]) in existing_ids:
+                    counts["skipped"] += 1
+                else:
+                    yield doc
+    
+    def _upsert_new_documents(self, documents, original_count):
+        """Only add documents that don't already exist"""
+        if isinstance(documents, (list, tuple)):
+            check_batch_size = min(max(20, len(documents) // 20), 200)
+        else:
+            check_batch_size = 200
+        counts = {"skipped": 0}
         
-        print(f"Skipped {skip_count} existing documents")
-        print(f"Inserted {total_processed} new documents")
+        stats = self._ingest(self._new_documents(documents, check_batch_size, counts))
+        
+        print(f"Skipped {counts['skipped']} existing documents")
+        print(f"Inserted {stats['upserted']} new documents")
         
         new_count = self.client.count(collection_name=self.collection_name).count
         print(f"Collection now has {new_count} points (was {original_count})")
+        return stats
     
-    def search(self, query, k=5):
-        return self.db.similarity_search(query, k=k)
+    def delete_points(self, ids, batch_size=1000):
+        """Delete points by id, e.g. chunks of sources that were removed or re-split"""
+        ids = list(ids)
+        for i in range(0, len(ids), batch_size):
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=models.PointIdsList(points=ids[i:i+batch_size])
+            )
+        if ids:
+            bump_index_version(self.collection_name)
+            print(f"Deleted {len(ids)} stale points from '{self.collection_name}'")
+
+    def scroll_points(self, batch_size=256):
+        """Yield (point_id, page_content, metadata) for every point in the collection"""
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False
+            )
+            for point in points:
+                payload = point.payload or {}
+                yield point.id, payload.get("page_content", ""), payload.get("metadata") or {}
+            if offset is None:
+                break
+
+    def search(self, query, k=5, filters=None):
+        with span("embed"):
+            query_vector = self.embedding.embed_query(query)
+        return self.search_by_vector(query_vector, k=k, filters=filters)
+
+    async def asearch(self, query, k=5, filters=None):
+        with span("embed"):
+            query_vector = await self.embedding.aembed_query(query)
+        return await self.asearch_by_vector(query_vector, k=k, filters=filters)
+
+    def _query_kwargs(self, query_vector, k, filters, with_vectors=False):
+        return dict(
+            collection_name=self.collection_name,
+            query=query_vector,
+            query_filter=build_filter(filters),
+            search_params=self.search_params,
+            limit=k,
+            with_payload=True,
+            with_vectors=with_vectors
+        )
+
+    def search_by_vector(self, query_vector, k=5, filters=None):
+        with span("search"):
+            response = self.client.query_points(**self._query_kwargs(query_vector, k, filters))
+            return self._points_to_documents(response.points)
+
+    async def asearch_by_vector(self, query_vector, k=5, filters=None):
+        with span("search"):
+            response = await self.async_client.query_points(**self._query_kwargs(query_vector, k, filters))
+            return self._points_to_documents(response.points)
+
+    def search_with_vectors(self, query_vector, k=20, filters=None):
+        """Top-k documents together with their stored vectors as a (k, dim) float32 array, for client-side re-ranking"""
+        with span("search"):
+            response = self.client.query_points(**self._query_kwargs(query_vector, k, filters, with_vectors=True))
+            return self._points_to_documents(response.points), self._points_to_vectors(response.points)
+
+    async def asearch_with_vectors(self, query_vector, k=20, filters=None):
+        with span("search"):
+            response = await self.async_client.query_points(**self._query_kwargs(query_vector, k, filters, with_vectors=True))
+            return self._points_to_documents(response.points), self._points_to_vectors(response.points)
+
+    @staticmethod
+    def _points_to_vectors(points):
+        if not points:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.asarray([point.vector for point in points], dtype=np.float32)
+
+    def _points_to_documents(self, points):
+        documents = []
+        for point in points:
+            payload = point.payload or {}
+            metadata = dict(payload.get("metadata") or {})
+            metadata["_id"] = point.id
+            metadata["_collection_name"] = self.collection_name
+            if getattr(point, "score", None) is not None:
+                metadata["score"] = point.score
+            documents.append(Document(
+                page_content=payload.get("page_content", ""),
+                metadata=metadata
+            ))
+        return documents
         
     def get_retriever(self, search_kwargs=None):
         if search_kwargs is None:
             search_kwargs = {"k": 5}
             
-        return self.db.as_retriever(search_kwargs=search_kwargs)
+        return VectorDBRetriever(vector_db=self, search_kwargs=search_kwargs)
@@ -0,0 +1,275 @@
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+from email.utils import parsedate_to_datetime
+import asyncio
+import os
+import queue
+import threading
+import time
+import bs4
+import httpx
+from langchain_core.documents import Document
+
+from src.rag.ids import source_id
+from src.rag.ratelimit import TokenBucket
+
+CONTENT_ID = "vanban_content"
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+_DONE = object()
+
+def extract_text(html: str) -> str:
+    """Same extraction as WebBaseLoader with SoupStrainer(id="vanban_content")"""
+    soup = bs4.BeautifulSoup(html, "html.parser", parse_only=bs4.SoupStrainer(id=CONTENT_ID))
+    return soup.get_text()
+
+def make_documents(url: str, text: str) -> List[Document]:
+    return [Document(page_content=text, metadata={"source": url, "doc_id": source_id(url)})]
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class PageCache:
+    """In-process store of extracted page text and its HTTP validators, keyed by URL"""
+
+    def __init__(self) -> None:
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> Optional[dict]:
+        with self._lock:
+            return self._entries.get(url)
+
+    def put(self, url: str, text: str, etag: str = None, last_modified: str = None):
+        with self._lock:
+            self._entries[url] = {
+                "text": text,
+                "etag": etag,
+                "last_modified": last_modified,
+                "fetched_at": time.time()
+            }
+
+    def touch(self, url: str):
+        with self._lock:
+            if url in self._entries:
+                self._entries[url]["fetched_at"] = time.time()
+
+    def __len__(self):
+        return len(self._entries)
+
+class _Host:
+    def __init__(self, concurrency: int, rate: float) -> None:
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate=rate, capacity=1.0)
+
+class AsyncWebFetcher:
+    """Fetches judgment pages over one pooled httpx.AsyncClient.
+
+    Each host gets its own concurrency limit and token bucket; 429/5xx answers
+    pause that host (honouring Retry-After) before retrying. When a cache is
+    given, pages it already holds are revalidated with If-None-Match /
+    If-Modified-Since and a 304 reuses the cached text.
+    """
+
+    def __init__(self,
+                 per_host_concurrency: int = 8,
+                 per_host_rps: float = 8.0,
+                 max_connections: int = 64,
+                 timeout: float = 30.0,
+                 retries: int = 3,
+                 backoff_factor: float = 1.5,
+                 cache=None,
+                 headers: Dict[str, str] = None,
+                 transport=None) -> None:
+        self.per_host_concurrency = per_host_concurrency
+        self.per_host_rps = per_host_rps or None
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.cache = cache
+        self.headers = headers or {"User-Agent": os.getenv("USER_AGENT") or "Mozilla/5.0 (compatible; leco-indexer)"}
+        self.transport = transport
+        self._hosts = {}
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.fetched = 0
+        self.not_modified = 0
+        self.failed = 0
+        self.failures = {}
+        self.retried = 0
+        self.bytes = 0
+        self.elapsed = 0.0
+
+    def _host(self, url: str) -> _Host:
+        host = urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = _Host(self.per_host_concurrency, self.per_host_rps)
+        return self._hosts[host]
+
+    def _client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections
+        )
+        return httpx.AsyncClient(
+            headers=self.headers,
+            limits=limits,
+            timeout=self.timeout,
+            follow_redirects=True,
+            transport=self.transport
+        )
+
+    def _conditional_headers(self, cached: Optional[dict]) -> dict:
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        return headers
+
+    def _fail(self, url: str, message: str):
+        self.failed += 1
+        self.failures[url] = message
+        print(message)
+
+    async def fetch(self, client: httpx.AsyncClient, url: str) -> List[Document]:
+        """Documents of one page; any failure is recorded in failures and yields [] so the crawl goes on"""
+        try:
+            return await self._fetch(client, url)
+        except Exception as e:
+            self._fail(url, f"Failed to process {url}: {type(e).__name__}: {e}")
+            return []
+
+    async def _fetch(self, client: httpx.AsyncClient, url: str) -> List[Document]:
+        host = self._host(url)
+        # Cache lookups, HTML parsing and cache writes are blocking work, so they run in worker threads
+        cached = await asyncio.to_thread(self.cache.get, url) if self.cache is not None else None
+        for attempt in range(self.retries + 1):
+            wait_time = self.backoff_factor * (2 ** attempt)
+            try:
+                await host.bucket.aacquire()
+                async with host.semaphore:
+                    response = await client.get(url, headers=self._conditional_headers(cached))
+
+                if response.status_code == 304 and cached:
+                    self.not_modified += 1
+                    await asyncio.to_thread(self.cache.touch, url)
+                    return make_documents(url, cached["text"])
+
+                if response.status_code in RETRY_STATUSES:
+                    wait_time = retry_after_seconds(response.headers.get("Retry-After")) or wait_time
+                    host.bucket.backoff(wait_time)
+                    raise httpx.HTTPStatusError(f"HTTP {response.status_code}", request=response.request, response=response)
+
+                response.raise_for_status()
+                self.bytes += len(response.content)
+                text = await asyncio.to_thread(extract_text, response.text)
+                if self.cache is not None:
+                    await asyncio.to_thread(
+                        self.cache.put,
+                        url,
+                        text,
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified")
+                    )
+                self.fetched += 1
+                return make_documents(url, text)
+            except httpx.InvalidURL as e:
+                self._fail(url, f"Skipping invalid URL {url}: {e}")
+                return []
+            except httpx.HTTPError as e:
+                status = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+                if attempt < self.retries and (status is None or status in RETRY_STATUSES):
+                    self.retried += 1
+                    print(f"Error fetching {url}: {e}. Retrying in {wait_time:.1f}s...")
+                    await asyncio.sleep(wait_time)
+                else:
+                    self._fail(url, f"Failed to fetch {url} after {attempt+1} attempts: {e}")
+                    return []
+
+    async def afetch_all(self, urls: Iterable[str], on_result=None, max_pending: int = None) -> Dict[str, List[Document]]:
+        """Fetch every URL; on_result(url, documents) is awaited as each one completes.
+
+        max_pending bounds how many pages are being fetched or handed to
+        on_result at once, so a slow consumer also slows the crawl down.
+        """
+        self._reset_stats()
+        self._hosts = {}
+        start_time = time.time()
+        results = {}
+        slots = asyncio.Semaphore(max_pending) if max_pending else None
+        async with self._client() as client:
+            async def fetch_one(url):
+                if slots is not None:
+                    await slots.acquire()
+                try:
+                    documents = await self.fetch(client, url)
+                    if on_result is not None:
+                        await on_result(url, documents)
+                    else:
+                        results[url] = documents
+                finally:
+                    if slots is not None:
+                        slots.release()
+
+            await asyncio.gather(*(fetch_one(url) for url in dict.fromkeys(urls)))
+        self.elapsed = time.time() - start_time
+        return results
+
+    def fetch_all(self, urls: Iterable[str]) -> Dict[str, List[Document]]:
+        return asyncio.run(self.afetch_all(urls))
+
+    def iter_fetch(self, urls: Iterable[str], max_pending: int = 64):
+        """Yield (url, documents) from synchronous code while the event loop runs in a background thread.
+
+        At most max_pending fetched pages wait to be consumed; the fetcher
+        blocks on the bounded queue when the consumer falls behind.
+        """
+        results = queue.Queue(maxsize=max_pending)
+        errors = []
+
+        async def on_result(url, documents):
+            await asyncio.to_thread(results.put, (url, documents))
+
+        def run():
+            try:
+                asyncio.run(self.afetch_all(urls, on_result=on_result, max_pending=max_pending))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                results.put(_DONE)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            yield item
+        thread.join()
+        if errors:
+            raise errors[0]
+
+    def stats(self) -> dict:
+        done = self.fetched + self.not_modified
+        return {
+            "fetched": self.fetched,
+            "not_modified": self.not_modified,
+            "failed": self.failed,
+            "failures": dict(self.failures),
+            "retried": self.retried,
+            "bytes": self.bytes,
+            "elapsed": self.elapsed,
+            "pages_per_second": done / self.elapsed if self.elapsed else 0.0
+        }
@@ -2,8 +2,31 @@ import argparse
 import time
 import os
 import glob
-from src.rag.file_loader import Loader, get_optimal_workers
+import resource
+from itertools import chain
+from src.rag.file_loader import Loader, get_optimal_workers, extract_urls_from_json
 from src.rag.vectorstore import VectorDB
+from src.rag.bm25 import build_bm25_index
+from src.rag.manifest import IngestManifest, ChunkRecorder, file_fingerprint
+from src.rag.profiles import COLLECTION_PROFILES
+from src.rag.embedded_store import EmbeddedClient
+
+COLLECTION_BY_FILE_TYPE = {"json": "judgment_collection", "pdf": "law_collection"}
+
+def collect_sources(json_files, pdf_files):
+    """{source: (collection, fingerprint)} for every URL and PDF under data_dir"""
+    sources = {}
+    for json_file in json_files:
+        for url in extract_urls_from_json(json_file):
+            sources[url] = (COLLECTION_BY_FILE_TYPE["json"], None)
+    for pdf_file in pdf_files:
+        sources[pdf_file] = (COLLECTION_BY_FILE_TYPE["pdf"], file_fingerprint(pdf_file))
+    return sources
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
 
 def main():
     parser = argparse.ArgumentParser(description='Load and index legal documents')
@@ -13,9 +36,25 @@ def main():
     parser.add_argument('--workers', type=int, default=0, help='Number of workers (0=auto)')
     parser.add_argument('--chunk_size', type=int, default=1000, help='Document chunk size')
     parser.add_argument('--chunk_overlap', type=int, default=200, help='Document chunk overlap')
+    parser.add_argument('--embed_batch_size', type=int, default=64, help='Initial embedding batch size (adapts while running)')
+    parser.add_argument('--max_in_flight', type=int, default=4, help='Embedding batches in flight at once')
+    parser.add_argument('--embed_rps', type=float, default=0, help='Max embedding requests per second (0=unlimited)')
+    parser.add_argument('--fetch_concurrency', type=int, default=8, help='Concurrent judgment page requests per host')
+    parser.add_argument('--fetch_rps', type=float, default=8, help='Max judgment page requests per second per host (0=unlimited)')
+    parser.add_argument('--offline', action='store_true', help='Index judgments only from the local page cache, without fetching')
+    parser.add_argument('--no_bm25', action='store_true', help='Skip building the local BM25 index for hybrid retrieval')
+    parser.add_argument('--stream', action='store_true', help='Stream chunks to embedding as each source is fetched and split, with bounded memory')
+    parser.add_argument('--incremental', action='store_true', help='Skip sources unchanged since the last run and delete chunks of removed/changed ones')
+    parser.add_argument('--profile', choices=list(COLLECTION_PROFILES), default=None,
+                        help='Collection profile (HNSW, int8 quantization, on-disk vectors); also applied to existing collections. Defaults to COLLECTION_PROFILE')
     args = parser.parse_args()
     
     workers = args.workers if args.workers > 0 else get_optimal_workers()
+    ingest_kwargs = {
+        "batch_size": args.embed_batch_size,
+        "max_in_flight": args.max_in_flight,
+        "requests_per_second": args.embed_rps or None
+    }
     
     start_time = time.time()
     print(f"Loading documents from {args.data_dir} with {workers} workers...")
@@ -33,43 +72,116 @@ def main():
         split_kwargs={
             "chunk_size": args.chunk_size,
             "chunk_overlap": args.chunk_overlap
-        }
+        },
+        fetch_kwargs={
+            "per_host_concurrency": args.fetch_concurrency,
+            "per_host_rps": args.fetch_rps or None
+        },
+        offline=args.offline
     )
     
-    doc_loaded = loader.load_dir(args.data_dir, workers=workers)
+    manifest = None
+    skip_sources = set()
+    if args.incremental:
+        manifest = IngestManifest()
+        if args.reset:
+            manifest.clear()
+        splitter_config = {
+            "chunk_size": args.chunk_size,
+            "chunk_overlap": args.chunk_overlap,
+            "splitters": {ext: type(splitter).__name__ for ext, splitter in loader.doc_splitters.items()}
+        }
+        sources = collect_sources(json_files, pdf_files)
+        skip_sources, to_load, removed = manifest.plan(sources, splitter_config)
+        print(f"Manifest: {len(skip_sources)} unchanged, {len(to_load)} new or changed, {len(removed)} removed sources")
+    
+    recorder = ChunkRecorder()
+    vector_dbs = {}
     
-    load_time = time.time()
-    print(f"Loaded {len(doc_loaded)} document chunks in {load_time - start_time:.2f} seconds")
+    if args.stream:
+        files_by_type = {"json": json_files, "pdf": pdf_files}
+        for file_type, collection_name in COLLECTION_BY_FILE_TYPE.items():
+            chunks = loader.iter_load(files_by_type[file_type], workers=workers, skip_sources=skip_sources)
+            first_chunk = next(chunks, None)
+            if first_chunk is None:
+                continue
+            print(f"Streaming {file_type.upper()} chunks into '{collection_name}'...")
+            vector_dbs[collection_name] = VectorDB(
+                documents=recorder.observe(chain([first_chunk], chunks)),
+                collection_name=collection_name,
+                reset_collection=args.reset,
+                upsert=args.upsert,
+                ingest_kwargs=ingest_kwargs,
+                profile=args.profile
+            )
+        load_time = start_time
+    else:
+        doc_loaded = loader.load_dir(args.data_dir, workers=workers, skip_sources=skip_sources)
+        
+        load_time = time.time()
+        print(f"Loaded {len(doc_loaded)} document chunks in {load_time - start_time:.2f} seconds")
+        
+        # Separate documents by type
+        judgment_docs = [doc for doc in doc_loaded if doc.metadata.get("file_type") == "json"]
+        law_docs = [doc for doc in doc_loaded if doc.metadata.get("file_type") == "pdf"]
+        
+        print(f"Judgment documents: {len(judgment_docs)}")
+        print(f"Law documents: {len(law_docs)}")
+        
+        # Create separate collections
+        if judgment_docs:
+            print(f"Indexing {len(judgment_docs)} judgment documents into 'judgment_collection'...")
+            judgment_vector_db = VectorDB(
+                documents=judgment_docs,
+                collection_name="judgment_collection",
+                reset_collection=args.reset,
+                upsert=args.upsert,
+                ingest_kwargs=ingest_kwargs,
+                profile=args.profile
+            )
+            vector_dbs["judgment_collection"] = judgment_vector_db
+            
+        if law_docs:
+            print(f"Indexing {len(law_docs)} law documents into 'law_collection'...")
+            law_vector_db = VectorDB(
+                documents=law_docs,
+                collection_name="law_collection",
+                reset_collection=args.reset,
+                upsert=args.upsert,
+                ingest_kwargs=ingest_kwargs,
+                profile=args.profile
+            )
+            vector_dbs["law_collection"] = law_vector_db
+        
+        for doc in judgment_docs + law_docs:
+            recorder.add(doc)
     
-    # Separate documents by type
-    judgment_docs = [doc for doc in doc_loaded if doc.metadata.get("file_type") == "json"]
-    law_docs = [doc for doc in doc_loaded if doc.metadata.get("file_type") == "pdf"]
+    if manifest is not None:
+        stale_ids = manifest.update(sources, recorder.results(), splitter_config)
+        for collection_name, ids in stale_ids.items():
+            if collection_name not in vector_dbs:
+                vector_dbs[collection_name] = VectorDB(collection_name=collection_name, profile=args.profile)
+            vector_dbs[collection_name].delete_points(ids)
+        manifest.save()
     
-    print(f"Judgment documents: {len(judgment_docs)}")
-    print(f"Law documents: {len(law_docs)}")
+    if args.profile:
+        for collection_name in COLLECTION_BY_FILE_TYPE.values():
+            vector_db = vector_dbs.get(collection_name) or VectorDB(collection_name=collection_name, profile=args.profile)
+            if vector_db.client.collection_exists(collection_name):
+                vector_db.apply_profile()
     
-    # Create separate collections
-    if judgment_docs:
-        print(f"Indexing {len(judgment_docs)} judgment documents into 'judgment_collection'...")
-        judgment_vector_db = VectorDB(
-            documents=judgment_docs,
-            collection_name="judgment_collection",
-            reset_collection=args.reset,
-            upsert=args.upsert
-        )
-        
-    if law_docs:
-        print(f"Indexing {len(law_docs)} law documents into 'law_collection'...")
-        law_vector_db = VectorDB(
-            documents=law_docs,
-            collection_name="law_collection",
-            reset_collection=args.reset,
-            upsert=args.upsert
-        )
+    for collection_name, vector_db in vector_dbs.items():
+        if isinstance(vector_db.client, EmbeddedClient):
+            vector_db.client.optimize(collection_name)
+    
+    if not args.no_bm25:
+        for vector_db in vector_dbs.values():
+            build_bm25_index(vector_db)
     
     index_time = time.time()
     print(f"Successfully indexed documents in {index_time - load_time:.2f} seconds")
     print(f"Total processing time: {index_time - start_time:.2f} seconds")
+    print(f"Peak RSS: {peak_rss_mb():.1f} MB")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,99 @@
+import argparse
+import time
+from qdrant_client import models
+from src.rag.ids import chunk_id
+from src.rag.vectorstore import VectorDB
+from src.rag.bm25 import build_bm25_index
+from src.rag.manifest import IngestManifest
+
+def plan_migration(vector_db, batch_size):
+    """Map every point id that is not keyed by source, position and content yet to its new id"""
+    mapping = {}
+    total = 0
+    for point_id, page_content, metadata in vector_db.scroll_points(batch_size=batch_size):
+        total += 1
+        new_id = chunk_id(
+            page_content, metadata.get("source", ""), metadata.get("section", ""), metadata.get("chunk_index", "")
+        )
+        if str(point_id) != new_id:
+            mapping[str(point_id)] = new_id
+    return mapping, total
+
+def copy_points(vector_db, mapping, batch_size):
+    """Upsert stored vectors and payloads under their new ids"""
+    old_ids = list(mapping)
+    written = set()
+    for i in range(0, len(old_ids), batch_size):
+        points = vector_db.client.retrieve(
+            collection_name=vector_db.collection_name,
+            ids=old_ids[i:i+batch_size],
+            with_payload=True,
+            with_vectors=True
+        )
+        new_points = []
+        for point in points:
+            new_id = mapping[str(point.id)]
+            if new_id in written:
+                continue
+            written.add(new_id)
+            payload = dict(point.payload or {})
+            payload["metadata"] = {**(payload.get("metadata") or {}), "doc_id": new_id}
+            new_points.append(models.PointStruct(id=new_id, vector=point.vector, payload=payload))
+        if new_points:
+            vector_db.client.upsert(collection_name=vector_db.collection_name, points=new_points)
+    return len(written)
+
+def migrate_manifest(mapping_by_collection):
+    manifest = IngestManifest()
+    changed = 0
+    for entry in manifest.entries.values():
+        mapping = mapping_by_collection.get(entry["collection"], {})
+        new_ids = list(dict.fromkeys(mapping.get(old_id, old_id) for old_id in entry["chunk_ids"]))
+        if new_ids != entry["chunk_ids"]:
+            entry["chunk_ids"] = new_ids
+            changed += 1
+    manifest.save()
+    return changed
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-key existing collections to source/position/content chunk ids without re-embedding')
+    parser.add_argument('--collections', nargs='+', default=['judgment_collection', 'law_collection'], help='Collections to migrate')
+    parser.add_argument('--batch_size', type=int, default=256, help='Points per scroll/retrieve/upsert request')
+    parser.add_argument('--dry_run', action='store_true', help='Only report how many points would be re-keyed')
+    parser.add_argument('--no_bm25', action='store_true', help='Skip rebuilding the local BM25 index')
+    args = parser.parse_args()
+
+    mapping_by_collection = {}
+    for collection_name in args.collections:
+        start_time = time.time()
+        try:
+            vector_db = VectorDB(collection_name=collection_name)
+        except Exception as e:
+            print(f"Skipping '{collection_name}': {e}")
+            continue
+
+        mapping, total = plan_migration(vector_db, args.batch_size)
+        unique_targets = len(set(mapping.values()))
+        print(f"'{collection_name}': {len(mapping)} of {total} points need new ids "
+              f"({unique_targets} distinct targets)")
+        if args.dry_run or not mapping:
+            continue
+
+        written = copy_points(vector_db, mapping, args.batch_size)
+        # Old ids are deleted only after every vector has been copied, so an interrupted run can simply be repeated
+        new_ids = set(mapping.values())
+        stale_ids = [old_id for old_id in mapping if old_id not in new_ids]
+        vector_db.delete_points(stale_ids, batch_size=args.batch_size)
+        mapping_by_collection[collection_name] = mapping
+
+        count = vector_db.client.count(collection_name=collection_name).count
+        print(f"Migrated '{collection_name}' in {time.time() - start_time:.2f} seconds: "
+              f"{written} points written, {len(stale_ids)} old points deleted, {count} points now (was {total})")
+        if not args.no_bm25:
+            build_bm25_index(vector_db)
+
+    if mapping_by_collection:
+        print(f"Updated chunk ids of {migrate_manifest(mapping_by_collection)} manifest sources")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+from typing import List
+
+import numpy as np
+
+from src.rag import answer_cache, index_state
+from src.rag.answer_cache import SemanticAnswerCache
+from src.rag.index_state import bump_index_version
+
+VECTORS = {
+    "Thủ tục ly hôn đơn phương?": [1.0, 0.0, 0.0],
+    "Thủ tục ly hôn đơn phương như thế nào?": [0.99, 0.1, 0.0],
+    "Mức phạt vượt đèn đỏ?": [0.0, 1.0, 0.0],
+}
+
+class FixedEmbeddings:
+    def embed_query(self, text: str) -> List[float]:
+        return VECTORS[text]
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+def _cache(tmp_path, monkeypatch, **kwargs):
+    monkeypatch.setattr(index_state, "DATA_DIR", str(tmp_path))
+    kwargs.setdefault("version_check_interval", 0)
+    return SemanticAnswerCache(FixedEmbeddings(), threshold=0.95,
+                               collections={"judgment": "judgments", "law": "laws"}, **kwargs)
+
+def _store(cache, question, source_type="judgment", answer=None):
+    cache.store(cache.embed(question), source_type, question, answer or f"answer: {question}")
+
+def test_paraphrase_hits_and_unrelated_question_misses(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, monkeypatch)
+    _store(cache, "Thủ tục ly hôn đơn phương?")
+    assert cache.lookup(cache.embed("Thủ tục ly hôn đơn phương như thế nào?"), "judgment") == "answer: Thủ tục ly hôn đơn phương?"
+    assert cache.lookup(cache.embed("Mức phạt vượt đèn đỏ?"), "judgment") is None
+    assert cache.lookup(cache.embed("Thủ tục ly hôn đơn phương?"), "law") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_reindex_drops_only_that_source_type(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, monkeypatch)
+    _store(cache, "Thủ tục ly hôn đơn phương?", "judgment")
+    _store(cache, "Mức phạt vượt đèn đỏ?", "law")
+
+    bump_index_version("judgments")
+    assert cache.lookup(cache.embed("Thủ tục ly hôn đơn phương?"), "judgment") is None
+    assert cache.lookup(cache.embed("Mức phạt vượt đèn đỏ?"), "law") == "answer: Mức phạt vượt đèn đỏ?"
+    assert cache.invalidations == 1
+
+def test_version_is_rechecked_only_after_interval(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(answer_cache, "time", clock)
+    cache = _cache(tmp_path, monkeypatch, ttl=None, version_check_interval=5)
+    _store(cache, "Thủ tục ly hôn đơn phương?")
+    vector = cache.embed("Thủ tục ly hôn đơn phương?")
+
+    bump_index_version("judgments")
+    assert cache.lookup(vector, "judgment") is not None
+    clock.now += 6
+    assert cache.lookup(vector, "judgment") is None
+
+def test_ttl_and_size_evictions(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(answer_cache, "time", clock)
+    cache = _cache(tmp_path, monkeypatch, ttl=60, max_entries=1)
+    _store(cache, "Thủ tục ly hôn đơn phương?")
+    clock.now += 1
+    _store(cache, "Mức phạt vượt đèn đỏ?")
+    assert cache.stats()["size"] == {"judgment": 1}
+    assert cache.lookup(cache.embed("Mức phạt vượt đèn đỏ?"), "judgment") is not None
+
+    clock.now += 61
+    assert cache.lookup(cache.embed("Mức phạt vượt đèn đỏ?"), "judgment") is None
+    assert cache.evictions == 2
+
+def test_embed_returns_unit_vectors(tmp_path, monkeypatch):
+    cache = _cache(tmp_path, monkeypatch)
+    assert np.isclose(np.linalg.norm(cache.embed("Thủ tục ly hôn đơn phương như thế nào?")), 1.0)
@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from src.rag.offline_rag import Str_OutputParser, StreamingAnswerExtractor
+
+RESPONSES = [
+    "Trả lời trực tiếp: Bị cáo bị phạt 3 năm tù.",
+    "  Trả lời: Theo Điều 51 Bộ luật Hình sự...\n",
+    "Bị cáo bị phạt 3 năm tù. Trả lời: câu này nằm giữa câu trả lời.",
+    "Trả",
+    "Trả lời",
+    "",
+    "Theo bản án 12/2024/HS-ST, tòa tuyên " * 20
+]
+
+def _stream(text, sizes):
+    extractor = StreamingAnswerExtractor()
+    parts, position = [], 0
+    for size in sizes:
+        parts.append(extractor.feed(text[position:position + size]))
+        position += size
+    parts.append(extractor.feed(text[position:]))
+    parts.append(extractor.finish())
+    return parts
+
+@pytest.mark.parametrize("text", RESPONSES)
+def test_stream_matches_non_streaming_parse(text):
+    expected = Str_OutputParser().parse(text)
+    rng = random.Random(len(text))
+    for _ in range(20):
+        sizes = [rng.randint(1, 7) for _ in range(len(text) // 3 + 1)]
+        assert "".join(_stream(text, sizes)) == expected
+
+def test_strips_leading_marker_only():
+    parser = Str_OutputParser()
+    assert parser.parse("Trả lời trực tiếp: Có.") == "Có."
+    assert parser.parse("trả lời:  Không. ") == "Không."
+    assert parser.parse("Phân tích. Trả lời: Có.") == "Phân tích. Trả lời: Có."
+
+def test_forwards_text_without_marker_immediately():
+    extractor = StreamingAnswerExtractor()
+    assert extractor.feed("Theo") == "Theo"
+    assert extractor.feed(" Điều 51") == " Điều 51"
+
+def test_holds_back_only_a_possible_marker():
+    extractor = StreamingAnswerExtractor()
+    assert extractor.feed("Trả l") == ""
+    assert extractor.feed("ời: Có") == "Có"
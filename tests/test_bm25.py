@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from langchain_core.documents import Document
+
+from src.rag.bm25 import BM25Index, HybridRetriever, reciprocal_rank_fusion
+
+CHUNKS = [
+    ("a", "bị cáo phạm tội trộm cắp tài sản theo Điều 173", {"source": "j1", "section": "QUYẾT ĐỊNH"}),
+    ("b", "tòa án xét xử vụ án dân sự về tranh chấp đất đai", {"source": "j2", "section": "NỘI DUNG VỤ ÁN"}),
+    ("c", "trộm cắp tài sản có giá trị lớn, áp dụng Điều 51", {"source": "j3", "section": "QUYẾT ĐỊNH"}),
+    ("d", "hợp đồng mua bán nhà ở", {"source": "j4", "section": "NỘI DUNG VỤ ÁN"})
+]
+
+def _doc(point_id):
+    return Document(page_content=point_id, metadata={"_id": point_id})
+
+def test_bm25_ranks_matching_chunks():
+    index = BM25Index.build(CHUNKS)
+    results = index.search("trộm cắp tài sản", k=5)
+    assert {index.ids[doc_idx] for doc_idx, _ in results} == {"a", "c"}
+    assert all(score > 0 for _, score in results)
+    assert index.search("điều 51", k=1)[0][0] == 2
+
+def test_bm25_filters_and_k():
+    index = BM25Index.build(CHUNKS)
+    assert [index.ids[doc_idx] for doc_idx, _ in index.search("tài sản", 5, {"source": "j3"})] == ["c"]
+    assert len(index.search("trộm cắp tài sản", k=1)) == 1
+    assert index.search("xyzzy", k=5) == []
+
+def test_bm25_save_load_round_trip(tmp_path):
+    index = BM25Index.build(CHUNKS)
+    path = str(tmp_path / "bm25.json.gz")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert loaded.search("trộm cắp", 5) == index.search("trộm cắp", 5)
+
+def test_rrf_rewards_agreement():
+    dense = [_doc("x"), _doc("y")]
+    lexical = [_doc("w"), _doc("y")]
+    fused = reciprocal_rank_fusion([dense, lexical], k=3, rrf_k=60)
+    assert [doc.metadata["_id"] for doc in fused] == ["y", "x", "w"]
+    assert fused[0].metadata["rrf_score"] == 2 / 62
+
+def test_rrf_truncates_to_k():
+    fused = reciprocal_rank_fusion([[_doc(str(i)) for i in range(10)]], k=4)
+    assert [doc.metadata["_id"] for doc in fused] == ["0", "1", "2", "3"]
+
+class _VectorDB:
+    async def asearch(self, query, k=5, filters=None):
+        return [_doc("a")]
+
+class _Store:
+    def __init__(self):
+        self.index = BM25Index.build(CHUNKS)
+        self.thread = None
+
+    def get(self):
+        self.thread = threading.current_thread()
+        return self.index
+
+def test_hybrid_async_runs_bm25_off_the_event_loop():
+    store = _Store()
+    retriever = HybridRetriever(vector_db=_VectorDB(), bm25_store=store, k=2, fetch_k=5)
+    docs = asyncio.run(retriever.ainvoke("trộm cắp tài sản"))
+    assert store.thread is not threading.main_thread()
+    assert docs[0].metadata["_id"] == "a"
@@ -0,0 +1,92 @@
+from langchain_core.documents import Document
+
+from src.base.tokens import estimate_tokens
+from src.rag.context import ContextPacker, find_overlap, parse_chunk_index
+
+TEXT = " ".join(f"Điều {i} quy định về quyền và nghĩa vụ của các bên." for i in range(40))
+
+def _chunks(source="a.pdf", size=400, overlap=100, group="J.2"):
+    docs = []
+    for position, start in enumerate(range(0, len(TEXT) - overlap, size - overlap)):
+        docs.append(Document(page_content=TEXT[start:start + size],
+                             metadata={"source": source, "chunk_index": f"{group}.{position}"}))
+    return docs
+
+def test_parse_chunk_index():
+    assert parse_chunk_index("J.2.5") == (("J", "2"), 5)
+    assert parse_chunk_index("3.7") == ("3", 7)
+    assert parse_chunk_index("J.2.x") is None
+    assert parse_chunk_index("") is None
+
+def test_find_overlap():
+    assert find_overlap("x" * 10 + "shared tail text here", "shared tail text here and more", 50) == 21
+    assert find_overlap("abc", "def", 50) == 0
+    assert find_overlap("ab", "ab", 50, min_overlap=20) == 0
+
+def test_adjacent_chunks_merge_without_repeating_the_overlap():
+    chunks = _chunks()
+    packer = ContextPacker(chunk_overlap=100)
+    blocks = packer.merge([chunks[2], chunks[0], chunks[1]])
+    assert len(blocks) == 1
+    assert blocks[0].text == TEXT[:1000]
+    assert blocks[0].chunk_index == "J.2.0-J.2.2"
+    assert [doc.metadata["chunk_index"] for doc in blocks[0].docs] == ["J.2.0", "J.2.1", "J.2.2"]
+
+def test_gaps_other_sources_and_sections_stay_separate():
+    chunks = _chunks()
+    other = _chunks(source="b.pdf")
+    section = _chunks(group="J.3")
+    loose = Document(page_content="không có chỉ mục", metadata={"source": "web"})
+    blocks = ContextPacker(chunk_overlap=100).merge([chunks[0], chunks[2], other[1], section[1], loose])
+    assert [block.text for block in blocks] == [
+        loose.page_content, chunks[0].page_content, chunks[2].page_content,
+        section[1].page_content, other[1].page_content,
+    ]
+
+def test_select_counts_overlap_saving_against_the_budget():
+    chunks = _chunks()
+    packer = ContextPacker(chunk_overlap=100)
+    full = sum(estimate_tokens(doc.page_content) for doc in chunks[:3])
+    merged = estimate_tokens(TEXT[:1000])
+    assert merged < full
+
+    selected = packer.select(chunks[:3], max_tokens=merged)
+    assert selected == chunks[:3]
+    assert packer.pack(chunks[:3], max_tokens=merged)[0].text == TEXT[:1000]
+
+def test_select_skips_what_does_not_fit_and_duplicates():
+    chunks = _chunks()
+    big = Document(page_content=TEXT, metadata={"source": "c.pdf", "chunk_index": "J.1.0"})
+    budget = estimate_tokens(chunks[0].page_content) + estimate_tokens(chunks[5].page_content)
+    selected = ContextPacker(chunk_overlap=100).select([chunks[0], big, chunks[0], chunks[5]], max_tokens=budget)
+    assert selected == [chunks[0], chunks[5]]
+
+def _law(text, chunk_index, doc_id, parent_id=None):
+    metadata = {"source": "law.pdf", "chunk_index": chunk_index, "doc_id": doc_id}
+    if parent_id is not None:
+        metadata["parent_id"] = parent_id
+    return Document(page_content=text, metadata=metadata)
+
+def test_law_chunks_sharing_a_chunk_index_are_distinct():
+    # Pages are split separately and "Điều 8" cross-references start articles, so L.8.0 repeats
+    first = _law("Điều 8. Quyền của người lao động được quy định như sau.", "L.8.0", "a", "page-1")
+    second = _law("Theo quy định tại Điều 8 thì người sử dụng lao động phải bảo đảm.", "L.8.0", "b", "page-7")
+    packer = ContextPacker(chunk_overlap=100)
+    assert packer.select([first, second, first]) == [first, second]
+    assert [block.text for block in packer.pack([first, second])] == [first.page_content, second.page_content]
+
+def test_adjacent_indexes_from_unrelated_pages_are_not_stitched():
+    head = _law("Điều 8. Quyền của người lao động được quy định như sau.", "L.8.0", "a", "page-1")
+    stranger = _law("Khoản 2 của một điều khác trên trang sau, không liên quan.", "L.8.1", "b", "page-7")
+    sibling = _law("Người lao động có quyền làm việc và tự do lựa chọn việc làm.", "L.8.1", "c", "page-1")
+    blocks = ContextPacker(chunk_overlap=100).merge([head, stranger, sibling])
+    assert sorted(block.text for block in blocks) == sorted([
+        f"{head.page_content}\n{sibling.page_content}", stranger.page_content,
+    ])
+
+def test_chunks_without_parent_are_stitched_only_when_they_overlap():
+    chunks = _chunks(source="law.pdf", group="L.8")
+    unrelated = _law("Một đoạn hoàn toàn khác không trùng phần nào với đoạn trước.", "L.8.1", "x")
+    blocks = ContextPacker(chunk_overlap=100).merge([chunks[0], unrelated])
+    assert [block.text for block in blocks] == [chunks[0].page_content, unrelated.page_content]
+    assert ContextPacker(chunk_overlap=100).merge(chunks[:2])[0].text == TEXT[:700]
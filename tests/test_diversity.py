@@ -0,0 +1,67 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from src.rag.diversity import cap_per_source, mmr_select, source_key
+
+def naive_mmr(query, vectors, k, lambda_mult):
+    def cosine(a, b):
+        return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+    selected = []
+    while len(selected) < min(k, len(vectors)):
+        scores = {}
+        for i, vector in enumerate(vectors):
+            if i in selected:
+                continue
+            if not selected:
+                scores[i] = cosine(query, vector)
+            else:
+                redundancy = max(cosine(vector, vectors[j]) for j in selected)
+                scores[i] = lambda_mult * cosine(query, vector) - (1 - lambda_mult) * redundancy
+        selected.append(max(scores, key=scores.get))
+    return selected
+
+def test_matches_naive_mmr():
+    rng = np.random.default_rng(0)
+    for lambda_mult in (0.0, 0.3, 0.5, 1.0):
+        query = rng.normal(size=16)
+        vectors = rng.normal(size=(40, 16))
+        selected = mmr_select(query, vectors, 10, lambda_mult)
+        assert [idx for idx, _ in selected] == naive_mmr(query, vectors, 10, lambda_mult)
+
+def test_prefers_diverse_candidates():
+    query = [1.0, 0.0]
+    vectors = [[1.0, 0.0], [0.99, 0.01], [0.7, 0.7]]
+    assert [idx for idx, _ in mmr_select(query, vectors, 2, lambda_mult=1.0)] == [0, 1]
+    assert [idx for idx, _ in mmr_select(query, vectors, 2, lambda_mult=0.3)] == [0, 2]
+
+def test_source_cap_is_respected():
+    rng = np.random.default_rng(1)
+    query = rng.normal(size=8)
+    vectors = rng.normal(size=(30, 8))
+    sources = [i % 3 for i in range(30)]
+    selected = mmr_select(query, vectors, 7, 0.5, sources, max_per_source=2)
+    counts = np.bincount([sources[idx] for idx, _ in selected], minlength=3)
+    assert len(selected) == 6 and counts.max() == 2
+
+def test_empty_and_short_inputs():
+    assert mmr_select([1.0], [], 3) == []
+    assert mmr_select([1.0, 0.0], [[1.0, 0.0]], 0) == []
+    assert len(mmr_select([1.0, 0.0], [[1.0, 0.0], [0.0, 1.0]], 5)) == 2
+
+def _doc(source, article=None):
+    metadata = {"source": source}
+    if article is not None:
+        metadata["article"] = article
+    return Document(page_content=f"{source} {article}", metadata=metadata)
+
+def test_cap_per_source_keeps_ranking_order():
+    docs = [_doc("a"), _doc("a"), _doc("b"), _doc("a"), _doc("c"), _doc("b")]
+    assert cap_per_source(docs, 4, max_per_source=1) == [docs[0], docs[2], docs[4]]
+    assert cap_per_source(docs, 4, max_per_source=2) == [docs[0], docs[1], docs[2], docs[4]]
+    assert cap_per_source(docs, 3) == docs[:3]
+
+def test_law_articles_are_capped_separately():
+    docs = [_doc("law.pdf", "1"), _doc("law.pdf", "1"), _doc("law.pdf", "2")]
+    assert source_key(docs[0]) == ("law.pdf", "1")
+    assert cap_per_source(docs, 3, max_per_source=1) == [docs[0], docs[2]]
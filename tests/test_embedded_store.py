@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from qdrant_client import models
+
+from src.rag.embedded_store import EmbeddedClient, _filter_sql
+from src.rag.filters import PAYLOAD_INDEXES, build_filter
+
+def _seed(path, num_points=10):
+    client = EmbeddedClient(str(path))
+    client.create_collection("c", vectors_config=models.VectorParams(size=4, distance=models.Distance.COSINE))
+    for field_name, field_schema in PAYLOAD_INDEXES.items():
+        client.create_payload_index("c", field_name, field_schema)
+    client.upsert("c", models.Batch(
+        ids=list(range(num_points)),
+        vectors=np.random.default_rng(0).random((num_points, 4)).tolist(),
+        payloads=[{"metadata": {"source": f"s{i % 3}", "article": i}} for i in range(num_points)]
+    ))
+    return client
+
+@pytest.mark.parametrize("filters", [
+    {"source": "s1"},
+    {"source": ["s1", "s2"]},
+    {"article": 3},
+    {"date_from": "2024-01-01", "date_to": "2024-12-31"}
+])
+def test_filters_use_payload_indexes(tmp_path, filters):
+    client = _seed(tmp_path)
+    collection = client._get("c")
+    params = []
+    where = _filter_sql(build_filter(filters), params)
+    plan = collection._conn.execute(f"EXPLAIN QUERY PLAN SELECT idx FROM points WHERE {where}", params).fetchall()
+    assert any("USING INDEX payload_metadata_" in row[-1] for row in plan), plan
+
+def test_filtered_search_matches_payloads(tmp_path):
+    client = _seed(tmp_path)
+    points = client.query_points("c", query=[1, 1, 1, 1], query_filter=build_filter({"source": "s1"}), limit=10).points
+    assert sorted(point.id for point in points) == [1, 4, 7]
+
+def test_rejects_unsafe_payload_keys(tmp_path):
+    client = _seed(tmp_path)
+    with pytest.raises(ValueError):
+        client.count("c", count_filter=models.Filter(must=[
+            models.FieldCondition(key="metadata.source') OR 1 --", match=models.MatchValue(value="x"))
+        ]))
+
+def test_sees_points_written_by_another_client(tmp_path):
+    reader = _seed(tmp_path)
+    writer = EmbeddedClient(str(tmp_path))
+    writer.upsert("c", models.Batch(ids=[100], vectors=[[1, 0, 0, 0]], payloads=[{"metadata": {"source": "new"}}]))
+    assert reader.count("c").count == 11
+    point = reader.query_points("c", query=[1, 0, 0, 0], limit=1).points[0]
+    assert point.id == 100 and point.payload["metadata"]["source"] == "new"
+
+def test_no_compaction_or_deletion_while_open_elsewhere(tmp_path):
+    reader = _seed(tmp_path)
+    writer = EmbeddedClient(str(tmp_path))
+    writer.delete("c", models.PointIdsList(points=list(range(8))))
+    assert writer._get("c").num_rows == 10
+    with pytest.raises(RuntimeError):
+        writer.delete_collection("c")
+
+    remaining = reader.query_points("c", query=[1, 1, 1, 1], limit=10).points
+    assert sorted(point.id for point in remaining) == [8, 9]
+    assert all(point.payload["metadata"]["article"] == point.id for point in remaining)
+
+    reader.close()
+    writer.delete("c", models.PointIdsList(points=[8]))
+    assert writer._get("c").num_rows == 1
+
+def test_repeated_id_in_one_batch_keeps_the_last_copy(tmp_path):
+    client = EmbeddedClient(str(tmp_path))
+    client.create_collection("c", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE))
+    client.upsert("c", models.Batch(
+        ids=[1, 1, 2], vectors=[[1, 0], [0, 1], [1, 1]],
+        payloads=[{"n": "first"}, {"n": "last"}, {"n": "other"}]
+    ))
+    assert client.count("c").count == 2
+    points = client.query_points("c", query=[1, 0], limit=2).points
+    assert [(point.id, point.payload["n"]) for point in points] == [(2, "other"), (1, "last")]
+    assert client._get("c").num_rows == 2
+
+@pytest.mark.parametrize("num_points", [0, 3, 300])
+def test_ivf_handles_collections_of_any_size(tmp_path, num_points):
+    client = _seed(tmp_path, num_points) if num_points else EmbeddedClient(str(tmp_path))
+    if not num_points:
+        client.create_collection("c", vectors_config=models.VectorParams(size=4, distance=models.Distance.COSINE))
+    client.close()
+    client = EmbeddedClient(str(tmp_path), index="ivf")
+    client.optimize("c")
+    points = client.query_points("c", query=[1, 1, 1, 1], limit=5).points
+    assert len(points) == min(num_points, 5)
+    collection = client._get("c")
+    assert (collection.ivf is not None) == (num_points >= 256)
+
+def test_build_ivf_clamps_lists_to_rows(tmp_path):
+    collection = _seed(tmp_path, 3)._get("c")
+    collection.build_ivf(nlist=16)
+    assert len(collection.ivf["centroids"]) == 3
+    assert collection.ivf["offsets"][-1] == 3
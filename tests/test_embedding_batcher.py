@@ -0,0 +1,62 @@
+import asyncio
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from src.rag.embedding_batcher import BatchingEmbeddings
+from src.rag.embedding_cache import QUERY_TASK_TYPE, CachedEmbeddings
+
+class TaskTypeEmbeddings(Embeddings):
+    """Vector depends on the task type, like Gemini's, and every call is recorded"""
+
+    def __init__(self):
+        self.calls = []
+
+    def _vector(self, text, task_type):
+        return [float(len(text)), 1.0 if task_type == QUERY_TASK_TYPE else 0.0]
+
+    def embed_query(self, text: str, *, task_type: Optional[str] = None) -> List[float]:
+        self.calls.append(("embed_query", task_type))
+        return self._vector(text, task_type)
+
+    async def aembed_query(self, text: str, *, task_type: Optional[str] = None) -> List[float]:
+        self.calls.append(("aembed_query", task_type))
+        return self._vector(text, task_type)
+
+    def embed_documents(self, texts, *, task_type: Optional[str] = None):
+        self.calls.append(("embed_documents", task_type))
+        return [self._vector(text, task_type) for text in texts]
+
+    async def aembed_documents(self, texts, *, task_type: Optional[str] = None):
+        self.calls.append(("aembed_documents", task_type))
+        return [self._vector(text, task_type) for text in texts]
+
+def test_sync_async_and_batched_queries_agree():
+    model = TaskTypeEmbeddings()
+    batcher = BatchingEmbeddings(model, max_batch_size=4, max_wait_ms=1)
+    sync_vector = CachedEmbeddings(batcher, ttl=None).embed_query("tội trộm cắp")
+
+    async def concurrent():
+        return await asyncio.gather(*(batcher.aembed_query(text) for text in ("tội trộm cắp", "ly hôn")))
+
+    batched = asyncio.run(concurrent())
+    assert batched[0] == sync_vector
+    assert {task_type for _, task_type in model.calls} == {QUERY_TASK_TYPE}
+    assert ("aembed_documents", QUERY_TASK_TYPE) in model.calls
+
+def test_cache_without_batcher_requests_query_task_type():
+    model = TaskTypeEmbeddings()
+    cache = CachedEmbeddings(model, ttl=None)
+    cache.embed_query("câu hỏi")
+    asyncio.run(cache.aembed_query("câu hỏi khác"))
+    assert model.calls == [("embed_query", QUERY_TASK_TYPE), ("aembed_query", QUERY_TASK_TYPE)]
+
+def test_batcher_returns_each_caller_its_vector():
+    model = TaskTypeEmbeddings()
+    batcher = BatchingEmbeddings(model, max_batch_size=8, max_wait_ms=1)
+
+    async def run():
+        return await asyncio.gather(*(batcher.aembed_query("x" * n) for n in range(1, 6)))
+
+    assert [vector[0] for vector in asyncio.run(run())] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert batcher.stats()["batches"] == 1
@@ -0,0 +1,86 @@
+import unicodedata
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from src.rag import embedding_cache
+from src.rag.embedding_cache import CachedEmbeddings, normalize_query
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.queries = []
+
+    def embed_query(self, text: str) -> List[float]:
+        self.queries.append(text)
+        return [float(len(text)), 1.0]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+def test_normalize_query_folds_unicode_form_and_whitespace():
+    nfd = unicodedata.normalize("NFD", "Tội  trộm\tcắp tài sản ")
+    assert normalize_query(nfd) == "Tội trộm cắp tài sản"
+    assert normalize_query(nfd) == unicodedata.normalize("NFC", "Tội trộm cắp tài sản")
+
+def test_equivalent_queries_share_one_entry():
+    model = CountingEmbeddings()
+    cache = CachedEmbeddings(model, ttl=None)
+    first = cache.embed_query("ly hôn đơn phương")
+    second = cache.embed_query(unicodedata.normalize("NFD", "  ly hôn   đơn phương\n"))
+    assert first == second
+    assert model.queries == ["ly hôn đơn phương"]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(embedding_cache, "time", clock)
+    model = CountingEmbeddings()
+    cache = CachedEmbeddings(model, ttl=60)
+    cache.embed_query("thừa kế")
+    clock.now += 59
+    cache.embed_query("thừa kế")
+    assert len(model.queries) == 1
+    clock.now += 2
+    cache.embed_query("thừa kế")
+    assert len(model.queries) == 2
+
+def test_lru_bound_evicts_least_recently_used():
+    model = CountingEmbeddings()
+    cache = CachedEmbeddings(model, max_size=2, ttl=None)
+    cache.embed_query("a")
+    cache.embed_query("b")
+    cache.embed_query("a")
+    cache.embed_query("c")
+    assert cache.stats()["size"] == 2
+    cache.embed_query("a")
+    cache.embed_query("b")
+    assert model.queries == ["a", "b", "c", "b"]
+
+def test_persisted_entries_reload_and_clear_invalidates(tmp_path):
+    path = str(tmp_path / "queries.sqlite3")
+    model = CountingEmbeddings()
+    CachedEmbeddings(model, ttl=None, persist_path=path).embed_query("hợp đồng")
+
+    reloaded = CachedEmbeddings(model, ttl=None, persist_path=path)
+    assert reloaded.embed_query("hợp đồng") == [8.0, 1.0]
+    assert len(model.queries) == 1
+
+    reloaded.clear()
+    assert CachedEmbeddings(model, ttl=None, persist_path=path).stats()["size"] == 0
+    reloaded.embed_query("hợp đồng")
+    assert len(model.queries) == 2
+
+def test_expired_persisted_entries_are_dropped_on_open(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(embedding_cache, "time", clock)
+    path = str(tmp_path / "queries.sqlite3")
+    CachedEmbeddings(CountingEmbeddings(), ttl=60, persist_path=path).embed_query("án phí")
+    clock.now += 61
+    assert CachedEmbeddings(CountingEmbeddings(), ttl=60, persist_path=path).stats()["size"] == 0
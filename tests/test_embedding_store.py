@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+
+from src.rag.embedding_store import EmbeddingStore
+
+def _vectors(n, start=0):
+    return [[float(start + i), 1.0, -1.0] for i in range(n)]
+
+def test_round_trip_across_reopen(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "m")
+    store.put_many(["a", "b", "a"], _vectors(3))
+    store.put_many(["c"], _vectors(1, start=10))
+    assert len(store) == 3
+
+    reopened = EmbeddingStore(str(tmp_path), "m")
+    assert reopened.get_many(["a", "b", "c", "d"]) == [_vectors(1)[0], _vectors(2)[1], _vectors(1, start=10)[0], None]
+    assert EmbeddingStore(str(tmp_path), "other").get_many(["a"]) == [None]
+
+def test_interrupted_append_is_truncated_on_open(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "m")
+    store.put_many(["a", "b"], _vectors(2))
+    # A crash between writing the rows and committing their offsets leaves a torn tail
+    with open(store.matrix_path, "ab") as f:
+        f.write(np.ones(5, dtype=np.float32).tobytes())
+
+    reopened = EmbeddingStore(str(tmp_path), "m")
+    assert os.path.getsize(reopened.matrix_path) == 2 * 3 * 4
+    reopened.put_many(["c"], _vectors(1, start=7))
+    assert reopened.get_many(["a", "b", "c"]) == _vectors(2) + _vectors(1, start=7)
+
+def test_stale_tail_does_not_shift_new_rows(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "m")
+    store.put_many(["a"], _vectors(1))
+    with open(store.matrix_path, "ab") as f:
+        f.write(np.ones(3, dtype=np.float32).tobytes())
+    store.put_many(["b"], _vectors(1, start=4))
+    assert store.get_many(["a", "b"]) == _vectors(1) + _vectors(1, start=4)
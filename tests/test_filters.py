@@ -0,0 +1,68 @@
+import pytest
+from qdrant_client import QdrantClient, models
+
+from src.rag.embedded_store import EmbeddedClient
+from src.rag.filters import PAYLOAD_INDEXES, build_filter, matches, published_date_from_filename
+
+CHUNKS = {
+    1: {"source": "a.json", "section": "NỘI DUNG VỤ ÁN", "file_type": "json", "published_date": "2024-02-01"},
+    2: {"source": "b.json", "section": "QUYẾT ĐỊNH", "file_type": "json", "published_date": "2024-03-31"},
+    3: {"source": "c.json", "section": "QUYẾT ĐỊNH", "file_type": "json", "published_date": "2024-04-01"},
+    4: {"source": "d.json", "section": "QUYẾT ĐỊNH", "file_type": "json"},
+    5: {"source": "law.pdf", "section": "Điều 8", "file_type": "pdf", "article": 8},
+    6: {"source": "law.pdf", "section": "Điều 12", "file_type": "pdf", "article": 12},
+}
+
+CASES = [
+    ({"source": "a.json"}, {1}),
+    ({"source": ["a.json", "c.json", "missing.json"]}, {1, 3}),
+    ({"section": ["QUYẾT ĐỊNH"], "file_type": "json"}, {2, 3, 4}),
+    ({"article": 8}, {5}),
+    ({"article": [8, 12]}, {5, 6}),
+    ({"file_type": "pdf", "article": [12]}, {6}),
+    ({"date_from": "2024-02-01", "date_to": "2024-03-31"}, {1, 2}),
+    ({"date_from": "2024-03-31"}, {2, 3}),
+    ({"date_to": "2024-03-31"}, {1, 2}),
+    ({"date_from": "2024-04-01", "date_to": "2024-04-01"}, {3}),
+    ({"section": "QUYẾT ĐỊNH", "date_from": "2020-01-01"}, {2, 3}),
+    ({}, set(CHUNKS)),
+]
+
+def _points():
+    return [models.PointStruct(id=point_id, vector=[1.0, float(point_id)], payload={"metadata": metadata})
+            for point_id, metadata in CHUNKS.items()]
+
+@pytest.fixture(scope="module")
+def qdrant():
+    client = QdrantClient(":memory:")
+    client.create_collection("c", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE))
+    client.upsert("c", _points())
+    return client
+
+@pytest.fixture
+def embedded(tmp_path):
+    client = EmbeddedClient(str(tmp_path))
+    client.create_collection("c", vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE))
+    for field_name, field_schema in PAYLOAD_INDEXES.items():
+        client.create_payload_index("c", field_name, field_schema)
+    client.upsert("c", _points())
+    return client
+
+def _ids(client, filters):
+    points, _ = client.scroll("c", scroll_filter=build_filter(filters), limit=100)
+    return {point.id for point in points}
+
+@pytest.mark.parametrize("filters, expected", CASES)
+def test_qdrant_embedded_and_bm25_filters_agree(qdrant, embedded, filters, expected):
+    assert {point_id for point_id, metadata in CHUNKS.items() if matches(metadata, filters)} == expected
+    assert _ids(qdrant, filters) == expected
+    assert _ids(embedded, filters) == expected
+
+def test_empty_filters_build_nothing():
+    assert build_filter(None) is None
+    assert build_filter({"source": None}) is None
+
+def test_published_date_from_filename():
+    assert published_date_from_filename("data/01-02-2024_29-02-2024.json") == "2024-02-01"
+    assert published_date_from_filename("data/judgments.json") is None
+    assert published_date_from_filename("31-02-2024_01-03-2024.json") is None
@@ -0,0 +1,24 @@
+from langchain_core.documents import Document
+
+from src.rag.ids import chunk_id, document_chunk_id
+from src.rag.utils import LegalDocumentSplitter
+
+def test_chunk_id_is_stable_and_normalized():
+    assert chunk_id("Điều 51  bộ luật", "u1", "QUYẾT ĐỊNH", "J.1.0") == chunk_id("Điều 51 bộ luật", "u1", "QUYẾT ĐỊNH", "J.1.0")
+
+def test_chunk_id_keeps_identical_text_from_different_places_apart():
+    text = "Tòa án nhân dân tuyên xử như sau"
+    ids = {
+        chunk_id(text, "u1", "QUYẾT ĐỊNH", "J.1.0"),
+        chunk_id(text, "u2", "QUYẾT ĐỊNH", "J.1.0"),
+        chunk_id(text, "u1", "NỘI DUNG VỤ ÁN", "J.1.0"),
+        chunk_id(text, "u1", "QUYẾT ĐỊNH", "J.1.1")
+    }
+    assert len(ids) == 4
+
+def test_splitter_ids_match_document_chunk_id():
+    body = "NỘI DUNG VỤ ÁN\n" + "Nguyên đơn yêu cầu chia tài sản chung của vợ chồng. " * 10
+    docs = [Document(page_content=body, metadata={"source": url}) for url in ("u1", "u2")]
+    chunks = LegalDocumentSplitter()(docs)
+    assert len({chunk.metadata["doc_id"] for chunk in chunks}) == len(chunks)
+    assert all(chunk.metadata["doc_id"] == document_chunk_id(chunk) for chunk in chunks)
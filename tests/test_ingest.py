@@ -0,0 +1,42 @@
+from langchain_core.documents import Document
+from qdrant_client import models
+
+from src.rag.embedded_store import EmbeddedClient
+from src.rag.embedding_store import EmbeddingStore
+from src.rag.ids import document_chunk_id
+from src.rag.ingest import IngestionEngine
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.texts = 0
+
+    def embed_documents(self, texts):
+        self.texts += len(texts)
+        return [[float(len(text)), 1.0, 0.0] for text in texts]
+
+def _docs(texts):
+    docs = [Document(page_content=text, metadata={"source": f"s{i}", "chunk_index": str(i)}) for i, text in enumerate(texts)]
+    for doc in docs:
+        doc.metadata["doc_id"] = document_chunk_id(doc)
+    return docs
+
+def _engine(tmp_path, embedding):
+    client = EmbeddedClient(str(tmp_path / "vectors"))
+    if not client.collection_exists("c"):
+        client.create_collection("c", vectors_config=models.VectorParams(size=3, distance=models.Distance.COSINE))
+    store = EmbeddingStore(str(tmp_path / "embeddings"), "fake")
+    return IngestionEngine(embedding, client, "c", batch_size=4, embedding_store=store)
+
+def test_counts_api_embeddings_and_reused_vectors_separately(tmp_path):
+    embedding = CountingEmbeddings()
+    first = _engine(tmp_path, embedding).run(_docs([f"chunk {i}" for i in range(6)]))
+    assert (first["embedded"], first["store_hits"], first["upserted"]) == (6, 0, 6)
+
+    second = _engine(tmp_path, embedding).run(_docs([f"chunk {i}" for i in range(8)]))
+    assert (second["embedded"], second["store_hits"], second["upserted"]) == (2, 6, 8)
+    assert embedding.texts == 8
+
+def test_repeated_text_is_embedded_once_per_batch(tmp_path):
+    embedding = CountingEmbeddings()
+    stats = _engine(tmp_path, embedding).run(_docs(["same text"] * 4))
+    assert stats["embedded"] == 1 and stats["upserted"] == 4
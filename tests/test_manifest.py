@@ -0,0 +1,69 @@
+from langchain_core.documents import Document
+
+from src.rag.manifest import ChunkRecorder, IngestManifest, file_fingerprint
+
+SPLITTER = {"chunk_size": 1000, "chunk_overlap": 200}
+
+def _indexed(tmp_path, current, recorded):
+    manifest = IngestManifest(str(tmp_path / "manifest.json"))
+    assert manifest.update(current, recorded, SPLITTER) == {}
+    manifest.save()
+    return IngestManifest(str(tmp_path / "manifest.json"))
+
+def test_plan_skips_unchanged_and_reloads_changed(tmp_path):
+    current = {"a.pdf": ("laws", "fa"), "https://j/1": ("judgments", None)}
+    manifest = _indexed(tmp_path, current, {"a.pdf": (["1", "2"], "ca"), "https://j/1": (["3"], "cj")})
+
+    assert manifest.plan(current, SPLITTER) == ({"a.pdf", "https://j/1"}, set(), set())
+    assert manifest.entries["https://j/1"]["fingerprint"] == "cj"
+
+    changed = {"a.pdf": ("laws", "fa2"), "https://j/2": ("judgments", None)}
+    assert manifest.plan(changed, SPLITTER) == (set(), {"a.pdf", "https://j/2"}, {"https://j/1"})
+    assert manifest.plan(current, {**SPLITTER, "chunk_size": 500}) == (set(), set(current), set())
+    assert manifest.plan({"a.pdf": ("judgments", "fa")}, SPLITTER)[1] == {"a.pdf"}
+
+def test_update_returns_replaced_and_removed_ids(tmp_path):
+    current = {"a.pdf": ("laws", "fa"), "b.pdf": ("laws", "fb")}
+    manifest = _indexed(tmp_path, current, {"a.pdf": (["1", "2"], "ca"), "b.pdf": (["3"], "cb")})
+
+    stale = manifest.update({"a.pdf": ("laws", "fa2")}, {"a.pdf": (["1", "4"], "ca2")}, SPLITTER)
+    assert stale == {"laws": ["2", "3"]}
+    assert manifest.entries["a.pdf"]["chunk_ids"] == ["1", "4"]
+
+def test_ids_shared_with_another_source_are_not_deleted(tmp_path):
+    # Judgments listed under two URLs produce the same chunk ids
+    current = {"https://j/1": ("judgments", None), "https://j/1?dup": ("judgments", None)}
+    manifest = _indexed(tmp_path, current, {"https://j/1": (["1", "2"], "c"), "https://j/1?dup": (["1", "2"], "c")})
+
+    stale = manifest.update({"https://j/1?dup": ("judgments", None)}, {}, SPLITTER)
+    assert stale == {}
+    stale = manifest.update({}, {}, SPLITTER)
+    assert stale == {"judgments": ["1", "2"]}
+
+def test_shared_ids_in_another_collection_are_still_deleted(tmp_path):
+    current = {"a.pdf": ("laws", "f"), "b.pdf": ("judgments", "f")}
+    manifest = _indexed(tmp_path, current, {"a.pdf": (["1"], "c"), "b.pdf": (["1"], "c")})
+    assert manifest.update({"b.pdf": ("judgments", "f")}, {}, SPLITTER) == {"laws": ["1"]}
+
+def test_clear_by_collection(tmp_path):
+    current = {"a.pdf": ("laws", "fa"), "https://j/1": ("judgments", None)}
+    manifest = _indexed(tmp_path, current, {"a.pdf": (["1"], "ca"), "https://j/1": (["2"], "cj")})
+    manifest.clear("laws")
+    assert set(manifest.entries) == {"https://j/1"}
+
+def test_recorder_collects_ids_after_consumption(tmp_path):
+    recorder = ChunkRecorder()
+    chunks = [Document(page_content=text, metadata={"source": "a.pdf"}) for text in ("x", "y")]
+    for i, chunk in enumerate(recorder.observe(chunks)):
+        chunk.metadata["doc_id"] = f"id{i}"
+    ids, digest = recorder.results()["a.pdf"]
+    assert ids == ["id0", "id1"]
+
+    other = ChunkRecorder()
+    for chunk in chunks:
+        other.add(chunk)
+    assert other.results()["a.pdf"][1] == digest
+
+    path = tmp_path / "f.bin"
+    path.write_bytes(b"abc")
+    assert file_fingerprint(str(path)) == "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
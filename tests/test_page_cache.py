@@ -0,0 +1,102 @@
+import json
+import random
+import zlib
+
+import pytest
+
+from src.rag import file_loader, page_cache
+from src.rag.file_loader import WebLoader
+from src.rag.page_cache import DiskPageCache
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(page_cache, "time", clock)
+    return clock
+
+def _text(seed, length=2000):
+    rng = random.Random(seed)
+    return "".join(rng.choice("aăâbcdđeêghiklmnoôơpqrstuưvxy ") for _ in range(length))
+
+def _size(text):
+    return len(zlib.compress(text.encode("utf-8"), 6))
+
+def test_round_trip_is_compressed(tmp_path, clock):
+    cache = DiskPageCache(str(tmp_path / "pages.sqlite3"))
+    text = "Tòa án nhân dân tỉnh xét xử sơ thẩm vụ án dân sự. " * 200
+    cache.put("https://a", text, etag='"v1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+    entry = DiskPageCache(str(tmp_path / "pages.sqlite3")).get("https://a")
+    assert entry == {"text": text, "etag": '"v1"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT",
+                     "fetched_at": 1000.0, "checked_at": 1000.0}
+    assert cache.stats()["bytes"] == _size(text) < len(text.encode("utf-8")) // 10
+
+def test_touch_and_refetch_update_timestamps(tmp_path, clock):
+    cache = DiskPageCache(str(tmp_path / "pages.sqlite3"))
+    cache.put("https://a", "cũ")
+    clock.now += 10
+    cache.touch("https://a")
+    entry = cache.get("https://a")
+    assert (entry["fetched_at"], entry["checked_at"], entry["text"]) == (1000.0, 1010.0, "cũ")
+
+    clock.now += 10
+    cache.put("https://a", "mới")
+    entry = cache.get("https://a")
+    assert (entry["fetched_at"], entry["checked_at"], entry["text"]) == (1020.0, 1020.0, "mới")
+    assert cache.total_bytes == _size("mới")
+
+def test_evicts_least_recently_checked_down_to_ninety_percent(tmp_path, clock):
+    texts = {f"https://{i}": _text(i) for i in range(5)}
+    sizes = {url: _size(text) for url, text in texts.items()}
+    max_bytes = sum(sizes[f"https://{i}"] for i in range(4))
+    cache = DiskPageCache(str(tmp_path / "pages.sqlite3"), max_bytes=max_bytes)
+    for url in list(texts)[:4]:
+        clock.now += 1
+        cache.put(url, texts[url])
+    assert cache.evictions == 0
+
+    # Revalidating the oldest entry makes it the most recently checked
+    clock.now += 1
+    cache.touch("https://0")
+    clock.now += 1
+    cache.put("https://4", texts["https://4"])
+
+    kept = set(cache.urls())
+    evicted = set(texts) - kept
+    assert "https://0" in kept and "https://4" in kept
+    assert "https://1" in evicted
+    assert cache.evictions == len(evicted)
+    assert cache.total_bytes == sum(sizes[url] for url in kept) <= 0.9 * max_bytes
+    assert DiskPageCache(str(tmp_path / "pages.sqlite3"), max_bytes=max_bytes).total_bytes == cache.total_bytes
+    # Least recently checked first: 1, 2, 3, then the revalidated 0, then the new 4
+    by_checked_at = ["https://1", "https://2", "https://3", "https://0", "https://4"]
+    assert evicted == set(by_checked_at[:len(evicted)])
+
+class OfflineFetcher:
+    def __init__(self, *args, **kwargs):
+        raise AssertionError("offline mode must not create a fetcher")
+
+def test_offline_loading_reads_only_the_cache(tmp_path, monkeypatch, clock):
+    cache = DiskPageCache(str(tmp_path / "pages.sqlite3"))
+    cache.put("https://a", "Bản án số 1 về tranh chấp hợp đồng.")
+    cache.put("https://b", "Bản án số 2 về ly hôn.")
+    json_file = tmp_path / "01-02-2024_29-02-2024.json"
+    json_file.write_text(json.dumps([{"url": "https://a"}, {"url": "https://b"}, {"url": "https://missing"}]))
+    monkeypatch.setattr(file_loader, "get_page_cache", lambda: cache)
+    monkeypatch.setattr(file_loader, "AsyncWebFetcher", OfflineFetcher)
+
+    documents = WebLoader(offline=True)([str(json_file)])
+    assert sorted((doc.metadata["source"], doc.page_content) for doc in documents) == [
+        ("https://a", "Bản án số 1 về tranh chấp hợp đồng."),
+        ("https://b", "Bản án số 2 về ly hôn."),
+    ]
+    assert {doc.metadata["published_date"] for doc in documents} == {"2024-02-01"}
+
+    with pytest.raises(ValueError):
+        WebLoader(offline=True)([str(json_file)], use_cache=False)
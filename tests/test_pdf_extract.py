@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from src.rag import pdf_extract
+from src.rag.manifest import file_fingerprint
+from src.rag.pdf_extract import PdfTextCache, page_ranges, pdfminer_pages
+
+LAW_PDF = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data_source", "judgment", "VanBanGoc_52.2014.QH13.pdf")
+
+@pytest.mark.parametrize("num_pages, workers, expected", [
+    (38, 4, [(0, 10), (10, 20), (20, 30), (30, 38)]),
+    (10, 8, [(0, 4), (4, 8), (8, 10)]),
+    (3, 4, [(0, 3)]),
+    (5, 0, [(0, 5)]),
+    (0, 4, []),
+])
+def test_page_ranges(num_pages, workers, expected):
+    ranges = page_ranges(num_pages, workers)
+    assert ranges == expected
+    assert [page for start, end in ranges for page in range(start, end)] == list(range(num_pages))
+
+def test_cache_round_trip(tmp_path):
+    cache = PdfTextCache(str(tmp_path / "pdf.sqlite3"))
+    pages = [(0, "Điều 1. Phạm vi điều chỉnh"), (1, "")]
+    assert cache.get("hash") is None
+    cache.put("hash", pages)
+    assert PdfTextCache(str(tmp_path / "pdf.sqlite3")).get("hash") == pages
+    assert (cache.hits, cache.misses) == (0, 1)
+
+def test_changed_pdf_misses(tmp_path):
+    pdf = tmp_path / "law.pdf"
+    pdf.write_bytes(b"%PDF-1.4 first")
+    cache = PdfTextCache(str(tmp_path / "pdf.sqlite3"))
+    cache.put(file_fingerprint(str(pdf)), [(0, "cũ")])
+    pdf.write_bytes(b"%PDF-1.4 second")
+    assert cache.get(file_fingerprint(str(pdf))) is None
+
+def test_new_extractor_version_misses(tmp_path, monkeypatch):
+    cache = PdfTextCache(str(tmp_path / "pdf.sqlite3"))
+    cache.put("hash", [(0, "v1")])
+    monkeypatch.setattr(pdf_extract, "EXTRACTOR_VERSION", pdf_extract.EXTRACTOR_VERSION + 1)
+    assert cache.get("hash") is None
+    cache.put("hash", [(0, "v2")])
+    assert cache.get("hash") == [(0, "v2")]
+    monkeypatch.undo()
+    assert cache.get("hash") == [(0, "v1")]
+
+@pytest.mark.skipif(not os.path.exists(LAW_PDF), reason="sample law PDF not available")
+def test_pdfminer_pages_are_numbered_from_start():
+    pytest.importorskip("pdfminer")
+    assert [page for page, _ in pdfminer_pages(LAW_PDF, 2, 4)] == [2, 3]
+    assert [page for page, _ in pdfminer_pages(LAW_PDF, 36)] == [36, 37]
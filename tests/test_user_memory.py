@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.base.tokens import estimate_tokens
+from src.memory.user_memory import InMemoryBackend, SQLiteBackend, UserMemory
+
+@pytest.fixture(params=["memory", "sqlite"])
+def memory(request, tmp_path):
+    backend = InMemoryBackend() if request.param == "memory" else SQLiteBackend(str(tmp_path / "memory.sqlite3"))
+    return UserMemory(backend=backend, token_budget=100)
+
+def _lines(memory, user_id="u"):
+    return memory.get_summary(user_id).split("\n")
+
+def test_keeps_recent_exchanges_within_budget(memory):
+    for i in range(10):
+        memory.update("u", f"câu hỏi {i}", f"trả lời {i}")
+    lines = _lines(memory)
+    assert lines[-2:] == ["User: câu hỏi 9", "Bot: trả lời 9"]
+    assert sum(estimate_tokens(line) for line in lines) <= 100
+
+def test_trims_whole_exchanges(memory):
+    for i in range(10):
+        memory.update("u", f"câu hỏi {i}", "trả lời " + "x" * (40 + i))
+    lines = _lines(memory)
+    assert lines[0].startswith("User: ")
+    assert [line[:4] for line in lines] == ["User", "Bot:"] * (len(lines) // 2)
+
+def test_long_answer_keeps_latest_exchange_truncated(memory):
+    memory.update("u", "câu hỏi cũ", "trả lời cũ")
+    memory.update("u", "câu hỏi mới", "rất dài " * 600)
+    lines = _lines(memory)
+    assert lines[0] == "User: câu hỏi mới"
+    assert lines[1].startswith("Bot: rất dài") and lines[1].endswith("…")
+    assert sum(estimate_tokens(line) for line in lines) <= 100
+
+def test_long_question_leaves_room_for_the_answer(memory):
+    memory.update("u", "hỏi " * 600, "trả lời ngắn")
+    lines = _lines(memory)
+    assert lines[0].startswith("User: hỏi") and lines[1] == "Bot: trả lời ngắn"
+
+def test_concurrent_workers_do_not_lose_exchanges(tmp_path):
+    path = str(tmp_path / "memory.sqlite3")
+    # One connection per worker, as with several uvicorn processes sharing the file
+    workers = [UserMemory(backend=SQLiteBackend(path), token_budget=100000) for _ in range(4)]
+
+    def run(worker_idx):
+        for i in range(10):
+            workers[worker_idx].update("u", f"câu hỏi {worker_idx}.{i}", f"trả lời {worker_idx}.{i}")
+
+    threads = [threading.Thread(target=run, args=(worker_idx,)) for worker_idx in range(len(workers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    questions = [line for line in _lines(workers[0]) if line.startswith("User: ")]
+    assert len(questions) == 40
+
+def test_async_calls_run_off_the_event_loop(memory):
+    async def exchange():
+        await memory.aupdate("u", "câu hỏi", "trả lời")
+        return await memory.aget_summary("u")
+
+    assert asyncio.run(exchange()) == "User: câu hỏi\nBot: trả lời"
@@ -0,0 +1,45 @@
+import httpx
+
+from src.rag.web_fetcher import AsyncWebFetcher, PageCache
+
+PAGE = '<html><body><div id="vanban_content">Bản án số 1</div></body></html>'
+
+def _fetcher(handler, **kwargs):
+    return AsyncWebFetcher(transport=httpx.MockTransport(handler), per_host_rps=0, backoff_factor=0, **kwargs)
+
+def test_fetches_and_extracts_content():
+    fetcher = _fetcher(lambda request: httpx.Response(200, text=PAGE))
+    results = fetcher.fetch_all(["https://example.test/a"])
+    assert results["https://example.test/a"][0].page_content == "Bản án số 1"
+    assert fetcher.stats()["fetched"] == 1
+
+def test_one_failing_page_does_not_abort_the_crawl():
+    class BrokenCache(PageCache):
+        def get(self, url):
+            if url.endswith("/broken"):
+                raise RuntimeError("database disk image is malformed")
+            return super().get(url)
+
+    fetcher = _fetcher(lambda request: httpx.Response(200, text=PAGE), cache=BrokenCache())
+    urls = ["https://example.test/a", "https://example.test/broken", "https://example.test/b"]
+    results = fetcher.fetch_all(urls)
+    assert results["https://example.test/broken"] == []
+    assert results["https://example.test/a"] and results["https://example.test/b"]
+    stats = fetcher.stats()
+    assert stats["failed"] == 1 and "malformed" in stats["failures"]["https://example.test/broken"]
+
+def test_not_found_is_recorded_without_retries():
+    fetcher = _fetcher(lambda request: httpx.Response(404))
+    assert fetcher.fetch_all(["https://example.test/missing"]) == {"https://example.test/missing": []}
+    assert fetcher.stats()["retried"] == 0 and fetcher.stats()["failed"] == 1
+
+def test_user_agent_from_environment(monkeypatch):
+    monkeypatch.setenv("USER_AGENT", "leco-test-agent")
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers["User-Agent"])
+        return httpx.Response(200, text=PAGE)
+
+    _fetcher(handler).fetch_all(["https://example.test/a"])
+    assert seen == ["leco-test-agent"]